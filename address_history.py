@@ -0,0 +1,88 @@
+"""Balance history for addresses.
+
+The syncer writes one ``address_history`` row per address and block that
+touched it, holding that block's received/sent amounts and the balance and
+tx count afterwards. With the unique (address, height) index, the balance
+at any height is the newest row at or below it: one index seek.
+"""
+
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc, text
+
+from models import AddressHistory, Block
+
+
+def balance_at(session, address: str, height: int) -> Optional[AddressHistory]:
+    return session.query(AddressHistory).filter(
+        AddressHistory.address == address,
+        AddressHistory.height <= height
+    ).order_by(desc(AddressHistory.height)).first()
+
+
+def history_point(row: AddressHistory, height: Optional[int] = None) -> Dict:
+    return {
+        'height': row.height if height is None else height,
+        'balance_sat': row.balance,
+        'tx_count': row.tx_count,
+    }
+
+
+def balance_series(session, address: str, start: int, end: int, points: int) -> List[Dict]:
+    """Balance from ``start`` to ``end`` in at most ``points`` points.
+
+    Every change is returned when there are few enough. Otherwise the range
+    is split into equal height steps and each point is the balance at the
+    end of its step, one seek per point.
+    """
+    rows = session.query(AddressHistory).filter(
+        AddressHistory.address == address,
+        AddressHistory.height.between(start, end)
+    ).order_by(AddressHistory.height).limit(points + 1).all()
+
+    if len(rows) <= points:
+        series = [history_point(row) for row in rows]
+    else:
+        step = (end - start + 1) / points
+        series = []
+        for i in range(points):
+            height = start + int(step * (i + 1)) - 1
+            row = balance_at(session, address, height)
+            if row:
+                series.append(history_point(row, height))
+
+    heights = [point['height'] for point in series]
+    times = dict(session.query(Block.height, Block.timestamp).filter(Block.height.in_(heights)))
+    for point in series:
+        point['time'] = times.get(point['height'])
+    return series
+
+
+def rebuild_address_history(session):
+    """Recompute address_history from tx_outputs in one statement."""
+    session.execute(text('DELETE FROM address_history'))
+    # Per (address, height): amounts received and spent, and the distinct
+    # transactions involved, then running totals over heights.
+    session.execute(text("""
+        INSERT INTO address_history (address, height, received, sent, balance, tx_count)
+        SELECT address, height, received, sent,
+               SUM(received - sent) OVER (PARTITION BY address ORDER BY height),
+               SUM(txs) OVER (PARTITION BY address ORDER BY height)
+        FROM (
+            SELECT address, height, SUM(received) AS received, SUM(sent) AS sent,
+                   COUNT(DISTINCT txid) AS txs
+            FROM (
+                SELECT o.address AS address, t.block_height AS height,
+                       o.value AS received, 0 AS sent, o.txid AS txid
+                FROM tx_outputs o
+                JOIN transactions t ON t.id = o.tx_id
+                WHERE o.address IS NOT NULL
+                UNION ALL
+                SELECT o.address, s.block_height, 0, o.value, o.spent_by_txid
+                FROM tx_outputs o
+                JOIN transactions s ON s.txid = o.spent_by_txid
+                WHERE o.address IS NOT NULL
+            ) changes
+            GROUP BY address, height
+        ) per_block
+    """))
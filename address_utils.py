@@ -0,0 +1,156 @@
+import hashlib
+import struct
+from typing import List, Optional
+
+from config import Config
+
+B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+
+PUBKEY_ADDRESS_VERSION = Config.ADDRESS_VERSION
+
+
+def sha256d(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, 'big')
+    chars = []
+    while n:
+        n, rem = divmod(n, 58)
+        chars.append(B58_ALPHABET[rem])
+    pad = len(data) - len(data.lstrip(b'\0'))
+    return '1' * pad + ''.join(reversed(chars))
+
+
+def b58decode(text: str) -> Optional[bytes]:
+    n = 0
+    for c in text:
+        digit = B58_INDEX.get(c)
+        if digit is None:
+            return None
+        n = n * 58 + digit
+    body = n.to_bytes((n.bit_length() + 7) // 8, 'big') if n else b''
+    pad = len(text) - len(text.lstrip('1'))
+    return b'\0' * pad + body
+
+
+def b58encode_check(payload: bytes) -> str:
+    return b58encode(payload + sha256d(payload)[:4])
+
+
+def b58decode_check(text: str) -> Optional[bytes]:
+    raw = b58decode(text)
+    if raw is None or len(raw) < 5:
+        return None
+    payload, checksum = raw[:-4], raw[-4:]
+    if sha256d(payload)[:4] != checksum:
+        return None
+    return payload
+
+
+def _ripemd160_py(data: bytes) -> bytes:
+    # Pure-Python fallback for OpenSSL builds that no longer ship RIPEMD-160.
+    def rol(x, n):
+        return ((x << n) | (x >> (32 - n))) & 0xffffffff
+
+    r1 = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+          7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+          3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+          1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+          4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13]
+    r2 = [5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+          6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+          15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+          8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+          12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11]
+    s1 = [11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+          7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+          11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+          11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+          9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6]
+    s2 = [8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+          9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+          9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+          15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+          8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11]
+    k1 = [0x00000000, 0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xa953fd4e]
+    k2 = [0x50a28be6, 0x5c4dd124, 0x6d703ef3, 0x7a6d76e9, 0x00000000]
+
+    def f(j, x, y, z):
+        if j < 16:
+            return x ^ y ^ z
+        if j < 32:
+            return (x & y) | (~x & z)
+        if j < 48:
+            return (x | (~y & 0xffffffff)) ^ z
+        if j < 64:
+            return (x & z) | (y & ~z)
+        return x ^ (y | (~z & 0xffffffff))
+
+    h = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0]
+    msg = data + b'\x80' + b'\0' * ((55 - len(data)) % 64) + struct.pack('<Q', len(data) * 8)
+    for block in range(0, len(msg), 64):
+        x = struct.unpack('<16I', msg[block:block + 64])
+        al, bl, cl, dl, el = h
+        ar, br, cr, dr, er = h
+        for j in range(80):
+            t = rol((al + f(j, bl, cl, dl) + x[r1[j]] + k1[j // 16]) & 0xffffffff, s1[j]) + el
+            al, el, dl, cl, bl = el, dl, rol(cl, 10), bl, t & 0xffffffff
+            t = rol((ar + f(79 - j, br, cr, dr) + x[r2[j]] + k2[j // 16]) & 0xffffffff, s2[j]) + er
+            ar, er, dr, cr, br = er, dr, rol(cr, 10), br, t & 0xffffffff
+        t = (h[1] + cl + dr) & 0xffffffff
+        h[1] = (h[2] + dl + er) & 0xffffffff
+        h[2] = (h[3] + el + ar) & 0xffffffff
+        h[3] = (h[4] + al + br) & 0xffffffff
+        h[4] = (h[0] + bl + cr) & 0xffffffff
+        h[0] = t
+    return struct.pack('<5I', *h)
+
+
+def ripemd160(data: bytes) -> bytes:
+    try:
+        return hashlib.new('ripemd160', data).digest()
+    except ValueError:
+        return _ripemd160_py(data)
+
+
+def hash160(data: bytes) -> bytes:
+    return ripemd160(hashlib.sha256(data).digest())
+
+
+def hash160_to_address(h160: bytes, version: int = PUBKEY_ADDRESS_VERSION) -> str:
+    return b58encode_check(bytes([version]) + h160)
+
+
+def pubkey_to_address(pubkey: bytes, version: int = PUBKEY_ADDRESS_VERSION) -> str:
+    return hash160_to_address(hash160(pubkey), version)
+
+
+def address_to_hash160(address: str, version: int = PUBKEY_ADDRESS_VERSION) -> Optional[bytes]:
+    if not address or len(address) < 26 or len(address) > 35:
+        return None
+    payload = b58decode_check(address)
+    if payload is None or len(payload) != 21 or payload[0] != version:
+        return None
+    return payload[1:]
+
+
+def validate_address(address: str, version: int = PUBKEY_ADDRESS_VERSION) -> bool:
+    return address_to_hash160(address, version) is not None
+
+
+def script_addresses(script_info: dict) -> List[str]:
+    """Derive addresses from the keys and hashes classify_script extracted."""
+    script_type = script_info.get('type')
+    try:
+        if script_type == 'pubkeyhash':
+            return [hash160_to_address(bytes.fromhex(script_info['pubkey_hash']))]
+        if script_type == 'pubkey':
+            return [pubkey_to_address(bytes.fromhex(script_info['pubkey']))]
+        if script_type == 'multisig':
+            return [pubkey_to_address(bytes.fromhex(pk)) for pk in script_info.get('pubkeys', [])]
+    except (KeyError, ValueError):
+        pass
+    return []
@@ -1,16 +1,42 @@
-from flask import Flask, render_template, request, jsonify, abort, redirect, url_for
+from flask import (
+    Flask, Response, render_template, request, jsonify, abort, redirect, url_for,
+    stream_with_context
+)
 from sqlalchemy import desc, func
 from sqlalchemy.orm import scoped_session
 from datetime import datetime, timezone
 from contextlib import contextmanager
+import json
 import logging
+import queue
 
 from config import Config
-from models import init_db, Block, Transaction, TxInput, TxOutput, Address, ChainState
+from models import (
+    init_db, Block, Transaction, TxInput, TxOutput, Address,
+    MempoolTx, MempoolAddress, Miner
+)
 from rpc_client import BitokRPC
+from concurrency import EndpointLimiter, busy_response
+from query_profiler import install as install_query_hooks, short_sql, start_profile, stop_profile
+from events import EventPublisher, format_sse
+from network_stats import BLOCK_TIME, build_network_stats, home_stats_payload, read_chain_state
+from address_utils import validate_address
+from search_index import search_prefix
+from lookups import (
+    load_transactions, load_transaction_details, load_addresses,
+    load_mempool_transactions, load_mempool_balances, mempool_transaction_details,
+    load_unspent_outputs, unspent_value_above
+)
+from export import EXPORTERS, iter_ndjson
+from rollups import PERIODS, load_series
+from fee_stats import FeeWindow
+from miners import miner_blocks, miner_distribution
+from nulldata import is_hex_query, load_nulldata
+from opcode_index import BY_NAME, TRACKED, load_uses, opcode_series, opcode_totals, parse_cursor
+from address_history import balance_at, balance_series
 from script_decoder import (
     decode_script, script_to_asm, classify_script,
-    decode_script_sig, format_asm_html, SCRIPT_EXEC_HEIGHT
+    decode_script_sig, format_asm_html_cached, SCRIPT_EXEC_HEIGHT
 )
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
@@ -33,16 +59,26 @@ engine, SessionFactory = init_db(
 
 Session = scoped_session(SessionFactory)
 
+if config.QUERY_PROFILING or config.SLOW_QUERY_MS:
+    install_query_hooks(engine, slow_query_ms=config.SLOW_QUERY_MS)
+
 rpc = BitokRPC(
     host=config.RPC_HOST,
     port=config.RPC_PORT,
     user=config.RPC_USER,
-    password=config.RPC_PASSWORD
+    password=config.RPC_PASSWORD,
+    timeout=config.RPC_TIMEOUT
 )
 
+fee_window = FeeWindow(config.FEE_WINDOW_BLOCKS)
+
+limiter = EndpointLimiter({
+    'rpc': config.LIMIT_RPC,
+    'heavy': config.LIMIT_HEAVY,
+    'export': config.LIMIT_EXPORT,
+}, wait_timeout=config.LIMIT_WAIT_TIMEOUT)
+
 COIN = 100000000
-BLOCK_TIME = 600
-MAX_TARGET = 0x7fffff * (2 ** 216)
 
 
 @app.template_filter('coin')
@@ -80,6 +116,27 @@ def format_coin(satoshis):
         return '0.00000000'
 
 
+def output_script_info(out):
+    if out.script_info:
+        try:
+            return json.loads(out.script_info)
+        except ValueError:
+            pass
+    return classify_script(out.script_pubkey)
+
+
+def output_script_asm(out):
+    if out.script_asm is not None:
+        return out.script_asm
+    return script_to_asm(out.script_pubkey) if out.script_pubkey else ''
+
+
+def input_script_asm(inp):
+    if inp.script_sig_asm is not None:
+        return inp.script_sig_asm
+    return script_to_asm(inp.script_sig) if inp.script_sig else ''
+
+
 def format_timestamp(ts):
     if ts is None:
         return ''
@@ -102,81 +159,6 @@ def format_age(ts):
     return f'{minutes}m ago'
 
 
-def calculate_hashrate_from_blocks(session, difficulty):
-    """
-    Simple hashrate calculation:
-    - Get last 30 blocks
-    - Calculate time taken
-    - Hashrate = (blocks * difficulty * 2^17) / time_elapsed
-    Note: Bitok has 17 leading zero bits (not Bitcoin's 32)
-    """
-    LOOKUP_BLOCKS = 30
-
-    # Get the last N blocks
-    best_block = session.query(Block).order_by(desc(Block.height)).first()
-    if not best_block or best_block.height < 2:
-        return 0, BLOCK_TIME
-
-    best_height = best_block.height
-    actual_lookup = min(best_height, LOOKUP_BLOCKS)
-
-    # Get blocks with timestamps
-    start_height = best_height - actual_lookup + 1
-    blocks = session.query(Block.timestamp).filter(
-        Block.height >= start_height,
-        Block.height <= best_height,
-        Block.timestamp.isnot(None)
-    ).order_by(Block.height).all()
-
-    if len(blocks) < 2:
-        return 0, BLOCK_TIME
-
-    # Calculate time span
-    timestamps = [b.timestamp for b in blocks]
-    time_span = timestamps[-1] - timestamps[0]
-
-    if time_span <= 0:
-        return 0, BLOCK_TIME
-
-    # Average block time
-    avg_block_time = time_span / (len(blocks) - 1)
-
-    # Simple hashrate formula
-    # At difficulty D, finding a block takes roughly D * 2^17 hashes (Bitok has 17 leading zero bits)
-    # We found N blocks in time_span seconds
-    # So hashrate = (N * D * 2^17) / time_span
-    if difficulty and difficulty > 0:
-        num_blocks = len(blocks) - 1  # Number of intervals
-        hashrate = (num_blocks * difficulty * pow(2, 17)) / time_span
-    else:
-        hashrate = 0
-
-    return hashrate, avg_block_time
-
-
-def calculate_hashrate(difficulty):
-    """Fallback: theoretical hashrate based on difficulty only"""
-    if difficulty is None or difficulty <= 0:
-        return 0
-    hashrate = difficulty * (2 ** 256) / MAX_TARGET / BLOCK_TIME
-    return hashrate
-
-
-def format_hashrate(hashrate):
-    if hashrate is None or hashrate <= 0:
-        return '0 H/s'
-    if hashrate >= 1e12:
-        return f'{hashrate / 1e12:.2f} TH/s'
-    elif hashrate >= 1e9:
-        return f'{hashrate / 1e9:.2f} GH/s'
-    elif hashrate >= 1e6:
-        return f'{hashrate / 1e6:.2f} MH/s'
-    elif hashrate >= 1e3:
-        return f'{hashrate / 1e3:.2f} kH/s'
-    else:
-        return f'{hashrate:.2f} H/s'
-
-
 app.jinja_env.filters['coin'] = format_coin
 app.jinja_env.filters['timestamp'] = format_timestamp
 app.jinja_env.filters['age'] = format_age
@@ -189,42 +171,49 @@ def shutdown_session(exception=None):
     Session.remove()
 
 
-def get_network_stats():
-    with get_session() as session:
-        synced_height = session.query(ChainState).filter_by(key='synced_height').first()
-        synced = int(synced_height.value) if synced_height else 0
-
-        latest_block = session.query(Block).order_by(desc(Block.height)).first()
-
-        total_txs = session.query(func.count(Transaction.id)).scalar() or 0
-
-        try:
-            info = rpc.getinfo()
-            difficulty = info.get('difficulty', 0)
-            connections = info.get('connections', 0)
-            try:
-                chain_height = rpc.getblocknumber()
-            except:
-                chain_height = info.get('blocks', synced)
-        except:
-            difficulty = 0
-            connections = 0
-            chain_height = synced
+if config.QUERY_PROFILING:
+    @app.before_request
+    def begin_query_profile():
+        start_profile(f'{request.method} {request.path}')
+
+    @app.after_request
+    def report_query_profile(response):
+        profile = stop_profile()
+        if profile is None:
+            return response
+        repeated = profile.repeated(config.N_PLUS_ONE_THRESHOLD)
+        response.headers['X-DB-Queries'] = str(profile.count)
+        response.headers['X-DB-Time-Ms'] = f'{profile.total_ms():.1f}'
+        if repeated:
+            response.headers['X-DB-Repeated'] = str(len(repeated))
+
+        if profile.total_ms() >= config.QUERY_PROFILE_LOG_MS:
+            slowest = '; '.join(f'{d * 1000:.1f} ms {short_sql(sql, 120)}'
+                                for d, sql in profile.slowest)
+            app.logger.info(f'{profile.label}: {profile.count} queries, '
+                            f'{profile.total_ms():.1f} ms; slowest: {slowest}')
+        for sql, count in repeated:
+            app.logger.warning(f'Possible N+1 in {profile.label}: statement ran {count} times: '
+                               f'{short_sql(sql)}')
+        return response
 
-        hashrate, avg_block_time = calculate_hashrate_from_blocks(session, difficulty)
-        hashrate_formatted = format_hashrate(hashrate)
 
-        return {
-            'height': synced,
-            'chain_height': chain_height,
-            'difficulty': difficulty,
-            'connections': connections,
-            'total_txs': total_txs,
-            'hashrate': hashrate,
-            'hashrate_formatted': hashrate_formatted,
-            'avg_block_time': avg_block_time,
-            'latest_block': latest_block
-        }
+def get_network_stats():
+    with get_session() as session:
+        stats = build_network_stats(session, rpc)
+        stats['latest_block'] = session.query(Block).order_by(desc(Block.height)).first()
+        return stats
+
+
+# In-process subscribers each hold a worker thread for as long as the page
+# is open, so they get a quarter of them (at least one). events_server.py
+# serves the stream without threads when the proxy routes it there.
+publisher = EventPublisher(
+    SessionFactory,
+    stats_builder=lambda session: home_stats_payload(build_network_stats(session, rpc)),
+    poll_interval=config.SSE_POLL_INTERVAL,
+    max_subscribers=max(1, min(config.SSE_MAX_SUBSCRIBERS, config.WEB_THREADS // 4))
+)
 
 
 @app.route('/')
@@ -283,6 +272,47 @@ def blocks(page=1):
         return render_template('500.html', config=config), 500
 
 
+def load_ranking(key):
+    with get_session() as session:
+        snapshot = read_chain_state(session, key)
+    ranking = json.loads(snapshot) if snapshot else {'height': None, 'supply': 0, 'addresses': []}
+    for rank, item in enumerate(ranking['addresses'], 1):
+        item['rank'] = rank
+    return ranking
+
+
+def api_ranking_data(ranking):
+    return {
+        'height': ranking['height'],
+        'supply': format_coin(ranking['supply']),
+        'addresses': [{
+            'rank': item['rank'],
+            'address': item['address'],
+            'balance': format_coin(item['balance']),
+            'share': item['share'],
+            'tx_count': item['tx_count'],
+        } for item in ranking['addresses']]
+    }
+
+
+@app.route('/richlist')
+def rich_list():
+    return render_template('top_addresses.html',
+        title='Rich List',
+        ranking=load_ranking('rich_list'),
+        config=config
+    )
+
+
+@app.route('/active')
+def top_active():
+    return render_template('top_addresses.html',
+        title='Most Active Addresses',
+        ranking=load_ranking('top_active'),
+        config=config
+    )
+
+
 @app.route('/download')
 def download():
     return render_template('download.html', config=config)
@@ -324,21 +354,28 @@ def block(block_id):
         )
 
 
+def load_transaction_or_mempool(session, txid):
+    tx = session.query(Transaction).filter_by(txid=txid).first()
+    if tx:
+        return tx, load_transaction_details(session, [tx])[tx.id]
+    mtx = session.query(MempoolTx).filter_by(txid=txid).first()
+    if mtx:
+        return mempool_transaction_details(mtx)
+    return None, None
+
+
 @app.route('/tx/<txid>')
 def transaction(txid):
     with get_session() as session:
-        tx = session.query(Transaction).filter_by(txid=txid).first()
+        tx, detail = load_transaction_or_mempool(session, txid)
         if not tx:
             abort(404)
 
-        inputs = session.query(TxInput).filter_by(tx_id=tx.id).all()
-        outputs = session.query(TxOutput).filter_by(tx_id=tx.id).all()
-
         is_post_exec = tx.block_height >= SCRIPT_EXEC_HEIGHT if tx.block_height else False
 
         input_details = []
-        for inp in inputs:
-            detail = {
+        for inp, prev_out in detail['inputs']:
+            inp_detail = {
                 'coinbase': inp.coinbase,
                 'prev_txid': inp.prev_txid,
                 'prev_vout': inp.prev_vout,
@@ -350,22 +387,17 @@ def transaction(txid):
                 'script_sig_decoded': None,
             }
             if inp.script_sig:
-                detail['script_sig_asm'] = script_to_asm(inp.script_sig)
-                detail['script_sig_html'] = format_asm_html(inp.script_sig, is_scriptsig=True)
-                detail['script_sig_decoded'] = decode_script_sig(inp.script_sig)
-            if inp.prev_txid:
-                prev_out = session.query(TxOutput).filter_by(
-                    txid=inp.prev_txid,
-                    vout=inp.prev_vout
-                ).first()
-                if prev_out:
-                    detail['address'] = prev_out.address
-                    detail['value'] = prev_out.value
-            input_details.append(detail)
+                inp_detail['script_sig_asm'] = input_script_asm(inp)
+                inp_detail['script_sig_html'] = format_asm_html_cached(inp.script_sig, is_scriptsig=True)
+                inp_detail['script_sig_decoded'] = decode_script_sig(inp.script_sig)
+            if prev_out:
+                inp_detail['address'] = prev_out.address
+                inp_detail['value'] = prev_out.value
+            input_details.append(inp_detail)
 
         output_details = []
-        for out in outputs:
-            script_info = classify_script(out.script_pubkey)
+        for out in detail['outputs']:
+            script_info = output_script_info(out)
             output_details.append({
                 'vout': out.vout,
                 'value': out.value,
@@ -373,8 +405,8 @@ def transaction(txid):
                 'spent': out.spent,
                 'spent_by_txid': out.spent_by_txid,
                 'script_pubkey_hex': out.script_pubkey,
-                'script_pubkey_asm': script_to_asm(out.script_pubkey) if out.script_pubkey else '',
-                'script_pubkey_html': format_asm_html(out.script_pubkey) if out.script_pubkey else '',
+                'script_pubkey_asm': output_script_asm(out),
+                'script_pubkey_html': format_asm_html_cached(out.script_pubkey),
                 'script_type': script_info.get('type', 'nonstandard'),
                 'script_label': script_info.get('label', 'Unknown'),
                 'script_info': script_info,
@@ -382,6 +414,7 @@ def transaction(txid):
 
         return render_template('transaction.html',
             tx=tx,
+            unconfirmed=tx.block_height is None,
             inputs=input_details,
             outputs=output_details,
             is_post_exec=is_post_exec,
@@ -389,15 +422,11 @@ def transaction(txid):
         )
 
 
-@app.route('/address/<address>')
-@app.route('/address/<address>/<int:page>')
-def address_page(address, page=1):
+def load_address_page(address, page):
     with get_session() as session:
         addr = session.query(Address).filter_by(address=address).first()
+        known = addr is not None
         if not addr:
-            valid = rpc.validateaddress(address)
-            if not valid.get('isvalid'):
-                abort(404)
             addr = Address(
                 address=address,
                 total_received=0,
@@ -472,53 +501,108 @@ def address_page(address, page=1):
                 'net': received - sent
             })
 
-        return render_template('address.html',
-            address=addr,
-            transactions=tx_details,
-            page=page,
-            total_pages=total_pages,
-            total=total,
-            config=config
-        )
+        unconfirmed = []
+        if page == 1:
+            for row in session.query(MempoolAddress).filter_by(address=address).limit(per_page):
+                unconfirmed.append({
+                    'txid': row.txid,
+                    'received': row.received,
+                    'sent': row.sent,
+                    'net': row.received - row.sent
+                })
+
+        pending = load_mempool_balances(session, [address]).get(address)
+
+        return known or pending is not None, {
+            'address': addr,
+            'transactions': tx_details,
+            'unconfirmed': unconfirmed,
+            'pending': pending,
+            'page': page,
+            'total_pages': total_pages,
+            'total': total,
+        }
 
 
-@app.route('/search')
-def search():
-    query = request.args.get('q', '').strip()
-    if not query:
-        return redirect(url_for('index'))
+@app.route('/address/<address>')
+@app.route('/address/<address>/<int:page>')
+@limiter.limit('heavy')
+def address_page(address, page=1):
+    known, context = load_address_page(address, page)
+    if not known and not validate_address(address):
+        abort(404)
+
+    return render_template('address.html', config=config, **context)
 
+
+def resolve_search(query):
     with get_session() as session:
         if len(query) == 64:
             block = session.query(Block).filter_by(hash=query).first()
             if block:
-                return redirect(url_for('block', block_id=query))
+                return 'block', {'block_id': query}
 
             tx = session.query(Transaction).filter_by(txid=query).first()
             if tx:
-                return redirect(url_for('transaction', txid=query))
+                return 'transaction', {'txid': query}
 
         try:
             height = int(query)
             block = session.query(Block).filter_by(height=height).first()
             if block:
-                return redirect(url_for('block', block_id=str(height)))
+                return 'block', {'block_id': str(height)}
         except ValueError:
             pass
 
-        if len(query) >= 26 and len(query) <= 35:
-            try:
-                valid = rpc.validateaddress(query)
-                if valid.get('isvalid'):
-                    return redirect(url_for('address_page', address=query))
-            except:
-                pass
-
-        return render_template('search_results.html',
-            query=query,
-            results=[],
-            config=config
-        )
+        return None
+
+
+@app.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return redirect(url_for('index'))
+
+    target = resolve_search(query)
+    if target:
+        endpoint, values = target
+        return redirect(url_for(endpoint, **values))
+
+    if validate_address(query):
+        return redirect(url_for('address_page', address=query))
+
+    results = run_prefix_search(query)
+    if len(results) == 1:
+        return redirect(search_result_url(results[0]))
+
+    for result in results:
+        result['url'] = search_result_url(result)
+
+    return render_template('search_results.html',
+        query=query,
+        results=results,
+        config=config
+    )
+
+
+def run_prefix_search(query):
+    with get_session() as session:
+        return search_prefix(session, query, limit=config.SEARCH_RESULT_LIMIT)
+
+
+def search_result_url(result):
+    if result['kind'] == 'block':
+        return url_for('block', block_id=result['value'])
+    if result['kind'] == 'tx':
+        return url_for('transaction', txid=result['value'])
+    return url_for('address_page', address=result['value'])
+
+
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    results = run_prefix_search(query) if query else []
+    return jsonify({'query': query, 'results': results})
 
 
 @app.route('/api/stats')
@@ -537,6 +621,15 @@ def api_stats():
     })
 
 
+@app.route('/api/fees')
+def api_fees():
+    with get_session() as session:
+        synced = read_chain_state(session, 'synced_height')
+        if synced is not None:
+            fee_window.refresh(session, int(synced))
+    return jsonify(fee_window.snapshot())
+
+
 @app.route('/api/home')
 def api_home():
     with get_session() as session:
@@ -565,24 +658,40 @@ def api_home():
         } for tx in recent_txs]
 
         return jsonify({
-            'stats': {
-                'height': stats['height'],
-                'chain_height': stats['chain_height'],
-                'difficulty': stats['difficulty'],
-                'connections': stats['connections'],
-                'total_txs': stats['total_txs'],
-                'hashrate': stats['hashrate'],
-                'hashrate_formatted': stats['hashrate_formatted'],
-                'avg_block_time': round(stats['avg_block_time'], 1),
-                'target_block_time': BLOCK_TIME,
-                'synced': stats['height'] == stats['chain_height']
-            },
+            'stats': home_stats_payload(stats),
             'recent_blocks': blocks_data,
             'recent_txs': txs_data,
             'coin_symbol': config.COIN_SYMBOL
         })
 
 
+@app.route('/api/events')
+def api_events():
+    q = publisher.subscribe()
+    if q is None:
+        return busy_response('stream')
+
+    def generate():
+        try:
+            yield f'retry: {config.SSE_RETRY_MS}\n\n'
+            while True:
+                try:
+                    event, data = q.get(timeout=config.SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if event == 'close':
+                    return
+                yield format_sse(event, data)
+        finally:
+            publisher.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
 @app.route('/api/blocks')
 @app.route('/api/blocks/<int:page>')
 def api_blocks(page=1):
@@ -627,6 +736,7 @@ def api_block(block_id):
             return jsonify({'error': 'Block not found'}), 404
 
         txs = session.query(Transaction.txid).filter_by(block_id=block.id).all()
+        miner = session.get(Miner, block.miner_id) if block.miner_id else None
 
         return jsonify({
             'hash': block.hash,
@@ -639,68 +749,181 @@ def api_block(block_id):
             'nonce': block.nonce,
             'tx_count': block.tx_count,
             'total_value': format_coin(block.total_value),
+            'total_fees': format_coin(block.total_fees) if block.total_fees is not None else None,
+            'size': block.size,
+            'input_count': block.input_count,
+            'output_count': block.output_count,
+            'miner': miner.name if miner else None,
+            'fee_rate': {
+                'min': block.min_fee_rate,
+                'median': block.median_fee_rate,
+                'max': block.max_fee_rate,
+            },
             'transactions': [t[0] for t in txs]
         })
 
 
+def api_tx_data(tx, detail):
+    inputs = []
+    for inp, prev_out in detail['inputs']:
+        inp_data = {'coinbase': inp.coinbase}
+        if inp.prev_txid:
+            inp_data['txid'] = inp.prev_txid
+            inp_data['vout'] = inp.prev_vout
+            if prev_out:
+                inp_data['address'] = prev_out.address
+                inp_data['value'] = format_coin(prev_out.value)
+        if inp.script_sig:
+            inp_data['script_sig_hex'] = inp.script_sig
+            inp_data['script_sig_asm'] = input_script_asm(inp)
+        inputs.append(inp_data)
+
+    outputs = []
+    for out in detail['outputs']:
+        script_info = output_script_info(out) if out.script_pubkey else {}
+        out_data = {
+            'n': out.vout,
+            'value': format_coin(out.value),
+            'address': out.address,
+            'spent': out.spent,
+            'spent_by_txid': out.spent_by_txid,
+            'script_type': script_info.get('type', 'nonstandard'),
+            'script_label': script_info.get('label', 'Unknown'),
+        }
+        if out.script_pubkey:
+            out_data['script_pubkey_hex'] = out.script_pubkey
+            out_data['script_pubkey_asm'] = output_script_asm(out)
+        outputs.append(out_data)
+
+    is_post_exec = tx.block_height >= SCRIPT_EXEC_HEIGHT if tx.block_height else False
+
+    return {
+        'txid': tx.txid,
+        'confirmed': tx.block_height is not None,
+        'block_hash': tx.block_hash,
+        'block_height': tx.block_height,
+        'is_coinbase': tx.is_coinbase,
+        'is_post_script_exec': is_post_exec,
+        'total_input': format_coin(tx.total_input),
+        'total_output': format_coin(tx.total_output),
+        'fee': format_coin(tx.fee),
+        'size': tx.size,
+        'fee_rate': round(tx.fee / tx.size, 3) if tx.size and not tx.is_coinbase else None,
+        'inputs': inputs,
+        'outputs': outputs
+    }
+
+
+def api_address_data(address, addr, pending=None):
+    pending = pending or {'balance': 0, 'tx_count': 0}
+    unconfirmed = {
+        'unconfirmed_balance': format_coin(pending['balance']),
+        'unconfirmed_tx_count': pending['tx_count']
+    }
+    if not addr:
+        return {
+            'address': address,
+            'total_received': '0',
+            'total_sent': '0',
+            'balance': '0',
+            'tx_count': 0,
+            **unconfirmed
+        }
+
+    return {
+        'address': addr.address,
+        'total_received': format_coin(addr.total_received),
+        'total_sent': format_coin(addr.total_sent),
+        'balance': format_coin(addr.balance),
+        'tx_count': addr.tx_count,
+        'first_seen_block': addr.first_seen_block,
+        'last_seen_block': addr.last_seen_block,
+        **unconfirmed
+    }
+
+
+def get_bulk_items(key):
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get(key), list):
+        return None, (jsonify({'error': f'Missing {key} list'}), 400)
+
+    items = data[key]
+    if not all(isinstance(item, str) for item in items):
+        return None, (jsonify({'error': f'{key} must be a list of strings'}), 400)
+
+    items = list(dict.fromkeys(item.strip() for item in items))
+    if len(items) > config.BULK_LOOKUP_LIMIT:
+        return None, (jsonify({
+            'error': f'Too many {key}: limit is {config.BULK_LOOKUP_LIMIT}'
+        }), 400)
+
+    return items, None
+
+
 @app.route('/api/tx/<txid>')
 def api_transaction(txid):
     with get_session() as session:
-        tx = session.query(Transaction).filter_by(txid=txid).first()
+        tx, detail = load_transaction_or_mempool(session, txid)
         if not tx:
             return jsonify({'error': 'Transaction not found'}), 404
 
-        inputs = []
-        for inp in session.query(TxInput).filter_by(tx_id=tx.id).all():
-            inp_data = {'coinbase': inp.coinbase}
-            if inp.prev_txid:
-                inp_data['txid'] = inp.prev_txid
-                inp_data['vout'] = inp.prev_vout
-                prev_out = session.query(TxOutput).filter_by(
-                    txid=inp.prev_txid, vout=inp.prev_vout
-                ).first()
-                if prev_out:
-                    inp_data['address'] = prev_out.address
-                    inp_data['value'] = format_coin(prev_out.value)
-            if inp.script_sig:
-                inp_data['script_sig_hex'] = inp.script_sig
-                inp_data['script_sig_asm'] = script_to_asm(inp.script_sig)
-            inputs.append(inp_data)
-
-        outputs = []
-        for out in session.query(TxOutput).filter_by(tx_id=tx.id).all():
-            script_info = classify_script(out.script_pubkey) if out.script_pubkey else {}
-            out_data = {
-                'n': out.vout,
-                'value': format_coin(out.value),
-                'address': out.address,
-                'spent': out.spent,
-                'spent_by_txid': out.spent_by_txid,
-                'script_type': script_info.get('type', 'nonstandard'),
-                'script_label': script_info.get('label', 'Unknown'),
-            }
-            if out.script_pubkey:
-                out_data['script_pubkey_hex'] = out.script_pubkey
-                out_data['script_pubkey_asm'] = script_to_asm(out.script_pubkey)
-            outputs.append(out_data)
+        return jsonify(api_tx_data(tx, detail))
 
-        is_post_exec = tx.block_height >= SCRIPT_EXEC_HEIGHT if tx.block_height else False
+
+@app.route('/api/txs', methods=['POST'])
+@limiter.limit('heavy')
+def api_transactions_bulk():
+    txids, error = get_bulk_items('txids')
+    if error:
+        return error
+
+    with get_session() as session:
+        found = load_transactions(session, txids)
+        details = load_transaction_details(session, list(found.values()))
+        data = {txid: api_tx_data(tx, details[tx.id]) for txid, tx in found.items()}
+
+        missing = [txid for txid in txids if txid not in found]
+        for txid, mtx in load_mempool_transactions(session, missing).items():
+            data[txid] = api_tx_data(*mempool_transaction_details(mtx))
 
         return jsonify({
-            'txid': tx.txid,
-            'block_hash': tx.block_hash,
-            'block_height': tx.block_height,
-            'is_coinbase': tx.is_coinbase,
-            'is_post_script_exec': is_post_exec,
-            'total_input': format_coin(tx.total_input),
-            'total_output': format_coin(tx.total_output),
-            'fee': format_coin(tx.fee),
-            'inputs': inputs,
-            'outputs': outputs
+            'transactions': [data[txid] for txid in txids if txid in data],
+            'not_found': [txid for txid in txids if txid not in data]
         })
 
 
+@app.route('/api/export/<kind>')
+def api_export(kind):
+    if kind not in EXPORTERS:
+        abort(404)
+
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    if start is None or end is None or start < 0 or end < start:
+        return jsonify({'error': 'start and end heights are required, with start <= end'}), 400
+
+    # The export limit has to cover the stream, not just this view, so the
+    # permit is released when the generator finishes. call_on_close covers
+    # a response that is closed before streaming starts.
+    permit = limiter.acquire('export')
+    if permit is None:
+        return busy_response('export')
+
+    def generate():
+        session = SessionFactory()
+        try:
+            yield from iter_ndjson(session, kind, start, end)
+        finally:
+            session.close()
+            permit.release()
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(permit.release)
+    return response
+
+
 @app.route('/api/decodescript', methods=['POST'])
+@limiter.limit('rpc')
 def api_decodescript():
     data = request.get_json()
     if not data or 'hex' not in data:
@@ -745,23 +968,243 @@ def api_decodescript():
 def api_address(address):
     with get_session() as session:
         addr = session.query(Address).filter_by(address=address).first()
-        if not addr:
-            return jsonify({
-                'address': address,
-                'total_received': '0',
-                'total_sent': '0',
-                'balance': '0',
-                'tx_count': 0
-            })
+        pending = load_mempool_balances(session, [address])
+        return jsonify(api_address_data(address, addr, pending.get(address)))
+
+
+@app.route('/api/address/<address>/utxos')
+def api_address_utxos(address):
+    limit = max(1, min(request.args.get('limit', 100, type=int), config.UTXO_PAGE_LIMIT))
+    minconf = max(1, request.args.get('minconf', 1, type=int))
+    cursor = request.args.get('cursor', 0, type=int)
 
+    with get_session() as session:
+        synced = int(read_chain_state(session, 'synced_height') or 0)
+        max_height = synced - minconf + 1
+        addr = session.query(Address).filter_by(address=address).first()
+        total = 0
+        rows = []
+        if addr:
+            # The balance is the sum of all confirmed unspent outputs, so only
+            # outputs newer than minconf allows need to be summed and removed.
+            total = addr.balance
+            if minconf > 1:
+                total -= unspent_value_above(session, address, max_height)
+            rows = load_unspent_outputs(session, address, max_height, cursor, limit + 1)
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'address': address,
+            'height': synced,
+            'minconf': minconf,
+            'total_value': format_coin(total),
+            'utxos': [{
+                'txid': out.txid,
+                'vout': out.vout,
+                'value': format_coin(out.value),
+                'script_pubkey': out.script_pubkey,
+                'height': height,
+                'confirmations': synced - height + 1,
+            } for out, height in rows],
+            'next_cursor': rows[-1][0].id if more else None,
+        })
+
+
+@app.route('/api/address/<address>/balance')
+def api_address_balance(address):
+    with get_session() as session:
+        synced = int(read_chain_state(session, 'synced_height') or 0)
+        height = request.args.get('height', synced, type=int)
+        row = balance_at(session, address, height)
+        return jsonify({
+            'address': address,
+            'height': height,
+            'balance': format_coin(row.balance if row else 0),
+            'tx_count': row.tx_count if row else 0,
+            'last_change_height': row.height if row else None,
+        })
+
+
+@app.route('/api/address/<address>/history')
+def api_address_history(address):
+    points = min(request.args.get('points', 200, type=int), config.CHART_MAX_POINTS)
+    with get_session() as session:
+        synced = int(read_chain_state(session, 'synced_height') or 0)
+        start = max(0, request.args.get('start', 0, type=int))
+        end = min(request.args.get('end', synced, type=int), synced)
+        if end < start:
+            return jsonify({'error': 'end must not be below start'}), 400
+        series = balance_series(session, address, start, end, max(1, points))
+    for point in series:
+        point['balance'] = format_coin(point['balance_sat'])
+    return jsonify({'address': address, 'start': start, 'end': end, 'points': series})
+
+
+@app.route('/api/charts/<period>')
+def api_charts(period):
+    if period not in PERIODS:
+        return jsonify({'error': f'Unknown period, use one of: {", ".join(PERIODS)}'}), 400
+
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    limit = min(request.args.get('limit', config.CHART_MAX_POINTS, type=int), config.CHART_MAX_POINTS)
+
+    with get_session() as session:
+        points = load_series(session, period, start, end, max(1, limit))
+    return jsonify({'period': period, 'points': points})
+
+
+@app.route('/api/miners')
+def api_miners():
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f'Unknown period, use one of: {", ".join(PERIODS)}'}), 400
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    limit = max(1, min(request.args.get('limit', 100, type=int), config.RICH_LIST_SIZE))
+
+    with get_session() as session:
+        distribution = miner_distribution(session, period, start, end, limit)
+    return jsonify({'period': period, 'start': start, 'end': end, **distribution})
+
+
+@app.route('/api/miner/<name>/blocks')
+def api_miner_blocks(name):
+    before = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', config.ITEMS_PER_PAGE, type=int),
+                       config.ITEMS_PER_PAGE))
+
+    with get_session() as session:
+        miner = session.query(Miner).filter_by(name=name).first()
+        if not miner:
+            return jsonify({'error': 'Miner not found'}), 404
+        blocks_list = miner_blocks(session, miner.id, before, limit)
+        return jsonify({
+            'miner': miner.name,
+            'is_pool': miner.is_pool,
+            'blocks': [{
+                'height': b.height,
+                'hash': b.hash,
+                'timestamp': b.timestamp,
+                'tx_count': b.tx_count,
+                'total_fees': format_coin(b.total_fees),
+            } for b in blocks_list],
+            'next_before': blocks_list[-1].height if len(blocks_list) == limit else None,
+        })
+
+
+@app.route('/api/opreturn')
+def api_opreturn():
+    hex_prefix = request.args.get('hex', '').strip()
+    query = request.args.get('q', '').strip()
+    before = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', config.ITEMS_PER_PAGE, type=int),
+                       config.ITEMS_PER_PAGE))
+    if hex_prefix and not is_hex_query(hex_prefix):
+        return jsonify({'error': 'hex must be hexadecimal'}), 400
+
+    with get_session() as session:
+        rows = load_nulldata(session, hex_prefix or None, query or None, before, limit)
+        return jsonify({
+            'outputs': [{
+                'height': row.height,
+                'txid': row.txid,
+                'vout': row.vout,
+                'data_hex': row.data,
+                'data_text': row.data_text,
+            } for row in rows],
+            'next_before': rows[-1].id if len(rows) == limit else None,
+        })
+
+
+@app.route('/api/opcodes')
+def api_opcodes():
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f'Unknown period, use one of: {", ".join(PERIODS)}'}), 400
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+
+    with get_session() as session:
+        totals = opcode_totals(session, period, start, end)
+    return jsonify({'activation_height': SCRIPT_EXEC_HEIGHT, 'opcodes': totals})
+
+
+def lookup_opcode(name):
+    name = name.upper()
+    return BY_NAME.get(name if name.startswith('OP_') else f'OP_{name}')
+
+
+@app.route('/api/opcodes/<name>/uses')
+def api_opcode_uses(name):
+    opcode = lookup_opcode(name)
+    if opcode is None:
+        return jsonify({'error': f'Untracked opcode, use one of: {", ".join(BY_NAME)}'}), 404
+    kind = request.args.get('kind')
+    if kind not in (None, 'input', 'output'):
+        return jsonify({'error': 'kind must be input or output'}), 400
+    since = request.args.get('since', 0, type=int)
+    limit = max(1, min(request.args.get('limit', config.ITEMS_PER_PAGE, type=int),
+                       config.ITEMS_PER_PAGE))
+    try:
+        cursor = parse_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    with get_session() as session:
+        uses = load_uses(session, opcode, since, kind, cursor, limit)
+        return jsonify({
+            'opcode': TRACKED[opcode],
+            'since': since,
+            'uses': [{
+                'height': use.height,
+                'txid': use.txid,
+                'kind': 'input' if use.is_input else 'output',
+                'n': use.n,
+            } for use in uses],
+            'next_cursor': f'{uses[-1].height}:{uses[-1].id}' if len(uses) == limit else None,
+        })
+
+
+@app.route('/api/opcodes/<name>/<period>')
+def api_opcode_series(name, period):
+    opcode = lookup_opcode(name)
+    if opcode is None:
+        return jsonify({'error': f'Untracked opcode, use one of: {", ".join(BY_NAME)}'}), 404
+    if period not in PERIODS:
+        return jsonify({'error': f'Unknown period, use one of: {", ".join(PERIODS)}'}), 400
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    limit = min(request.args.get('limit', config.CHART_MAX_POINTS, type=int), config.CHART_MAX_POINTS)
+
+    with get_session() as session:
+        points = opcode_series(session, opcode, period, start, end, max(1, limit))
+    return jsonify({'period': period, 'points': points})
+
+
+@app.route('/api/richlist')
+def api_rich_list():
+    return jsonify(api_ranking_data(load_ranking('rich_list')))
+
+
+@app.route('/api/active')
+def api_top_active():
+    return jsonify(api_ranking_data(load_ranking('top_active')))
+
+
+@app.route('/api/addresses', methods=['POST'])
+@limiter.limit('heavy')
+def api_addresses_bulk():
+    addresses, error = get_bulk_items('addresses')
+    if error:
+        return error
+
+    with get_session() as session:
+        found = load_addresses(session, addresses)
+        pending = load_mempool_balances(session, addresses)
         return jsonify({
-            'address': addr.address,
-            'total_received': format_coin(addr.total_received),
-            'total_sent': format_coin(addr.total_sent),
-            'balance': format_coin(addr.balance),
-            'tx_count': addr.tx_count,
-            'first_seen_block': addr.first_seen_block,
-            'last_seen_block': addr.last_seen_block
+            'addresses': [api_address_data(a, found.get(a), pending.get(a)) for a in addresses]
         })
 
 
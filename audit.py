@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Audit the explorer database against bitokd, its own tables or another database.
+
+Without options the tip is checked: the stored block hash against the
+node, and the supply against gettxoutsetinfo when the node has it. Both
+read one stored row, so any height costs the same. --tables also
+recomputes the commitment from tx_outputs, a full table scan. --bisect
+narrows a mismatch of the stored rows down to the first diverging block.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import func
+
+from config import Config
+from models import connect_db, UtxoCommitment
+from rpc_client import BitokRPC
+from utxo_commitment import commitment_from_tables, rebuild_commitments, stored_commitment
+
+COIN = 100000000
+
+
+def tip_height(session):
+    return session.query(func.max(UtxoCommitment.height)).scalar()
+
+
+def bisect(lo, hi, matches):
+    """Return the first height in [lo, hi] for which matches() is False,
+    assuming every height after a mismatch also mismatches."""
+    if matches(hi):
+        return None
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if matches(mid):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def describe(row):
+    return (f'height={row.height} hash={row.block_hash} utxo_hash={row.utxo_hash} '
+            f'utxos={row.utxo_count} supply={row.supply / COIN:.8f} txs={row.tx_count}')
+
+
+def check_tables(session, height):
+    row = stored_commitment(session, height)
+    if not row:
+        return False
+    recomputed = commitment_from_tables(session, height).values()
+    return all(getattr(row, key) == value for key, value in recomputed.items())
+
+
+def check_node(session, rpc, height):
+    row = stored_commitment(session, height)
+    return row is not None and row.block_hash == rpc.getblockhash(height)
+
+
+def check_other(session, other, height):
+    a = stored_commitment(session, height)
+    b = stored_commitment(other, height)
+    return (a is not None and b is not None and a.block_hash == b.block_hash
+            and a.utxo_hash == b.utxo_hash and a.supply == b.supply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--height', type=int, help='height to check (default: tip)')
+    parser.add_argument('--bisect', action='store_true',
+                        help='find the first block where a check fails')
+    parser.add_argument('--against', metavar='DATABASE_URL',
+                        help='compare commitments with another explorer database')
+    parser.add_argument('--tables', action='store_true',
+                        help='also recompute the UTXO set from tx_outputs (scans the table)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='recompute all commitments from the tables')
+    args = parser.parse_args()
+
+    config = Config()
+    engine, SessionFactory = connect_db(config.DATABASE_URL)
+    session = SessionFactory()
+    try:
+        if args.rebuild:
+            rebuild_commitments(session, log=print)
+            session.commit()
+            return 0
+
+        tip = tip_height(session)
+        if tip is None:
+            print('No UTXO commitments stored; run audit.py --rebuild')
+            return 1
+        height = tip if args.height is None else args.height
+        row = stored_commitment(session, height)
+        if not row:
+            print(f'No commitment stored at height {height}')
+            return 1
+        print(describe(row))
+
+        checks = []
+        if args.against:
+            other_engine, OtherSession = connect_db(args.against)
+            other = OtherSession()
+            checks.append(('other database', lambda h: check_other(session, other, h)))
+        else:
+            rpc = BitokRPC(host=config.RPC_HOST, port=config.RPC_PORT,
+                           user=config.RPC_USER, password=config.RPC_PASSWORD)
+            try:
+                rpc.getblockhash(height)
+                checks.append(('node block hash', lambda h: check_node(session, rpc, h)))
+            except Exception as e:
+                print(f'node: unavailable ({e})')
+            if height == tip and checks:
+                try:
+                    info = rpc.gettxoutsetinfo()
+                    node_supply = round(info['total_amount'] * COIN)
+                    print(f'node: utxos={info.get("txouts")} supply={info["total_amount"]:.8f} '
+                          f'({"match" if node_supply == row.supply else "MISMATCH"})')
+                except Exception:
+                    print('node: gettxoutsetinfo not supported, supply not compared')
+
+        failed = False
+        for name, check in checks:
+            ok = check(height)
+            print(f'{name}: {"ok" if ok else "MISMATCH"}')
+            if ok:
+                continue
+            failed = True
+            if args.bisect:
+                first = bisect(0, height, check)
+                print(f'{name}: first divergence at height {first}')
+                first_row = stored_commitment(session, first)
+                if first_row:
+                    print('  ' + describe(first_row))
+
+        if args.tables:
+            # A full scan per call, so it is never bisected.
+            ok = check_tables(session, height)
+            print(f'tables: {"ok" if ok else "MISMATCH"}')
+            failed = failed or not ok
+        return 1 if failed else 0
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
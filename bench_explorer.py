@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark: sync a synthetic chain, then time the main routes.
+
+A deterministic chain (see synthetic_chain.py) is served over JSON-RPC from
+this process. Each database target is benchmarked in its own subprocess,
+which syncs the chain with BlockchainSync and then requests the main pages
+and API routes with the Flask test client. Reported per target: blocks/s,
+tx/s, peak RSS of the worker, and per route the p50/p99 latency and the
+number of SQL queries (flagged when a statement repeats, see
+query_profiler.py).
+
+    python bench_explorer.py --blocks 2000 --txs-per-block 20
+    python bench_explorer.py --postgres postgresql://bench@localhost/bench_explorer --reset
+
+The SQLite target uses a temporary file. PostgreSQL targets must be empty
+databases unless --reset is given, which drops the explorer tables first.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_bitokd import add_chain_arguments, chain_from_args, serve
+
+ROUTES = [
+    '/',
+    '/blocks',
+    '/block/{height}',
+    '/tx/{txid}',
+    '/address/{address}',
+    '/search?q={txid_prefix}',
+    '/api/home',
+    '/api/blocks',
+    '/api/block/{height}',
+    '/api/tx/{txid}',
+    '/api/address/{address}',
+    '/api/richlist',
+    '/api/charts/day',
+]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def route_samples(session):
+    from models import Block, Transaction, TxOutput
+
+    tip = session.query(Block.height).order_by(Block.height.desc()).first()[0]
+    height = tip // 2
+    tx = session.query(Transaction).filter(
+        Transaction.block_height == height
+    ).order_by(Transaction.id.desc()).first()
+    address = session.query(TxOutput.address).filter(
+        TxOutput.tx_id == tx.id, TxOutput.address != None
+    ).first()
+    return {
+        'height': height,
+        'txid': tx.txid,
+        'txid_prefix': tx.txid[:12],
+        'address': address[0] if address else '',
+    }
+
+
+def run_worker(args):
+    """Benchmark one database; runs in a subprocess with the environment set up."""
+    from config import Config
+    from models import Base, Block, Transaction, init_db
+    from rpc_client import BitokRPC
+    from sync import BlockchainSync
+
+    config = Config()
+    engine, Session = init_db(config.DATABASE_URL)
+    session = Session()
+    if args.reset:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    elif session.query(Block).first() is not None:
+        print(f'{config.DATABASE_URL} is not empty; use --reset to drop the explorer tables',
+              file=sys.stderr)
+        return 1
+    session.close()
+
+    rpc = BitokRPC(host=config.RPC_HOST, port=config.RPC_PORT)
+    syncer = BlockchainSync(rpc, Session, config)
+    start = time.perf_counter()
+    if not syncer.sync():
+        print('Sync failed', file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    rss_sync = peak_rss_mb()
+
+    session = Session()
+    blocks = session.query(Block).count()
+    txs = session.query(Transaction).count()
+    samples = route_samples(session)
+    session.close()
+
+    import app as explorer
+    client = explorer.app.test_client()
+    routes = {}
+    for template in ROUTES:
+        url = template.format(**samples)
+        client.get(url)
+        timings = []
+        response = None
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - t0) * 1000)
+        routes[template] = {
+            'status': response.status_code,
+            'queries': int(response.headers.get('X-DB-Queries', 0)),
+            'repeated': int(response.headers.get('X-DB-Repeated', 0)),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+        }
+
+    print(json.dumps({
+        'blocks': blocks,
+        'txs': txs,
+        'sync_seconds': round(elapsed, 2),
+        'blocks_per_sec': round(blocks / elapsed, 1),
+        'txs_per_sec': round(txs / elapsed, 1),
+        'peak_rss_sync_mb': round(rss_sync, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'routes': routes,
+    }))
+    return 0
+
+
+def run_target(name, database_url, port, args):
+    env = dict(os.environ,
+               DATABASE_URL=database_url,
+               BITOK_RPC_HOST='127.0.0.1',
+               BITOK_RPC_PORT=str(port),
+               MEMPOOL_ENABLED='false',
+               QUERY_PROFILING='true',
+               QUERY_PROFILE_LOG_MS='1e9')
+    command = [sys.executable, os.path.abspath(__file__), '--worker',
+               '--requests', str(args.requests)]
+    if args.reset:
+        command.append('--reset')
+    print(f'[{name}] syncing...', flush=True)
+    proc = subprocess.run(command, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f'[{name}] failed:\n{proc.stderr[-2000:]}')
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def report(name, result):
+    print(f'\n== {name} ==')
+    print(f'sync: {result["blocks"]} blocks, {result["txs"]} txs in {result["sync_seconds"]}s '
+          f'-> {result["blocks_per_sec"]} blocks/s, {result["txs_per_sec"]} tx/s, '
+          f'peak RSS {result["peak_rss_sync_mb"]} MB')
+    print(f'{"route":<28} {"status":>6} {"queries":>8} {"p50 ms":>9} {"p99 ms":>9}')
+    for route, stats in result['routes'].items():
+        flag = '  N+1?' if stats['repeated'] else ''
+        print(f'{route:<28} {stats["status"]:>6} {stats["queries"]:>8} '
+              f'{stats["p50_ms"]:>9.2f} {stats["p99_ms"]:>9.2f}{flag}')
+    print(f'peak RSS after requests: {result["peak_rss_mb"]} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_chain_arguments(parser)
+    parser.add_argument('--requests', type=int, default=50, help='requests per route')
+    parser.add_argument('--postgres', action='append', default=[], metavar='DATABASE_URL',
+                        help='also benchmark this PostgreSQL database (repeatable)')
+    parser.add_argument('--no-sqlite', action='store_true', help='skip the SQLite target')
+    parser.add_argument('--reset', action='store_true',
+                        help='drop and recreate the explorer tables in each target first')
+    parser.add_argument('--json', metavar='FILE', help='also write the results as JSON')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    start = time.perf_counter()
+    chain = chain_from_args(args)
+    print(f'Generated {len(chain.blocks)} blocks, {chain.tx_count()} transactions '
+          f'in {time.perf_counter() - start:.1f}s')
+    server = serve(chain)
+    port = server.server_address[1]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = []
+        if not args.no_sqlite:
+            targets.append(('sqlite', f'sqlite:///{os.path.join(tmp, "bench.db")}'))
+        for i, url in enumerate(args.postgres):
+            targets.append((f'postgres{i or ""}', url))
+        for name, url in targets:
+            result = run_target(name, url, port, args)
+            if result:
+                results[name] = result
+                report(name, result)
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'chain': {'blocks': args.blocks, 'txs_per_block': args.txs_per_block,
+                                 'inputs': args.inputs, 'outputs': args.outputs,
+                                 'script_mix': args.script_mix, 'seed': args.seed},
+                       'results': results}, f, indent=2)
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
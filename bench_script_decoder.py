@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: template fast path vs full tokenizer in classify_script"""
+
+import random
+import sys
+import timeit
+
+from script_decoder import classify_script, classify_script_bytes, classify_script_tokenized
+
+
+def sample_scripts(count, seed=1):
+    rnd = random.Random(seed)
+    scripts = []
+    for i in range(count):
+        roll = rnd.random()
+        if roll < 0.80:
+            scripts.append('76a914' + rnd.randbytes(20).hex() + '88ac')
+        elif roll < 0.90:
+            scripts.append('41' + '04' + rnd.randbytes(64).hex() + 'ac')
+        elif roll < 0.93:
+            scripts.append('21' + '02' + rnd.randbytes(32).hex() + 'ac')
+        elif roll < 0.96:
+            keys = ''.join('21' + '03' + rnd.randbytes(32).hex() for _ in range(3))
+            scripts.append('52' + keys + '53ae')
+        elif roll < 0.98:
+            payload = b'explorer benchmark %d' % i
+            scripts.append('6a' + '%02x' % len(payload) + payload.hex())
+        else:
+            scripts.append('7e7e' + '14' + rnd.randbytes(20).hex() + '87')
+    return scripts
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    scripts = sample_scripts(count)
+    raw_scripts = [bytes.fromhex(s) for s in scripts]
+
+    mismatches = sum(
+        1 for s in scripts if classify_script(s) != classify_script_tokenized(s)
+    )
+
+    def run_tokenized():
+        for s in scripts:
+            classify_script_tokenized(s)
+
+    def run_fast():
+        for s in scripts:
+            classify_script(s)
+
+    def run_fast_bytes():
+        for raw in raw_scripts:
+            classify_script_bytes(memoryview(raw))
+
+    print(f"Classifying {count} scripts (80% P2PKH, 13% P2PK, 7% multisig/OP_RETURN/custom), best of {repeat}")
+    print("-" * 50)
+    baseline = min(timeit.repeat(run_tokenized, number=1, repeat=repeat))
+    print(f"tokenized (hex):   {baseline * 1e6 / count:8.2f} us/script")
+    for label, fn in (('fast path (hex):', run_fast), ('fast path (bytes):', run_fast_bytes)):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print(f"{label:<18} {best * 1e6 / count:8.2f} us/script  ({baseline / best:.1f}x)")
+    print("-" * 50)
+    print(f"Result mismatches vs tokenizer: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Read blocks straight from bitokd's block files.
+
+bitokd appends every block it accepts to blkNNNN.dat in its data directory
+as <magic><uint32 size><serialized block>, including blocks that later lose
+a reorg. BlockFileIndex memory-maps the files and indexes every record by
+header hash. The best chain is found by walking prev links back from the
+node's tip and checking the result against getblockhash. BlockFileSource
+then serves that chain to BlockchainSync in place of the RPC client, so an
+initial sync reads from disk instead of making several RPC calls per block.
+"""
+
+import glob
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+COIN = 100000000
+HEADER_SIZE = 80
+NULL_HASH = '0' * 64
+CHECKPOINT_INTERVAL = 1000
+
+
+def sha256d(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def hash_hex(data: bytes) -> str:
+    """Display form of a double-SHA256 hash (byte-reversed hex)."""
+    return sha256d(data)[::-1].hex()
+
+
+def read_varint(buf, pos: int) -> Tuple[int, int]:
+    first = buf[pos]
+    if first < 0xfd:
+        return first, pos + 1
+    if first == 0xfd:
+        return struct.unpack_from('<H', buf, pos + 1)[0], pos + 3
+    if first == 0xfe:
+        return struct.unpack_from('<I', buf, pos + 1)[0], pos + 5
+    return struct.unpack_from('<Q', buf, pos + 1)[0], pos + 9
+
+
+def write_varint(n: int) -> bytes:
+    if n < 0xfd:
+        return bytes([n])
+    if n <= 0xffff:
+        return b'\xfd' + struct.pack('<H', n)
+    if n <= 0xffffffff:
+        return b'\xfe' + struct.pack('<I', n)
+    return b'\xff' + struct.pack('<Q', n)
+
+
+def parse_tx(buf, pos: int) -> Tuple[Dict, int]:
+    """Decode one transaction at ``pos`` into the getrawtransaction shape."""
+    start = pos
+    version = struct.unpack_from('<i', buf, pos)[0]
+    pos += 4
+
+    vin = []
+    count, pos = read_varint(buf, pos)
+    for _ in range(count):
+        prev_hash = bytes(buf[pos:pos + 32])
+        prev_n = struct.unpack_from('<I', buf, pos + 32)[0]
+        size, pos = read_varint(buf, pos + 36)
+        script = bytes(buf[pos:pos + size]).hex()
+        pos += size
+        sequence = struct.unpack_from('<I', buf, pos)[0]
+        pos += 4
+        if prev_n == 0xffffffff and prev_hash == b'\x00' * 32:
+            vin.append({'coinbase': script, 'sequence': sequence})
+        else:
+            vin.append({'txid': prev_hash[::-1].hex(), 'vout': prev_n,
+                        'scriptSig': script, 'sequence': sequence})
+
+    vout = []
+    count, pos = read_varint(buf, pos)
+    for n in range(count):
+        value = struct.unpack_from('<q', buf, pos)[0]
+        size, pos = read_varint(buf, pos + 8)
+        vout.append({'value': value / COIN, 'n': n,
+                     'scriptPubKey': bytes(buf[pos:pos + size]).hex()})
+        pos += size
+
+    locktime = struct.unpack_from('<I', buf, pos)[0]
+    pos += 4
+    return {
+        'txid': hash_hex(bytes(buf[start:pos])),
+        'version': version,
+        'locktime': locktime,
+        'size': pos - start,
+        'vin': vin,
+        'vout': vout,
+    }, pos
+
+
+def serialize_tx(tx: Dict) -> bytes:
+    parts = [struct.pack('<i', tx.get('version', 1)), write_varint(len(tx['vin']))]
+    for vin in tx['vin']:
+        if 'coinbase' in vin:
+            prev, n, script = b'\x00' * 32, 0xffffffff, bytes.fromhex(vin['coinbase'])
+        else:
+            prev, n, script = bytes.fromhex(vin['txid'])[::-1], vin['vout'], bytes.fromhex(vin['scriptSig'])
+        parts += [prev, struct.pack('<I', n), write_varint(len(script)), script,
+                  struct.pack('<I', vin.get('sequence', 0xffffffff))]
+    parts.append(write_varint(len(tx['vout'])))
+    for out in tx['vout']:
+        script = bytes.fromhex(out['scriptPubKey'])
+        parts += [struct.pack('<q', round(out['value'] * COIN)), write_varint(len(script)), script]
+    parts.append(struct.pack('<I', tx.get('locktime', 0)))
+    return b''.join(parts)
+
+
+def merkle_root(txids: List[str]) -> str:
+    level = [bytes.fromhex(txid)[::-1] for txid in txids]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [sha256d(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0][::-1].hex() if level else NULL_HASH
+
+
+def parse_header(buf, pos: int = 0) -> Dict:
+    version, prev, merkle, timestamp, bits, nonce = struct.unpack_from('<i32s32sIII', buf, pos)
+    return {
+        'hash': hash_hex(bytes(buf[pos:pos + HEADER_SIZE])),
+        'version': version,
+        'previousblockhash': prev[::-1].hex(),
+        'merkleroot': merkle[::-1].hex(),
+        'time': timestamp,
+        'bits': bits,
+        'nonce': nonce,
+    }
+
+
+def serialize_header(block: Dict) -> bytes:
+    return struct.pack('<i32s32sIII', block['version'],
+                       bytes.fromhex(block['previousblockhash'])[::-1],
+                       bytes.fromhex(block['merkleroot'])[::-1],
+                       block['time'], block['bits'], block['nonce'])
+
+
+def parse_block(buf) -> Tuple[Dict, List[Dict]]:
+    block = parse_header(buf)
+    count, pos = read_varint(buf, HEADER_SIZE)
+    txs = []
+    for _ in range(count):
+        tx, pos = parse_tx(buf, pos)
+        txs.append(tx)
+    block['tx'] = [tx['txid'] for tx in txs]
+    return block, txs
+
+
+def block_file_paths(datadir: str) -> List[str]:
+    paths = glob.glob(os.path.join(datadir, 'blk[0-9]*.dat'))
+    paths += glob.glob(os.path.join(datadir, 'blocks', 'blk[0-9]*.dat'))
+    return sorted(paths)
+
+
+def write_block_file(path: str, raw_blocks: List[bytes], magic: bytes):
+    """Write blocks in bitokd's on-disk record format (used for test fixtures)."""
+    with open(path, 'wb') as f:
+        for raw in raw_blocks:
+            f.write(magic + struct.pack('<I', len(raw)) + raw)
+
+
+class BlockFileIndex:
+    def __init__(self, datadir: str, magic: Optional[bytes] = None):
+        self.paths = block_file_paths(datadir)
+        if not self.paths:
+            raise FileNotFoundError(f'No blk*.dat files in {datadir}')
+        self.maps = []
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                self.maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b'')
+        # Every block file starts with a record, so the first four bytes are the magic.
+        self.magic = magic or bytes(self.maps[0][:4])
+        # block hash -> (prev hash, file number, offset, size)
+        self.headers: Dict[str, Tuple[str, int, int, int]] = {}
+        for file_no, data in enumerate(self.maps):
+            self.scan(file_no, data)
+
+    def scan(self, file_no: int, data):
+        pos = 0
+        end = len(data)
+        while pos + 8 <= end:
+            if data[pos:pos + 4] != self.magic:
+                # Preallocated zero padding or a torn write: resync on the next magic.
+                pos = data.find(self.magic, pos + 1)
+                if pos < 0:
+                    break
+                continue
+            size = struct.unpack_from('<I', data, pos + 4)[0]
+            start = pos + 8
+            if size < HEADER_SIZE or start + size > end:
+                pos += 1
+                continue
+            header = bytes(data[start:start + HEADER_SIZE])
+            prev = header[4:36][::-1].hex()
+            self.headers[hash_hex(header)] = (prev, file_no, start, size)
+            pos = start + size
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self.headers
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def chain_to(self, tip_hash: str) -> List[str]:
+        """Hashes from genesis to ``tip_hash`` following prev links; index = height."""
+        chain = []
+        block_hash = tip_hash
+        while block_hash != NULL_HASH:
+            entry = self.headers.get(block_hash)
+            if entry is None:
+                raise ValueError(f'Block {block_hash} (height {len(chain)} below the tip) '
+                                 f'is not in the block files')
+            chain.append(block_hash)
+            block_hash = entry[0]
+        chain.reverse()
+        return chain
+
+    def read_block(self, block_hash: str):
+        prev, file_no, start, size = self.headers[block_hash]
+        return memoryview(self.maps[file_no])[start:start + size]
+
+    def close(self):
+        for data in self.maps:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def verify_chain(chain: List[str], rpc, interval: int = CHECKPOINT_INTERVAL):
+    """Compare the file chain with getblockhash every ``interval`` heights and at the tip."""
+    heights = list(range(0, len(chain), interval))
+    if heights[-1] != len(chain) - 1:
+        heights.append(len(chain) - 1)
+    for height in heights:
+        node_hash = rpc.getblockhash(height)
+        if node_hash != chain[height]:
+            raise ValueError(f'Block files disagree with the node at height {height}: '
+                             f'{chain[height]} vs {node_hash}')
+
+
+class BlockFileSource:
+    """The subset of BitokRPC that BlockchainSync uses, served from block files.
+
+    Transactions are decoded when their block is requested and kept until
+    the next block, which is all sync_block needs.
+    """
+
+    def __init__(self, index: BlockFileIndex, chain: List[str], rpc=None):
+        self.index = index
+        self.chain = chain
+        self.heights = {block_hash: height for height, block_hash in enumerate(chain)}
+        self.rpc = rpc
+        self.txs: Dict[str, Dict] = {}
+
+    def is_connected(self) -> bool:
+        return True
+
+    def getblocknumber(self) -> int:
+        return len(self.chain) - 1
+
+    def getblockcount(self) -> int:
+        return len(self.chain) - 1
+
+    def getblockhash(self, height: int) -> str:
+        return self.chain[height]
+
+    def getblock(self, block_hash: str) -> Dict:
+        block, txs = parse_block(self.index.read_block(block_hash))
+        block['height'] = self.heights[block_hash]
+        self.txs = {tx['txid']: tx for tx in txs}
+        return block
+
+    def getrawtransaction(self, txid: str, verbose: int = 1) -> Dict:
+        tx = self.txs.get(txid)
+        if tx is None:
+            raise Exception(f'Transaction {txid} is not in the current block')
+        return tx
+
+    def gettransaction(self, txid: str) -> Dict:
+        return self.getrawtransaction(txid)
+
+    def getinfo(self) -> Dict:
+        if self.rpc is None:
+            raise Exception('No node connection')
+        return self.rpc.getinfo()
@@ -0,0 +1,99 @@
+"""Wake the syncer when bitokd sees a new block.
+
+The syncer binds a Unix datagram socket (SYNC_NOTIFY_SOCKET) and waits on
+it between polls. bitokd's -blocknotify hook runs ``sync.py --notify %s``,
+which sends one datagram and exits without waiting, so a stopped syncer
+never holds up the node.
+"""
+
+import logging
+import os
+import socket
+import stat
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlockNotifyListener:
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        # Any local user may wake the syncer; the worst it can do is start a sync early.
+        os.chmod(path, 0o666)
+
+    def wait(self, timeout: float) -> Optional[str]:
+        """Block until a notification arrives or ``timeout`` passes.
+
+        Returns the last message received (usually a block hash), or None
+        on timeout. Notifications queued meanwhile are drained so a burst
+        of blocks triggers one sync.
+        """
+        self.sock.settimeout(max(timeout, 0))
+        try:
+            message = self.sock.recv(256)
+        except socket.timeout:
+            return None
+        self.sock.setblocking(False)
+        try:
+            while True:
+                message = self.sock.recv(256)
+        except BlockingIOError:
+            pass
+        return message.decode(errors='replace').strip() or 'notify'
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def send_notify(path: str, message: str = '') -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sock.sendto(message.encode() or b'notify', path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class SyncWaiter:
+    """Decides when the continuous sync loop runs next.
+
+    Without a listener this is the old fixed sleep. With one, a block
+    notification syncs immediately and ``fallback`` seconds of silence
+    force a sync anyway, while ``interval`` still paces mempool updates.
+    """
+
+    def __init__(self, listener: Optional[BlockNotifyListener], interval: float,
+                 fallback: float):
+        self.listener = listener
+        self.interval = interval
+        self.fallback = fallback
+        self.last_sync = 0.0
+
+    def sync_due(self) -> bool:
+        return self.listener is None or time.monotonic() - self.last_sync >= self.fallback
+
+    def synced(self):
+        self.last_sync = time.monotonic()
+
+    def wait(self) -> bool:
+        """Sleep until the next loop iteration; True if a block was announced."""
+        if self.listener is None:
+            time.sleep(self.interval)
+            return False
+        message = self.listener.wait(self.interval)
+        if message:
+            logger.debug(f'Block notification: {message}')
+            return True
+        return False
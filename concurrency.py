@@ -0,0 +1,72 @@
+import functools
+import threading
+from typing import Dict, Optional
+
+from flask import jsonify, render_template, request
+
+from config import Config
+
+
+class EndpointLimiter:
+    """Per-endpoint-class concurrency limits.
+
+    Each class gets its own semaphore, so a burst of slow requests in one
+    class is turned away with 503 instead of occupying every worker thread.
+    """
+
+    def __init__(self, limits: Dict[str, int], wait_timeout: float = 1.0):
+        self.wait_timeout = wait_timeout
+        self._semaphores = {
+            name: threading.BoundedSemaphore(size)
+            for name, size in limits.items() if size > 0
+        }
+
+    def acquire(self, endpoint_class: str) -> Optional['Permit']:
+        """Take a slot for a response that outlives its view, e.g. a stream.
+
+        Returns None when the class is saturated. The caller releases the
+        permit once the response is finished.
+        """
+        semaphore = self._semaphores.get(endpoint_class)
+        if semaphore is not None and not semaphore.acquire(timeout=self.wait_timeout):
+            return None
+        return Permit(semaphore)
+
+    def limit(self, endpoint_class: str):
+        def decorator(view):
+            semaphore = self._semaphores.get(endpoint_class)
+            if semaphore is None:
+                return view
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not semaphore.acquire(timeout=self.wait_timeout):
+                    return busy_response(endpoint_class)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    semaphore.release()
+            return wrapper
+        return decorator
+
+
+class Permit:
+    """A slot held in an endpoint class; releasing it more than once is a no-op."""
+
+    def __init__(self, semaphore: Optional[threading.BoundedSemaphore]):
+        self._semaphore = semaphore
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            semaphore, self._semaphore = self._semaphore, None
+        if semaphore is not None:
+            semaphore.release()
+
+
+def busy_response(endpoint_class: str):
+    headers = {'Retry-After': '5'}
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Server busy, retry later', 'class': endpoint_class}), 503, headers
+    return render_template('503.html', config=Config()), 503, headers
+
@@ -6,6 +6,8 @@ class Config:
     RPC_PORT = int(os.environ.get('BITOK_RPC_PORT', 8332))
     RPC_USER = os.environ.get('BITOK_RPC_USER', '')
     RPC_PASSWORD = os.environ.get('BITOK_RPC_PASSWORD', '')
+    BITOK_DATADIR = os.environ.get('BITOK_DATADIR', os.path.expanduser('~/.bitokd'))
+    MINER_POOLS_FILE = os.environ.get('MINER_POOLS_FILE', 'pools.json')
 
     DATABASE_URL = os.environ.get(
         'DATABASE_URL',
@@ -19,13 +21,52 @@ class Config:
 
     SECRET_KEY = os.environ.get('SECRET_KEY', 'change-this-secret-key')
 
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 4))
+    WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 16))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 60))
+    WEB_BIND = os.environ.get('WEB_BIND', '127.0.0.1:5000')
+
+    RPC_TIMEOUT = float(os.environ.get('RPC_TIMEOUT', 5))
+
+    LIMIT_RPC = int(os.environ.get('LIMIT_RPC', 4))
+    LIMIT_HEAVY = int(os.environ.get('LIMIT_HEAVY', 8))
+    LIMIT_EXPORT = int(os.environ.get('LIMIT_EXPORT', 2))
+    LIMIT_WAIT_TIMEOUT = float(os.environ.get('LIMIT_WAIT_TIMEOUT', 1.0))
+
+    SSE_BIND = os.environ.get('SSE_BIND', '127.0.0.1:5001')
+    SSE_SERVER_MAX_SUBSCRIBERS = int(os.environ.get('SSE_SERVER_MAX_SUBSCRIBERS', 10000))
+    SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 4))
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 1.0))
+    SSE_KEEPALIVE = int(os.environ.get('SSE_KEEPALIVE', 15))
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', 5000))
+
+    QUERY_PROFILING = os.environ.get('QUERY_PROFILING', 'false').lower() == 'true'
+    QUERY_PROFILE_LOG_MS = float(os.environ.get('QUERY_PROFILE_LOG_MS', 0))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+
     SYNC_INTERVAL = int(os.environ.get('SYNC_INTERVAL', 10))
     SYNC_BATCH_SIZE = int(os.environ.get('SYNC_BATCH_SIZE', 100))
+    SYNC_NOTIFY_SOCKET = os.environ.get('SYNC_NOTIFY_SOCKET', '')
+    SYNC_FALLBACK_INTERVAL = int(os.environ.get('SYNC_FALLBACK_INTERVAL', 60))
+
+    MEMPOOL_ENABLED = os.environ.get('MEMPOOL_ENABLED', 'true').lower() == 'true'
+    MEMPOOL_MAX_TXS = int(os.environ.get('MEMPOOL_MAX_TXS', 50000))
+    MEMPOOL_FETCH_BATCH = int(os.environ.get('MEMPOOL_FETCH_BATCH', 100))
 
     ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE', 50))
 
+    BULK_LOOKUP_LIMIT = int(os.environ.get('BULK_LOOKUP_LIMIT', 1000))
+    UTXO_PAGE_LIMIT = int(os.environ.get('UTXO_PAGE_LIMIT', 1000))
+    SEARCH_RESULT_LIMIT = int(os.environ.get('SEARCH_RESULT_LIMIT', 20))
+    RICH_LIST_SIZE = int(os.environ.get('RICH_LIST_SIZE', 100))
+    CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 1000))
+    FEE_WINDOW_BLOCKS = int(os.environ.get('FEE_WINDOW_BLOCKS', 144))
+
     COIN_NAME = 'Bitok'
     COIN_SYMBOL = 'BITOK'
     COIN_DECIMALS = 8
+    ADDRESS_VERSION = int(os.environ.get('ADDRESS_VERSION', 0))
 
     DEBUG = os.environ.get('DEBUG', 'false').lower() == 'true'
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Fast health report for the explorer database.
+
+Row counts come from catalog statistics (pg_class on PostgreSQL,
+sqlite_stat1 or the highest id on SQLite) instead of count(*). Also
+reported: table and index sizes, dead tuples, height gaps in blocks, and
+the synced height and tip hash compared with bitokd. Every query is bounded
+(statement_timeout on PostgreSQL), so it is safe to run on a busy server.
+"""
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import inspect, text
+
+from config import Config
+from models import connect_db, missing_indexes, Base, Block, ChainState
+from rpc_client import BitokRPC
+
+MAX_GAPS = 20
+
+
+def human_size(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
+
+
+def postgres_tables(conn):
+    rows = conn.execute(text("""
+        SELECT c.relname, c.reltuples::bigint, pg_table_size(c.oid), pg_indexes_size(c.oid),
+               s.n_live_tup, s.n_dead_tup, s.last_autovacuum, s.last_autoanalyze
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE c.relkind = 'r' AND n.nspname = current_schema()
+        ORDER BY pg_total_relation_size(c.oid) DESC
+    """))
+    tables = []
+    for name, estimate, size, index_size, live, dead, vacuumed, analyzed in rows:
+        dead_share = dead / (live + dead) if live or dead else 0
+        tables.append({
+            'table': name,
+            'rows': max(estimate, live or 0),
+            'size': size,
+            'index_size': index_size,
+            'dead': f'{dead or 0} ({dead_share:.0%})',
+            'note': f'vacuumed {vacuumed:%Y-%m-%d %H:%M}' if vacuumed else 'never autovacuumed',
+        })
+    return tables
+
+
+def postgres_indexes(conn):
+    return [{'index': name, 'table': table, 'size': size, 'scans': scans}
+            for name, table, size, scans in conn.execute(text("""
+        SELECT indexrelname, relname, pg_relation_size(indexrelid), idx_scan
+        FROM pg_stat_user_indexes
+        ORDER BY pg_relation_size(indexrelid) DESC
+    """))]
+
+
+def sqlite_tables(conn, with_sizes):
+    stats = {}
+    has_stat1 = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    )).first()
+    if has_stat1:
+        for tbl, idx, stat in conn.execute(text('SELECT tbl, idx, stat FROM sqlite_stat1')):
+            stats.setdefault(tbl, int(stat.split()[0]))
+
+    sizes = {}
+    if with_sizes:
+        # dbstat reads every page, so it is only used when asked for.
+        for name, size in conn.execute(text('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')):
+            sizes[name] = size
+
+    indexes = {}
+    for name, table in conn.execute(text(
+        "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'"
+    )):
+        indexes.setdefault(table, []).append(name)
+
+    existing = {name for (name,) in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ))}
+
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        name = table.name
+        if name not in existing:
+            tables.append({'table': name, 'rows': '-', 'size': None,
+                           'index_size': None, 'dead': '-', 'note': 'missing'})
+            continue
+        if name in stats:
+            rows, note = stats[name], 'sqlite_stat1'
+        else:
+            rows = conn.execute(text(f'SELECT MAX(rowid) FROM {name}')).scalar() or 0
+            note = 'max rowid'
+        index_size = (sum(sizes.get(i, 0) for i in indexes.get(name, []))
+                      if with_sizes else None)
+        tables.append({'table': name, 'rows': rows, 'size': sizes.get(name),
+                       'index_size': index_size, 'dead': '-', 'note': note})
+    return tables
+
+
+def sqlite_file_stats(conn):
+    page_size = conn.execute(text('PRAGMA page_size')).scalar()
+    pages = conn.execute(text('PRAGMA page_count')).scalar()
+    free = conn.execute(text('PRAGMA freelist_count')).scalar()
+    return page_size * pages, page_size * free
+
+
+def find_gaps(session, start):
+    """Return (after, next) pairs where heights above ``start`` skip a block."""
+    return session.execute(text("""
+        SELECT height, next_height FROM (
+            SELECT height, LEAD(height) OVER (ORDER BY height) AS next_height
+            FROM blocks WHERE height >= :start
+        ) AS heights
+        WHERE next_height - height > 1
+        ORDER BY height
+        LIMIT :limit
+    """), {'start': start, 'limit': MAX_GAPS}).fetchall()
+
+
+def print_table(rows, columns):
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print('  ' + '  '.join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print('  ' + '  '.join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--window', type=int, default=0,
+                        help='only check the last N heights for gaps (default: all)')
+    parser.add_argument('--sizes', action='store_true',
+                        help='SQLite: per-table sizes from dbstat (reads the whole file)')
+    parser.add_argument('--no-node', action='store_true', help='skip the bitokd comparison')
+    parser.add_argument('--timeout', type=int, default=10,
+                        help='PostgreSQL statement timeout in seconds')
+    args = parser.parse_args()
+
+    config = Config()
+    # No init_db: creating tables or running migrations is not a diagnostic.
+    engine, SessionFactory = connect_db(config.DATABASE_URL)
+    session = SessionFactory()
+    postgres = engine.dialect.name == 'postgresql'
+    started = time.perf_counter()
+    problems = []
+
+    try:
+        if postgres:
+            session.execute(text(f"SET statement_timeout = '{args.timeout}s'"))
+        conn = session.connection()
+
+        print(f'Database: {engine.url.render_as_string(hide_password=True)}')
+        if postgres:
+            tables = postgres_tables(conn)
+            total = sum((t['size'] or 0) + (t['index_size'] or 0) for t in tables)
+            print(f'Size: {human_size(total)}')
+        else:
+            tables = sqlite_tables(conn, args.sizes)
+            size, free = sqlite_file_stats(conn)
+            print(f'Size: {human_size(size)}, free pages: {human_size(free)}')
+
+        print('\nTables (estimated rows):')
+        for t in tables:
+            t['size'] = human_size(t['size'])
+            t['index_size'] = human_size(t['index_size'])
+        print_table(tables, ['table', 'rows', 'size', 'index_size', 'dead', 'note'])
+
+        if postgres:
+            indexes = postgres_indexes(conn)
+            for i in indexes:
+                i['size'] = human_size(i['size'])
+            print('\nIndexes:')
+            print_table(indexes, ['index', 'table', 'size', 'scans'])
+
+        for name in missing_indexes(engine, inspect(conn)):
+            problems.append(f'index {name} is missing, build it with sync.py --create-indexes')
+
+        synced = session.query(ChainState.value).filter_by(key='synced_height').scalar()
+        synced = int(synced) if synced is not None else -1
+        tip = session.query(Block.height, Block.hash).order_by(Block.height.desc()).first()
+        print(f'\nSynced height: {synced}, highest block: {tip.height if tip else "-"}')
+        if tip and tip.height != synced:
+            problems.append(f'highest block {tip.height} differs from synced_height {synced}')
+
+        start = max(0, synced - args.window) if args.window else 0
+        gaps = find_gaps(session, start)
+        first = session.query(Block.height).filter(Block.height >= start).order_by(
+            Block.height
+        ).limit(1).scalar()
+        if first is not None and first != start:
+            gaps.insert(0, (start - 1, first))
+        if gaps:
+            for after, following in gaps:
+                problems.append(f'missing heights {after + 1}..{following - 1}')
+        print(f'Height gaps since {start}: {len(gaps)}{"+" if len(gaps) >= MAX_GAPS else ""}')
+
+        if not args.no_node:
+            rpc = BitokRPC(host=config.RPC_HOST, port=config.RPC_PORT,
+                           user=config.RPC_USER, password=config.RPC_PASSWORD)
+            try:
+                node_height = rpc.getblockcount()
+                print(f'Node height: {node_height} (behind by {node_height - synced})')
+                if tip:
+                    node_hash = rpc.getblockhash(tip.height)
+                    if node_hash == tip.hash:
+                        print(f'Tip hash at {tip.height}: matches node')
+                    else:
+                        problems.append(f'tip hash at {tip.height} is {tip.hash}, node has {node_hash}')
+            except Exception as e:
+                print(f'Node: unavailable ({e})')
+
+        print(f'\nFinished in {time.perf_counter() - started:.2f}s')
+        for problem in problems:
+            print(f'PROBLEM: {problem}')
+        return 1 if problems else 0
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
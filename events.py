@@ -0,0 +1,140 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import desc
+
+from models import Block, ChainState, Transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_BLOCKS_PER_UPDATE = 10
+
+
+class EventPublisher:
+    """Fans chain updates out to server-sent event subscribers.
+
+    One background thread per process watches the ``synced_height`` row
+    the syncer writes on every commit. When it moves, the new blocks are
+    loaded once and the resulting events are pushed onto every
+    subscriber's queue, so idle subscribers cost no database work.
+    """
+
+    def __init__(self, session_factory, stats_builder: Callable,
+                 poll_interval: float = 1.0, max_subscribers: int = 100,
+                 queue_size: int = 64):
+        self.Session = session_factory
+        self.stats_builder = stats_builder
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._height = None
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            q = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-publisher',
+                                                daemon=True)
+                self._thread.start()
+            return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, events: List[tuple]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            for event in events:
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    # A client that cannot keep up is dropped; it will
+                    # reconnect and resync from /api/home.
+                    self.unsubscribe(q)
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+                    q.put_nowait(('close', None))
+                    break
+
+    def reset(self):
+        """Forget the last height, so the next poll starts from the tip."""
+        self._height = None
+
+    def _run(self):
+        while True:
+            if not self.subscriber_count():
+                self.reset()
+            else:
+                try:
+                    events = self.poll()
+                    if events:
+                        self.publish(events)
+                except Exception as e:
+                    logger.warning(f'Event publisher poll failed: {e}')
+            time.sleep(self.poll_interval)
+
+    def poll(self) -> List[tuple]:
+        session = self.Session()
+        try:
+            state = session.query(ChainState.value).filter_by(key='synced_height').first()
+            height = int(state[0]) if state and state[0] else -1
+            if self._height is None:
+                self._height = height
+                return []
+            if height <= self._height:
+                return []
+
+            start = max(self._height + 1, height - MAX_BLOCKS_PER_UPDATE + 1)
+            self._height = height
+
+            blocks = session.query(Block).filter(
+                Block.height >= start,
+                Block.height <= height
+            ).order_by(Block.height).all()
+            txs = session.query(Transaction).filter(
+                Transaction.block_height >= start,
+                Transaction.block_height <= height
+            ).order_by(desc(Transaction.id)).limit(MAX_BLOCKS_PER_UPDATE).all()
+
+            events = [('block', {
+                'height': b.height,
+                'hash': b.hash,
+                'prev_hash': b.prev_hash,
+                'timestamp': b.timestamp,
+                'tx_count': b.tx_count,
+                'total_value': b.total_value,
+            }) for b in blocks]
+            if txs:
+                events.append(('txs', [{
+                    'txid': tx.txid,
+                    'block_height': tx.block_height,
+                    'total_output': tx.total_output,
+                } for tx in txs]))
+            if blocks:
+                events.append(('tip', {'height': blocks[-1].height, 'hash': blocks[-1].hash}))
+            events.append(('stats', self.stats_builder(session)))
+            return events
+        finally:
+            session.close()
+
+
+def format_sse(event: str, data) -> str:
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
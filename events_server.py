@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Serve /api/events from one asyncio process for every subscriber.
+
+A subscriber is a coroutine and a small queue rather than a web worker
+thread, so thousands of open home pages cost little and never take threads
+from normal requests. New blocks are loaded by the same EventPublisher.poll
+the web app uses, once per height change, on a helper thread so the event
+loop never waits on the database. The reverse proxy sends /api/events here
+(see README); the web app keeps its own small in-process stream for setups
+without it.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from config import Config
+from events import EventPublisher, format_sse
+from models import connect_db
+from network_stats import build_network_stats, home_stats_payload
+from rpc_client import BitokRPC
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_HEAD = 8192
+REQUEST_TIMEOUT = 10
+
+
+class EventHub:
+    """Subscriber queues on the event loop, fed by one publisher poll."""
+
+    def __init__(self, publisher: EventPublisher, max_subscribers: int, queue_size: int = 64):
+        self.publisher = publisher
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.subscribers = set()
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        q = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self.subscribers.discard(q)
+
+    def publish(self, events: List[tuple]):
+        for q in list(self.subscribers):
+            for event in events:
+                try:
+                    q.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Same as the in-process publisher: drop the slow
+                    # client, it reconnects and resyncs from /api/home.
+                    self.unsubscribe(q)
+                    q.get_nowait()
+                    q.put_nowait(('close', None))
+                    break
+
+    async def run(self):
+        while True:
+            if not self.subscribers:
+                self.publisher.reset()
+            else:
+                try:
+                    events = await asyncio.to_thread(self.publisher.poll)
+                    if events:
+                        self.publish(events)
+                except Exception as e:
+                    logger.warning(f'Event publisher poll failed: {e}')
+            await asyncio.sleep(self.publisher.poll_interval)
+
+
+def response_head(status: str, headers: Dict[str, str]) -> bytes:
+    lines = [f'HTTP/1.1 {status}'] + [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """Method and path of the request; headers are read and ignored."""
+    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+    method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+    return method, target.split('?', 1)[0]
+
+
+class EventServer:
+    def __init__(self, hub: EventHub, keepalive: float, retry_ms: int):
+        self.hub = hub
+        self.keepalive = keepalive
+        self.retry_ms = retry_ms
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path = await read_request(reader)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ValueError):
+                return
+            if method != 'GET' or path != '/api/events':
+                writer.write(response_head('404 Not Found', {
+                    'Content-Length': '0', 'Connection': 'close'}))
+                return
+            q = self.hub.subscribe()
+            if q is None:
+                writer.write(response_head('503 Service Unavailable', {
+                    'Retry-After': '5', 'Content-Length': '0', 'Connection': 'close'}))
+                return
+            try:
+                await self.stream(q, writer)
+            finally:
+                self.hub.unsubscribe(q)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, q: asyncio.Queue, writer: asyncio.StreamWriter):
+        # No length and no chunking: the body runs until the connection closes.
+        writer.write(response_head('200 OK', {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'Connection': 'close',
+        }))
+        writer.write(f'retry: {self.retry_ms}\n\n'.encode())
+        await writer.drain()
+        while True:
+            try:
+                event, data = await asyncio.wait_for(q.get(), self.keepalive)
+            except asyncio.TimeoutError:
+                chunk = ': keepalive\n\n'
+            else:
+                if event == 'close':
+                    return
+                chunk = format_sse(event, data)
+            writer.write(chunk.encode())
+            await writer.drain()
+
+
+async def serve(hub: EventHub, server: EventServer, host: str, port: int):
+    listener = await asyncio.start_server(server.handle, host, port,
+                                          limit=MAX_REQUEST_HEAD, backlog=1024)
+    logger.info(f'Serving /api/events on {host}:{port} '
+                f'(up to {hub.max_subscribers} subscribers)')
+    async with listener:
+        await asyncio.gather(listener.serve_forever(), hub.run())
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bind', default=config.SSE_BIND, help='host:port to listen on')
+    args = parser.parse_args()
+    host, _, port = args.bind.rpartition(':')
+
+    # Reads only; the web app and the syncer own the schema.
+    engine, SessionFactory = connect_db(config.DATABASE_URL)
+    rpc = BitokRPC(host=config.RPC_HOST, port=config.RPC_PORT, user=config.RPC_USER,
+                   password=config.RPC_PASSWORD, timeout=config.RPC_TIMEOUT)
+    publisher = EventPublisher(
+        SessionFactory,
+        stats_builder=lambda session: home_stats_payload(build_network_stats(session, rpc)),
+        poll_interval=config.SSE_POLL_INTERVAL
+    )
+    hub = EventHub(publisher, config.SSE_SERVER_MAX_SUBSCRIBERS)
+    server = EventServer(hub, config.SSE_KEEPALIVE, config.SSE_RETRY_MS)
+    try:
+        asyncio.run(serve(hub, server, host or '127.0.0.1', int(port)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Stream blocks or fully expanded transactions for a height range as NDJSON"""
+
+import argparse
+import json
+import sys
+
+from models import Block, Transaction
+from lookups import load_transaction_details
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def block_record(block):
+    return {
+        'hash': block.hash,
+        'height': block.height,
+        'version': block.version,
+        'prev_hash': block.prev_hash,
+        'merkle_root': block.merkle_root,
+        'timestamp': block.timestamp,
+        'bits': block.bits,
+        'nonce': block.nonce,
+        'tx_count': block.tx_count,
+        'total_value': block.total_value,
+    }
+
+
+def tx_record(tx, detail):
+    inputs = []
+    for inp, prev_out in detail['inputs']:
+        inputs.append({
+            'coinbase': inp.coinbase,
+            'txid': inp.prev_txid,
+            'vout': inp.prev_vout,
+            'script_sig': inp.script_sig,
+            'sequence': inp.sequence,
+            'address': prev_out.address if prev_out else None,
+            'value': prev_out.value if prev_out else None,
+        })
+
+    outputs = [{
+        'n': out.vout,
+        'value': out.value,
+        'address': out.address,
+        'script_pubkey': out.script_pubkey,
+        'script_type': out.script_type,
+        'spent': out.spent,
+        'spent_by_txid': out.spent_by_txid,
+    } for out in detail['outputs']]
+
+    return {
+        'txid': tx.txid,
+        'block_hash': tx.block_hash,
+        'block_height': tx.block_height,
+        'version': tx.version,
+        'locktime': tx.locktime,
+        'is_coinbase': tx.is_coinbase,
+        'total_input': tx.total_input,
+        'total_output': tx.total_output,
+        'fee': tx.fee,
+        'inputs': inputs,
+        'outputs': outputs,
+    }
+
+
+def iter_blocks(session, start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    query = session.query(Block).filter(
+        Block.height >= start,
+        Block.height <= end
+    ).order_by(Block.height).execution_options(stream_results=True).yield_per(chunk_size)
+    for block in query:
+        yield block_record(block)
+
+
+def iter_transactions(session, start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    query = session.query(Transaction).filter(
+        Transaction.block_height >= start,
+        Transaction.block_height <= end
+    ).order_by(
+        Transaction.block_height, Transaction.id
+    ).execution_options(stream_results=True).yield_per(chunk_size)
+
+    batch = []
+    for tx in query:
+        batch.append(tx)
+        if len(batch) >= chunk_size:
+            yield from _expand(session, batch)
+            batch = []
+    if batch:
+        yield from _expand(session, batch)
+
+
+def _expand(session, txs):
+    details = load_transaction_details(session, txs)
+    for tx in txs:
+        yield tx_record(tx, details[tx.id])
+
+
+EXPORTERS = {
+    'blocks': iter_blocks,
+    'txs': iter_transactions,
+}
+
+
+def iter_ndjson(session, kind, start, end):
+    for record in EXPORTERS[kind](session, start, end):
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def main():
+    from config import Config
+    from models import init_db
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('kind', choices=sorted(EXPORTERS))
+    parser.add_argument('start', type=int, help='first block height (inclusive)')
+    parser.add_argument('end', type=int, help='last block height (inclusive)')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+
+    config = Config()
+    engine, SessionFactory = init_db(config.DATABASE_URL)
+    session = SessionFactory()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for line in iter_ndjson(session, args.kind, args.start, args.end):
+            out.write(line)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Serve a SyntheticChain over JSON-RPC so the syncer and web app can run without bitokd.
+
+    python fake_bitokd.py --blocks 2000 --txs-per-block 20 --port 18332
+
+Point BITOK_RPC_PORT at the chosen port. Credentials are accepted but not
+checked, and batch requests are supported like the real daemon.
+"""
+
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic_chain import DEFAULT_SCRIPT_MIX, RPCError, SyntheticChain, parse_script_mix
+
+RPC_METHODS = (
+    'getinfo', 'getblockcount', 'getblocknumber', 'getbestblockhash', 'getblockhash',
+    'getblock', 'gettransaction', 'getrawtransaction', 'getdifficulty',
+    'getconnectioncount', 'getrawmempool', 'gettxoutsetinfo', 'validateaddress',
+    'decodescript',
+)
+
+
+def dispatch(chain: SyntheticChain, request: dict) -> dict:
+    method = request.get('method')
+    reply = {'id': request.get('id'), 'result': None, 'error': None}
+    if method not in RPC_METHODS:
+        reply['error'] = {'code': -32601, 'message': 'Method not found'}
+        return reply
+    try:
+        reply['result'] = getattr(chain, method)(*(request.get('params') or []))
+    except RPCError as e:
+        reply['error'] = {'code': e.code, 'message': e.message}
+    except (TypeError, ValueError) as e:
+        reply['error'] = {'code': -1, 'message': str(e)}
+    return reply
+
+
+def make_handler(chain: SyntheticChain):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                request = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_error(400)
+                return
+            if isinstance(request, list):
+                body = [dispatch(chain, r) for r in request]
+                status = 200
+            else:
+                body = dispatch(chain, request)
+                status = 500 if body['error'] else 200
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(chain: SyntheticChain, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start serving ``chain`` on a background thread; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), make_handler(chain))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_chain_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--blocks', type=int, default=1000)
+    parser.add_argument('--txs-per-block', type=int, default=10)
+    parser.add_argument('--inputs', type=int, default=2, help='inputs per transaction')
+    parser.add_argument('--outputs', type=int, default=2, help='outputs per transaction')
+    parser.add_argument('--script-mix', type=parse_script_mix,
+                        default=DEFAULT_SCRIPT_MIX,
+                        help='weights, e.g. pubkeyhash=80,pubkey=10,multisig=3,nulldata=5,nonstandard=2')
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def chain_from_args(args) -> SyntheticChain:
+    return SyntheticChain(blocks=args.blocks, txs_per_block=args.txs_per_block,
+                          inputs=args.inputs, outputs=args.outputs,
+                          script_mix=args.script_mix, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_chain_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18332)
+    args = parser.parse_args()
+
+    chain = chain_from_args(args)
+    server = serve(chain, args.host, args.port)
+    print(f'Serving {len(chain.blocks)} blocks, {chain.tx_count()} transactions '
+          f'on {args.host}:{server.server_address[1]}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
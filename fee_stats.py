@@ -0,0 +1,187 @@
+"""Transaction sizes, per-block fee aggregates and fee-rate estimates.
+
+The syncer stores the serialized size of every transaction and, per block,
+the total fees, size, input and output counts and the min/median/max fee
+rate (satoshis per byte) of its non-coinbase transactions. FeeWindow keeps
+the last few hundred of those block rows in memory, so estimates never
+touch the transactions table.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from blockfiles import HEADER_SIZE, serialize_tx, write_varint
+from models import Block
+
+ESTIMATE_TARGETS = (1, 3, 6)
+# An estimate for N blocks is the rate that would have confirmed within N
+# blocks in this share of the recent N-block spans.
+ESTIMATE_PERCENTILE = 0.8
+
+
+def _script_hex(script) -> str:
+    if isinstance(script, dict):
+        return script.get('hex', '')
+    return script or ''
+
+
+def tx_size(tx_data: Dict) -> Optional[int]:
+    """Serialized size of a getrawtransaction result, or None if it lacks scripts."""
+    if tx_data.get('size'):
+        return tx_data['size']
+    if tx_data.get('hex'):
+        return len(tx_data['hex']) // 2
+    # Re-serialize only when the node returned no raw hex.
+    try:
+        vin = []
+        for inp in tx_data['vin']:
+            if 'coinbase' in inp:
+                vin.append({'coinbase': inp['coinbase'], 'sequence': inp.get('sequence', 0xffffffff)})
+            else:
+                vin.append({'txid': inp['txid'], 'vout': inp['vout'],
+                            'scriptSig': _script_hex(inp['scriptSig']),
+                            'sequence': inp.get('sequence', 0xffffffff)})
+        vout = [{'value': out['value'], 'scriptPubKey': _script_hex(out['scriptPubKey'])}
+                for out in tx_data['vout']]
+        return len(serialize_tx({'version': tx_data.get('version', 1), 'vin': vin, 'vout': vout,
+                                 'locktime': tx_data.get('locktime', 0)}))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def stored_tx_size(inputs: Iterable, outputs: Iterable) -> int:
+    """Serialized size of a transaction rebuilt from its database rows."""
+    inputs = list(inputs)
+    outputs = list(outputs)
+    size = 8 + len(write_varint(len(inputs))) + len(write_varint(len(outputs)))
+    for inp in inputs:
+        script = len((inp.coinbase if inp.prev_txid is None else inp.script_sig) or '') // 2
+        size += 40 + len(write_varint(script)) + script
+    for out in outputs:
+        script = len(out.script_pubkey or '') // 2
+        size += 8 + len(write_varint(script)) + script
+    return size
+
+
+def block_size(tx_sizes: List[int]) -> int:
+    return HEADER_SIZE + len(write_varint(len(tx_sizes))) + sum(tx_sizes)
+
+
+def median(values: List[float]) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+class BlockFeeStats:
+    """Accumulates one block's fee aggregates as its transactions are synced."""
+
+    def __init__(self):
+        self.fees = 0
+        self.inputs = 0
+        self.outputs = 0
+        self.sizes: List[int] = []
+        self.rates: List[float] = []
+
+    def add_tx(self, fee: int, size: Optional[int], inputs: int, outputs: int, coinbase: bool):
+        self.fees += fee
+        self.inputs += inputs
+        self.outputs += outputs
+        if size:
+            self.sizes.append(size)
+            if not coinbase:
+                self.rates.append(fee / size)
+
+    def apply(self, block: Block, tx_count: int):
+        block.total_fees = self.fees
+        block.input_count = self.inputs
+        block.output_count = self.outputs
+        # A block with a transaction of unknown size has no reliable size.
+        block.size = block_size(self.sizes) if len(self.sizes) == tx_count else None
+        if self.rates:
+            block.min_fee_rate = min(self.rates)
+            block.median_fee_rate = median(self.rates)
+            block.max_fee_rate = max(self.rates)
+        else:
+            block.min_fee_rate = block.median_fee_rate = block.max_fee_rate = None
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+class FeeWindow:
+    """The last ``size`` blocks' fee aggregates, refreshed as the tip moves.
+
+    One instance per web process. ``refresh`` reads only blocks above the
+    newest one held, so a request after a new block costs one small query
+    and every other request none.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.blocks: deque = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    @property
+    def height(self) -> int:
+        return self.blocks[-1][0] if self.blocks else -1
+
+    def refresh(self, session, synced_height: int):
+        with self.lock:
+            if synced_height <= self.height:
+                return
+            if self.blocks and self.height >= synced_height - self.size:
+                start = self.height
+            else:
+                start = synced_height - self.size
+                self.blocks.clear()
+            rows = session.query(
+                Block.height, Block.tx_count, Block.total_fees, Block.size,
+                Block.min_fee_rate, Block.median_fee_rate, Block.max_fee_rate
+            ).filter(
+                Block.height > start, Block.height <= synced_height
+            ).order_by(Block.height).all()
+            self.blocks.extend(tuple(row) for row in rows)
+
+    def spans(self, target: int) -> List[Optional[float]]:
+        """Cheapest rate confirmed in each consecutive ``target``-block span."""
+        blocks = list(self.blocks)
+        spans = []
+        for i in range(len(blocks) - target, -1, -target):
+            rates = [b[4] for b in blocks[i:i + target] if b[4] is not None]
+            spans.append(min(rates) if rates else None)
+        return spans
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            blocks = list(self.blocks)
+            estimates = {}
+            for target in ESTIMATE_TARGETS:
+                rates = [rate for rate in self.spans(target) if rate is not None]
+                estimates[str(target)] = round(percentile(rates, ESTIMATE_PERCENTILE), 3) if rates else None
+        medians = [b[5] for b in blocks if b[5] is not None]
+        sizes = [b[3] for b in blocks if b[3] is not None]
+        return {
+            'height': blocks[-1][0] if blocks else None,
+            'blocks': len(blocks),
+            'estimates': estimates,
+            'median_fee_rate': round(median(medians), 3) if medians else None,
+            'total_fees': sum(b[2] or 0 for b in blocks),
+            'average_block_size': round(sum(sizes) / len(sizes)) if sizes else None,
+            'tx_count': sum(b[1] or 0 for b in blocks),
+        }
+
+
+def backfill_block(block: Block, txs: List[Tuple]):
+    """Recompute size columns and fee aggregates for one stored block.
+
+    ``txs`` holds (transaction, inputs, outputs) for every transaction in it.
+    """
+    stats = BlockFeeStats()
+    for tx, inputs, outputs in txs:
+        tx.size = stored_tx_size(inputs, outputs)
+        stats.add_tx(tx.fee or 0, tx.size, len(inputs), len(outputs), tx.is_coinbase)
+    stats.apply(block, len(txs))
@@ -0,0 +1,11 @@
+from config import Config
+
+config = Config()
+
+bind = config.WEB_BIND
+workers = config.WEB_WORKERS
+worker_class = config.WEB_WORKER_CLASS
+threads = config.WEB_THREADS
+timeout = config.WEB_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
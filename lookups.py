@@ -0,0 +1,160 @@
+import json
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+
+from models import Transaction, TxInput, TxOutput, Address, MempoolTx, MempoolAddress
+
+IN_CHUNK_SIZE = 500
+
+
+def chunked(items, size=IN_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def load_transactions(session, txids: List[str]) -> Dict[str, Transaction]:
+    found = {}
+    for chunk in chunked(txids):
+        for tx in session.query(Transaction).filter(Transaction.txid.in_(chunk)):
+            found[tx.txid] = tx
+    return found
+
+
+def load_outputs_by_key(session, keys) -> Dict[Tuple[str, int], TxOutput]:
+    keys = set(keys)
+    found = {}
+    for chunk in chunked({txid for txid, _ in keys}):
+        for out in session.query(TxOutput).filter(TxOutput.txid.in_(chunk)):
+            key = (out.txid, out.vout)
+            if key in keys:
+                found[key] = out
+    return found
+
+
+def load_transaction_details(session, txs: List[Transaction]) -> Dict[int, Dict]:
+    """Load inputs, outputs and spent previous outputs for many transactions.
+
+    Runs a fixed number of IN queries per chunk of transactions instead of
+    one query per input. Returns {tx.id: {'inputs': [(input, prev_out)],
+    'outputs': [output]}}.
+    """
+    details = {tx.id: {'inputs': [], 'outputs': []} for tx in txs}
+    if not details:
+        return details
+
+    inputs = []
+    for chunk in chunked(details.keys()):
+        inputs.extend(session.query(TxInput).filter(
+            TxInput.tx_id.in_(chunk)
+        ).order_by(TxInput.id).all())
+        for out in session.query(TxOutput).filter(
+            TxOutput.tx_id.in_(chunk)
+        ).order_by(TxOutput.tx_id, TxOutput.vout):
+            details[out.tx_id]['outputs'].append(out)
+
+    prev_outputs = load_outputs_by_key(
+        session,
+        [(inp.prev_txid, inp.prev_vout) for inp in inputs if inp.prev_txid]
+    )
+    for inp in inputs:
+        prev_out = prev_outputs.get((inp.prev_txid, inp.prev_vout)) if inp.prev_txid else None
+        details[inp.tx_id]['inputs'].append((inp, prev_out))
+
+    return details
+
+
+def load_addresses(session, addresses: List[str]) -> Dict[str, Address]:
+    found = {}
+    for chunk in chunked(addresses):
+        for addr in session.query(Address).filter(Address.address.in_(chunk)):
+            found[addr.address] = addr
+    return found
+
+
+def load_unspent_outputs(session, address: str, max_height: int, after_id: int = 0,
+                         limit: int = 100) -> List[Tuple[TxOutput, int]]:
+    """Unspent outputs of ``address`` confirmed at or below ``max_height``,
+    in id order after ``after_id``, with their block heights."""
+    return session.query(TxOutput, Transaction.block_height).join(
+        Transaction, Transaction.id == TxOutput.tx_id
+    ).filter(
+        TxOutput.address == address,
+        TxOutput.spent == False,
+        TxOutput.id > after_id,
+        Transaction.block_height <= max_height
+    ).order_by(TxOutput.id).limit(limit).all()
+
+
+def unspent_value_above(session, address: str, height: int) -> int:
+    """Value of the address's unspent outputs confirmed above ``height``."""
+    return session.query(func.coalesce(func.sum(TxOutput.value), 0)).join(
+        Transaction, Transaction.id == TxOutput.tx_id
+    ).filter(
+        Transaction.block_height > height,
+        TxOutput.address == address,
+        TxOutput.spent == False
+    ).scalar()
+
+
+def load_mempool_transactions(session, txids: List[str]) -> Dict[str, MempoolTx]:
+    found = {}
+    for chunk in chunked(txids):
+        for mtx in session.query(MempoolTx).filter(MempoolTx.txid.in_(chunk)):
+            found[mtx.txid] = mtx
+    return found
+
+
+def load_mempool_balances(session, addresses: List[str]) -> Dict[str, Dict]:
+    """Return {address: {'balance': delta, 'tx_count': n}} for unconfirmed activity."""
+    pending = {}
+    for chunk in chunked(addresses):
+        rows = session.query(
+            MempoolAddress.address,
+            func.sum(MempoolAddress.received - MempoolAddress.sent),
+            func.count(MempoolAddress.id)
+        ).filter(MempoolAddress.address.in_(chunk)).group_by(MempoolAddress.address)
+        for address, delta, count in rows:
+            pending[address] = {'balance': int(delta or 0), 'tx_count': count}
+    return pending
+
+
+def mempool_transaction_details(mtx: MempoolTx) -> Tuple[Transaction, Dict]:
+    """Build transient Transaction/TxInput/TxOutput objects for an unconfirmed
+    transaction, shaped like load_transaction_details() output so the same
+    views and serializers render it."""
+    data = json.loads(mtx.data)
+    tx = Transaction(
+        txid=mtx.txid,
+        is_coinbase=False,
+        total_input=mtx.total_input,
+        total_output=mtx.total_output,
+        fee=mtx.fee,
+    )
+
+    inputs = []
+    for vin in data['vin']:
+        inp = TxInput(
+            txid=mtx.txid,
+            prev_txid=vin.get('txid'),
+            prev_vout=vin.get('vout'),
+            coinbase=vin.get('coinbase'),
+            script_sig=vin.get('script_sig'),
+        )
+        prev_out = None
+        if vin.get('value') is not None:
+            prev_out = TxOutput(txid=vin['txid'], vout=vin['vout'],
+                                value=vin['value'], address=vin.get('address'))
+        inputs.append((inp, prev_out))
+
+    outputs = [TxOutput(
+        txid=mtx.txid,
+        vout=out['n'],
+        value=out['value'],
+        address=out['address'],
+        script_pubkey=out['script_pubkey'],
+        spent=False,
+    ) for out in data['vout']]
+
+    return tx, {'inputs': inputs, 'outputs': outputs}
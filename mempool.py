@@ -0,0 +1,178 @@
+"""Unconfirmed transaction tracking.
+
+Each cycle the tracker diffs ``getrawmempool`` against the txids it already
+holds: transactions that left the pool (confirmed or dropped) are deleted,
+and only new txids are fetched, in batched RPC calls. Unconfirmed
+transactions live in the ``mempool_txs`` and ``mempool_addresses`` side
+tables so the web workers can read them; the tables are capped at
+``MEMPOOL_MAX_TXS`` rows.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from models import MempoolTx, MempoolAddress
+from lookups import chunked, load_outputs_by_key
+from script_decoder import classify_script
+from address_utils import script_addresses
+from sync import COIN, extract_address_from_vout, extract_script_pubkey
+
+logger = logging.getLogger(__name__)
+
+
+class MempoolTracker:
+    def __init__(self, rpc, db_session_factory, config):
+        self.rpc = rpc
+        self.Session = db_session_factory
+        self.max_txs = config.MEMPOOL_MAX_TXS
+        self.fetch_batch = config.MEMPOOL_FETCH_BATCH
+        self.known = None
+
+    def fetch_transactions(self, txids: List[str]) -> List[Optional[Dict]]:
+        calls = [('getrawtransaction', [txid, 1]) for txid in txids]
+        if hasattr(self.rpc, 'batch'):
+            return self.rpc.batch(calls)
+        results = []
+        for method, params in calls:
+            try:
+                results.append(getattr(self.rpc, method)(*params))
+            except Exception:
+                results.append(None)
+        return results
+
+    def update(self):
+        try:
+            current = set(self.rpc.getrawmempool() or [])
+        except Exception as e:
+            logger.warning(f'getrawmempool failed: {e}')
+            return
+
+        session = self.Session()
+        try:
+            if self.known is None:
+                self.known = {txid for (txid,) in session.query(MempoolTx.txid)}
+
+            gone = self.known - current
+            for chunk in chunked(gone):
+                session.query(MempoolAddress).filter(
+                    MempoolAddress.txid.in_(chunk)
+                ).delete(synchronize_session=False)
+                session.query(MempoolTx).filter(
+                    MempoolTx.txid.in_(chunk)
+                ).delete(synchronize_session=False)
+            self.known -= gone
+
+            new = [txid for txid in current if txid not in self.known]
+            room = max(0, self.max_txs - len(self.known))
+            if len(new) > room:
+                logger.warning(f'Mempool store full, skipping {len(new) - room} transactions')
+                new = new[:room]
+
+            added = 0
+            for chunk in chunked(new, self.fetch_batch):
+                fetched = []
+                for txid, tx_data in zip(chunk, self.fetch_transactions(chunk)):
+                    if tx_data:
+                        tx_data.setdefault('txid', txid)
+                        fetched.append(tx_data)
+                added += self.store_transactions(session, fetched)
+
+            session.commit()
+            if gone or added:
+                logger.info(f'Mempool: +{added} -{len(gone)} ({len(self.known)} unconfirmed)')
+        except Exception as e:
+            logger.error(f'Mempool update error: {e}', exc_info=True)
+            session.rollback()
+            self.known = None
+        finally:
+            session.close()
+
+    def store_transactions(self, session, txs: List[Dict]) -> int:
+        parsed = {tx_data['txid']: self.parse_outputs(tx_data) for tx_data in txs}
+
+        prev_keys = {(vin['txid'], vin['vout']) for tx_data in txs
+                     for vin in tx_data.get('vin', []) if vin.get('txid')}
+        prev_outputs = {key: (out.value, out.address)
+                        for key, out in load_outputs_by_key(session, prev_keys).items()}
+
+        # Inputs may spend outputs of other unconfirmed transactions.
+        parents = {txid for txid, _ in prev_keys if txid in self.known and txid not in parsed}
+        for chunk in chunked(parents):
+            for mtx in session.query(MempoolTx).filter(MempoolTx.txid.in_(chunk)):
+                parsed.setdefault(mtx.txid, json.loads(mtx.data)['vout'])
+        for txid, outputs in parsed.items():
+            for out in outputs:
+                prev_outputs.setdefault((txid, out['n']), (out['value'], out['address']))
+
+        now = int(time.time())
+        for tx_data in txs:
+            txid = tx_data['txid']
+            outputs = parsed[txid]
+            received = {}
+            sent = {}
+
+            inputs = []
+            total_input = 0
+            for vin in tx_data.get('vin', []):
+                if vin.get('coinbase'):
+                    inputs.append({'coinbase': vin['coinbase']})
+                    continue
+                value, address = prev_outputs.get((vin.get('txid'), vin.get('vout')), (None, None))
+                inputs.append({
+                    'txid': vin.get('txid'),
+                    'vout': vin.get('vout'),
+                    'value': value,
+                    'address': address,
+                    'script_sig': vin.get('scriptSig'),
+                })
+                total_input += value or 0
+                if address:
+                    sent[address] = sent.get(address, 0) + value
+
+            total_output = 0
+            for out in outputs:
+                total_output += out['value']
+                if out['address']:
+                    received[out['address']] = received.get(out['address'], 0) + out['value']
+
+            session.add(MempoolTx(
+                txid=txid,
+                first_seen=now,
+                total_input=total_input,
+                total_output=total_output,
+                fee=max(0, total_input - total_output),
+                data=json.dumps({'vin': inputs, 'vout': outputs}),
+            ))
+            for address in set(received) | set(sent):
+                session.add(MempoolAddress(
+                    txid=txid,
+                    address=address,
+                    received=received.get(address, 0),
+                    sent=sent.get(address, 0),
+                ))
+            self.known.add(txid)
+
+        session.flush()
+        return len(txs)
+
+    def parse_outputs(self, tx_data: Dict) -> List[Dict]:
+        outputs = []
+        for vout in tx_data.get('vout', []):
+            address = extract_address_from_vout(vout)
+            script_pubkey = extract_script_pubkey(vout)
+            if not address and script_pubkey:
+                script_info = classify_script(script_pubkey)
+                if script_info.get('type') in ('pubkeyhash', 'pubkey'):
+                    derived = script_addresses(script_info)
+                    if derived:
+                        address = derived[0]
+            outputs.append({
+                'n': vout.get('n', 0),
+                'value': round(vout.get('value', 0) * COIN),
+                'address': address,
+                'script_pubkey': script_pubkey,
+            })
+        return outputs
+
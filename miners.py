@@ -0,0 +1,185 @@
+"""Attribute blocks to miners from their coinbase transactions.
+
+The pool table (MINER_POOLS_FILE) is a JSON list of pools:
+
+    [{"name": "ExamplePool", "tags": ["/ExamplePool/"], "addresses": ["1Example..."]}]
+
+A block belongs to the first pool with one of its payout addresses among
+the coinbase outputs, else to the first pool whose tag appears in the
+coinbase script. Blocks that match no pool are attributed to their first
+payout address. The syncer stores the miner id on the block and counts
+blocks per miner in ``miner_rollups`` by hour and day, so distribution
+queries and per-miner block lists are index lookups.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func, select
+
+from models import Block, Miner, MinerRollup, Transaction, TxInput, TxOutput
+from rollups import KeyedRollupAccumulator
+from lookups import chunked
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_MINER = 'unknown'
+
+
+def load_pool_table(path: str) -> List[Dict]:
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        pools = json.load(f)
+    for pool in pools:
+        if not pool.get('name'):
+            raise ValueError(f'Pool entry without a name in {path}: {pool}')
+    return pools
+
+
+def coinbase_text(coinbase: Optional[str]) -> str:
+    try:
+        return bytes.fromhex(coinbase or '').decode('latin-1')
+    except ValueError:
+        return coinbase or ''
+
+
+class MinerMatcher:
+    def __init__(self, pools: List[Dict]):
+        self.by_address: Dict[str, str] = {}
+        self.tags: List[Tuple[str, str]] = []
+        for pool in pools:
+            for address in pool.get('addresses', []):
+                self.by_address.setdefault(address, pool['name'])
+            for tag in pool.get('tags', []):
+                self.tags.append((tag, pool['name']))
+
+    def match(self, coinbase: Optional[str], addresses: List[str]) -> Tuple[str, bool]:
+        """Return (miner name, is_pool) for a coinbase script and its payout addresses."""
+        for address in addresses:
+            if address in self.by_address:
+                return self.by_address[address], True
+        if self.tags:
+            text = coinbase_text(coinbase)
+            for tag, name in self.tags:
+                if tag in text:
+                    return name, True
+        return (addresses[0] if addresses else UNKNOWN_MINER), False
+
+
+class MinerIds:
+    """Maps miner names to ``miners`` ids, creating rows on first sight."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def get(self, session, name: str, is_pool: bool) -> int:
+        miner_id = self.ids.get(name)
+        if miner_id is None:
+            miner = session.query(Miner).filter_by(name=name).first()
+            if miner is None:
+                miner = Miner(name=name, is_pool=is_pool)
+                session.add(miner)
+                session.flush()
+            elif miner.is_pool != is_pool:
+                miner.is_pool = is_pool
+            miner_id = self.ids[name] = miner.id
+        return miner_id
+
+    def clear(self):
+        self.ids.clear()
+
+
+def miner_rollups() -> KeyedRollupAccumulator:
+    return KeyedRollupAccumulator(MinerRollup, 'miner_id', ('blocks',))
+
+
+def reattribute_miners(session, matcher: MinerMatcher, batch: int = 1000) -> int:
+    """Re-run the matcher over every stored coinbase and rebuild the rollups."""
+    session.query(MinerRollup).delete()
+    ids = MinerIds()
+    rollups = miner_rollups()
+    last_height = -1
+    count = 0
+    while True:
+        rows = session.query(Block, Transaction.id, TxInput.coinbase).join(
+            Transaction, Transaction.block_id == Block.id
+        ).join(
+            TxInput, TxInput.tx_id == Transaction.id
+        ).filter(
+            Block.height > last_height,
+            Transaction.is_coinbase == True
+        ).order_by(Block.height).limit(batch).all()
+        if not rows:
+            break
+        payouts: Dict[int, List[str]] = {}
+        for chunk in chunked([tx_id for _, tx_id, _ in rows]):
+            for tx_id, address in session.query(TxOutput.tx_id, TxOutput.address).filter(
+                TxOutput.tx_id.in_(chunk), TxOutput.address != None
+            ).order_by(TxOutput.id):
+                payouts.setdefault(tx_id, []).append(address)
+        for block, tx_id, coinbase in rows:
+            name, is_pool = matcher.match(coinbase, payouts.get(tx_id, []))
+            block.miner_id = ids.get(session, name, is_pool)
+            if block.timestamp is not None:
+                rollups.add(block.timestamp, block.miner_id, blocks=1)
+        last_height = rows[-1][0].height
+        count += len(rows)
+        rollups.flush(session)
+        session.commit()
+        logger.info(f'Attributed {count} blocks to miners (height {last_height})...')
+
+    # Miners no block points at any more, e.g. after a pool entry was added.
+    used = select(Block.miner_id).where(Block.miner_id != None).distinct()
+    session.query(Miner).filter(Miner.id.notin_(used)).delete(synchronize_session=False)
+    session.commit()
+    return count
+
+
+def rebuild_miner_rollups(session):
+    """Recompute miner rollups from the miner ids stored on blocks."""
+    session.query(MinerRollup).delete()
+    rollups = miner_rollups()
+    rows = session.query(Block.timestamp, Block.miner_id).filter(
+        Block.miner_id != None, Block.timestamp != None
+    ).yield_per(5000)
+    for timestamp, miner_id in rows:
+        rollups.add(timestamp, miner_id, blocks=1)
+    rollups.flush(session)
+
+
+def miner_distribution(session, period: str, start: Optional[int] = None,
+                       end: Optional[int] = None, limit: int = 100) -> Dict:
+    """Blocks per miner over rollup buckets from ``start`` to ``end``."""
+    query = session.query(
+        MinerRollup.miner_id, func.sum(MinerRollup.blocks).label('blocks')
+    ).filter(MinerRollup.period == period)
+    if start is not None:
+        query = query.filter(MinerRollup.bucket >= start)
+    if end is not None:
+        query = query.filter(MinerRollup.bucket <= end)
+    counts = query.group_by(MinerRollup.miner_id).order_by(desc('blocks')).all()
+
+    total = sum(blocks for _, blocks in counts)
+    top = counts[:limit]
+    miners = {m.id: m for m in session.query(Miner).filter(
+        Miner.id.in_([miner_id for miner_id, _ in top]))}
+    return {
+        'total_blocks': total,
+        'miners': [{
+            'miner': miners[miner_id].name,
+            'is_pool': miners[miner_id].is_pool,
+            'blocks': blocks,
+            'share': round(blocks * 100 / total, 4) if total else 0,
+        } for miner_id, blocks in top if miner_id in miners],
+    }
+
+
+def miner_blocks(session, miner_id: int, before: Optional[int], limit: int) -> List[Block]:
+    """Blocks mined by ``miner_id`` below height ``before``, newest first."""
+    query = session.query(Block).filter(Block.miner_id == miner_id)
+    if before is not None:
+        query = query.filter(Block.height < before)
+    return query.order_by(desc(Block.height)).limit(limit).all()
@@ -1,11 +1,16 @@
+import logging
 from datetime import datetime, timezone
+from typing import List
 from sqlalchemy import (
-    create_engine, Column, Integer, BigInteger, String, Float,
-    DateTime, Text, ForeignKey, Index, Boolean, event
+    create_engine, inspect, Column, Integer, BigInteger, String, Float,
+    DateTime, Text, ForeignKey, Index, Boolean, DDL, event, text
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -24,6 +29,14 @@ class Block(Base):
     nonce = Column(BigInteger)
     tx_count = Column(Integer, default=0)
     total_value = Column(BigInteger, default=0)
+    total_fees = Column(BigInteger)
+    size = Column(Integer)
+    input_count = Column(Integer)
+    output_count = Column(Integer)
+    min_fee_rate = Column(Float)
+    median_fee_rate = Column(Float)
+    max_fee_rate = Column(Float)
+    miner_id = Column(Integer)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     transactions = relationship('Transaction', back_populates='block', lazy='dynamic')
@@ -33,6 +46,7 @@ class Block(Base):
         Index('idx_block_height', 'height'),
         Index('idx_block_timestamp', 'timestamp'),
         Index('idx_block_prev_hash', 'prev_hash'),
+        Index('idx_block_miner_height', 'miner_id', 'height'),
     )
 
 
@@ -50,6 +64,7 @@ class Transaction(Base):
     total_input = Column(BigInteger, default=0)
     total_output = Column(BigInteger, default=0)
     fee = Column(BigInteger, default=0)
+    size = Column(Integer)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     block = relationship('Block', back_populates='transactions')
@@ -76,6 +91,7 @@ class TxInput(Base):
     prev_vout = Column(Integer)
     coinbase = Column(Text)
     script_sig = Column(Text)
+    script_sig_asm = Column(Text)
     sequence = Column(BigInteger)
 
     transaction = relationship('Transaction', back_populates='inputs')
@@ -99,6 +115,8 @@ class TxOutput(Base):
     address = Column(String(64))
     script_pubkey = Column(Text)
     script_type = Column(String(32))
+    script_info = Column(Text)
+    script_asm = Column(Text)
     spent = Column(Boolean, default=False)
     spent_by_txid = Column(String(64))
 
@@ -111,6 +129,9 @@ class TxOutput(Base):
         Index('idx_output_txid_vout', 'txid', 'vout'),
         Index('idx_output_spent', 'spent'),
         Index('idx_output_address_spent', 'address', 'spent'),
+        # Unspent outputs per address in id order, for UTXO listing.
+        Index('idx_output_unspent_address', 'address', 'id',
+              postgresql_where=text('spent = false'), sqlite_where=text('spent = 0')),
     )
 
 
@@ -135,6 +156,41 @@ class Address(Base):
     )
 
 
+class AddressHistory(Base):
+    """Balance of an address after each block that touched it."""
+    __tablename__ = 'address_history'
+
+    id = Column(Integer, primary_key=True)
+    address = Column(String(64), nullable=False)
+    height = Column(Integer, nullable=False)
+    received = Column(BigInteger, default=0)
+    sent = Column(BigInteger, default=0)
+    balance = Column(BigInteger, default=0)
+    tx_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_address_history_address_height', 'address', 'height', unique=True),
+    )
+
+
+class AddressReindex(Base):
+    """Staging table filled by sync.py --reindex-addresses."""
+    __tablename__ = 'address_reindex'
+
+    id = Column(Integer, primary_key=True)
+    address = Column(String(64), nullable=False)
+    total_received = Column(BigInteger, default=0)
+    total_sent = Column(BigInteger, default=0)
+    balance = Column(BigInteger, default=0)
+    tx_count = Column(Integer, default=0)
+    first_seen_block = Column(Integer)
+    last_seen_block = Column(Integer)
+
+    __table_args__ = (
+        Index('idx_address_reindex_address', 'address'),
+    )
+
+
 class ChainState(Base):
     __tablename__ = 'chain_state'
 
@@ -148,21 +204,283 @@ class ChainState(Base):
     )
 
 
-def _run_migrations(engine):
-    from sqlalchemy import inspect, text as sql_text
-    inspector = inspect(engine)
-    if 'tx_outputs' in inspector.get_table_names():
-        columns = [c['name'] for c in inspector.get_columns('tx_outputs')]
-        if 'script_type' not in columns:
-            with engine.connect() as conn:
-                conn.execute(sql_text(
-                    "ALTER TABLE tx_outputs ADD COLUMN script_type VARCHAR(32)"
-                ))
-                conn.commit()
+class SearchIndex(Base):
+    __tablename__ = 'search_index'
 
+    id = Column(Integer, primary_key=True)
+    prefix = Column(BigInteger, nullable=False)
+    kind = Column(String(8), nullable=False)
+    value = Column(String(64), nullable=False)
 
-def init_db(database_url: str, pool_size: int = 10, max_overflow: int = 20,
-            pool_timeout: int = 30, pool_recycle: int = 1800):
+    __table_args__ = (
+        Index('idx_search_prefix', 'prefix'),
+    )
+
+
+class MempoolTx(Base):
+    __tablename__ = 'mempool_txs'
+
+    id = Column(Integer, primary_key=True)
+    txid = Column(String(64), unique=True, nullable=False)
+    first_seen = Column(Integer)
+    total_input = Column(BigInteger, default=0)
+    total_output = Column(BigInteger, default=0)
+    fee = Column(BigInteger, default=0)
+    data = Column(Text)
+
+    __table_args__ = (
+        Index('idx_mempool_txid', 'txid'),
+    )
+
+
+class MempoolAddress(Base):
+    __tablename__ = 'mempool_addresses'
+
+    id = Column(Integer, primary_key=True)
+    txid = Column(String(64), nullable=False)
+    address = Column(String(64), nullable=False)
+    received = Column(BigInteger, default=0)
+    sent = Column(BigInteger, default=0)
+
+    __table_args__ = (
+        Index('idx_mempool_address_txid', 'txid'),
+        Index('idx_mempool_address_address', 'address'),
+    )
+
+
+class StatRollup(Base):
+    __tablename__ = 'stat_rollups'
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(8), nullable=False)
+    bucket = Column(Integer, nullable=False)
+    blocks = Column(Integer, default=0)
+    tx_count = Column(Integer, default=0)
+    volume = Column(BigInteger, default=0)
+    fees = Column(BigInteger, default=0)
+    new_addresses = Column(Integer, default=0)
+    block_intervals = Column(Integer, default=0)
+    block_time_sum = Column(BigInteger, default=0)
+    difficulty_sum = Column(Float, default=0)
+
+    __table_args__ = (
+        Index('idx_rollup_period_bucket', 'period', 'bucket', unique=True),
+    )
+
+
+class Miner(Base):
+    __tablename__ = 'miners'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(64), unique=True, nullable=False)
+    # True when matched from the pool table, False for an unknown payout address.
+    is_pool = Column(Boolean, default=False)
+
+
+class MinerRollup(Base):
+    __tablename__ = 'miner_rollups'
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(8), nullable=False)
+    bucket = Column(Integer, nullable=False)
+    miner_id = Column(Integer, nullable=False)
+    blocks = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_miner_rollup_period_bucket_miner', 'period', 'bucket', 'miner_id', unique=True),
+    )
+
+
+class NullData(Base):
+    __tablename__ = 'nulldata_outputs'
+
+    id = Column(Integer, primary_key=True)
+    height = Column(Integer, nullable=False)
+    txid = Column(String(64), nullable=False)
+    vout = Column(Integer, nullable=False)
+    # Leading hex digits of the payload, for prefix range scans; the
+    # payload itself can be too long for a btree entry.
+    prefix = Column(String(32), nullable=False)
+    data = Column(Text, nullable=False)
+    data_text = Column(Text)
+
+    __table_args__ = (
+        Index('idx_nulldata_prefix', 'prefix'),
+        Index('idx_nulldata_height', 'height'),
+        Index('idx_nulldata_txid', 'txid'),
+    )
+
+
+# Full-text search over nulldata_outputs.data_text: a GIN index on
+# PostgreSQL, an external-content FTS5 table kept current by triggers on SQLite.
+event.listen(NullData.__table__, 'after_create', DDL(
+    "CREATE INDEX idx_nulldata_text_fts ON nulldata_outputs "
+    "USING gin (to_tsvector('simple', coalesce(data_text, '')))"
+).execute_if(dialect='postgresql'))
+
+for _statement in (
+    "CREATE VIRTUAL TABLE nulldata_fts USING fts5("
+    "data_text, content='nulldata_outputs', content_rowid='id')",
+    "CREATE TRIGGER nulldata_fts_insert AFTER INSERT ON nulldata_outputs BEGIN "
+    "INSERT INTO nulldata_fts(rowid, data_text) VALUES (new.id, new.data_text); END",
+    "CREATE TRIGGER nulldata_fts_delete AFTER DELETE ON nulldata_outputs BEGIN "
+    "INSERT INTO nulldata_fts(nulldata_fts, rowid, data_text) "
+    "VALUES ('delete', old.id, old.data_text); END",
+):
+    event.listen(NullData.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+
+class OpcodeUse(Base):
+    __tablename__ = 'opcode_uses'
+
+    id = Column(Integer, primary_key=True)
+    opcode = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    txid = Column(String(64), nullable=False)
+    # Output index, or input index when is_input is set.
+    n = Column(Integer, nullable=False)
+    is_input = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index('idx_opcode_use_opcode_height', 'opcode', 'height', 'id'),
+        Index('idx_opcode_use_height', 'height'),
+    )
+
+
+class OpcodeRollup(Base):
+    __tablename__ = 'opcode_rollups'
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(8), nullable=False)
+    bucket = Column(Integer, nullable=False)
+    opcode = Column(Integer, nullable=False)
+    outputs = Column(Integer, default=0)
+    inputs = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('idx_opcode_rollup_period_bucket_opcode', 'period', 'bucket', 'opcode', unique=True),
+    )
+
+
+class UtxoCommitment(Base):
+    __tablename__ = 'utxo_commitments'
+
+    id = Column(Integer, primary_key=True)
+    height = Column(Integer, unique=True, nullable=False)
+    block_hash = Column(String(64))
+    utxo_hash = Column(String(64), nullable=False)
+    utxo_count = Column(BigInteger, default=0)
+    supply = Column(BigInteger, default=0)
+    tx_count = Column(BigInteger, default=0)
+
+    __table_args__ = (
+        Index('idx_utxo_commitment_height', 'height'),
+    )
+
+
+COLUMN_MIGRATIONS = [
+    ('tx_outputs', 'script_type', 'VARCHAR(32)'),
+    ('tx_outputs', 'script_info', 'TEXT'),
+    ('tx_outputs', 'script_asm', 'TEXT'),
+    ('tx_inputs', 'script_sig_asm', 'TEXT'),
+    ('transactions', 'size', 'INTEGER'),
+    ('blocks', 'total_fees', 'BIGINT'),
+    ('blocks', 'size', 'INTEGER'),
+    ('blocks', 'input_count', 'INTEGER'),
+    ('blocks', 'output_count', 'INTEGER'),
+    ('blocks', 'min_fee_rate', 'FLOAT'),
+    ('blocks', 'median_fee_rate', 'FLOAT'),
+    ('blocks', 'max_fee_rate', 'FLOAT'),
+    ('blocks', 'miner_id', 'INTEGER'),
+]
+
+# Indexes added to existing tables; create_all only builds new tables.
+# Building one on a large table takes a while, so they are created by
+# `sync.py --create-indexes` (create_indexes), never at startup.
+INDEX_MIGRATIONS = [
+    ('tx_outputs', 'idx_output_unspent_address'),
+    ('blocks', 'idx_block_miner_height'),
+]
+
+
+def _run_migrations(engine):
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    # Several processes start at once; IF NOT EXISTS keeps them from
+    # failing on each other's columns where the database supports it.
+    if_not_exists = 'IF NOT EXISTS ' if engine.dialect.name == 'postgresql' else ''
+    existing = {}
+    for table, column, ddl in COLUMN_MIGRATIONS:
+        if table not in tables:
+            continue
+        if table not in existing:
+            existing[table] = [c['name'] for c in inspector.get_columns(table)]
+        if column not in existing[table]:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ADD COLUMN {if_not_exists}{column} {ddl}"
+                    ))
+                    conn.commit()
+            except Exception as e:
+                logger.error(f'Migration failed: adding {table}.{column}: {e}')
+                continue
+            existing[table].append(column)
+
+    missing = missing_indexes(engine, inspector)
+    if missing:
+        logger.warning(f'Missing indexes: {", ".join(missing)}. '
+                       f'Run python sync.py --create-indexes to build them.')
+
+
+def missing_indexes(engine, inspector=None) -> List[str]:
+    inspector = inspector or inspect(engine)
+    tables = inspector.get_table_names()
+    missing = []
+    for table, name in INDEX_MIGRATIONS:
+        if table in tables and name not in {i['name'] for i in inspector.get_indexes(table)}:
+            missing.append(name)
+    return missing
+
+
+def create_indexes(engine) -> List[str]:
+    """Build the INDEX_MIGRATIONS indexes an existing database lacks.
+
+    On PostgreSQL each one is built with CREATE INDEX CONCURRENTLY, so the
+    syncer and the web app keep writing and reading the table meanwhile. A
+    concurrent build that failed leaves an invalid index behind, which is
+    dropped and built again.
+    """
+    postgres = engine.dialect.name == 'postgresql'
+    created = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        invalid = set()
+        if postgres:
+            conn.exec_driver_sql('SET statement_timeout = 0')
+            invalid = set(conn.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE NOT i.indisvalid"
+            )).scalars())
+        missing = set(missing_indexes(engine))
+        for table, name in INDEX_MIGRATIONS:
+            if name not in missing and name not in invalid:
+                continue
+            if name in invalid:
+                logger.info(f'Dropping invalid index {name}')
+                conn.exec_driver_sql(f'DROP INDEX CONCURRENTLY {name}')
+            index = next(i for i in Base.metadata.tables[table].indexes if i.name == name)
+            ddl = str(CreateIndex(index).compile(dialect=engine.dialect))
+            if postgres:
+                ddl = ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+            logger.info(f'Creating index {name} on {table}...')
+            conn.exec_driver_sql(ddl)
+            created.append(name)
+    return created
+
+
+def connect_db(database_url: str, pool_size: int = 10, max_overflow: int = 20,
+               pool_timeout: int = 30, pool_recycle: int = 1800):
+    """Engine and session factory without touching the schema, for read-only tools."""
     engine_kwargs = {
         'echo': False,
         'pool_pre_ping': True,
@@ -178,12 +496,14 @@ def init_db(database_url: str, pool_size: int = 10, max_overflow: int = 20,
         })
 
     engine = create_engine(database_url, **engine_kwargs)
+    return engine, sessionmaker(bind=engine)
+
+
+def init_db(database_url: str, pool_size: int = 10, max_overflow: int = 20,
+            pool_timeout: int = 30, pool_recycle: int = 1800):
+    engine, Session = connect_db(database_url, pool_size, max_overflow, pool_timeout, pool_recycle)
     Base.metadata.create_all(engine)
-    try:
-        _run_migrations(engine)
-    except Exception:
-        pass
-    Session = sessionmaker(bind=engine)
+    _run_migrations(engine)
     return engine, Session
 
 
@@ -0,0 +1,153 @@
+"""Network statistics shown on the home page, /api/stats and the event stream.
+
+Shared by the web app and events_server.py, so both send the same payload.
+"""
+
+import json
+
+from sqlalchemy import desc, func
+
+from models import Block, ChainState, Transaction
+
+BLOCK_TIME = 600
+MAX_TARGET = 0x7fffff * (2 ** 216)
+
+
+def calculate_hashrate_from_blocks(session, difficulty):
+    """
+    Simple hashrate calculation:
+    - Get last 30 blocks
+    - Calculate time taken
+    - Hashrate = (blocks * difficulty * 2^17) / time_elapsed
+    Note: Bitok has 17 leading zero bits (not Bitcoin's 32)
+    """
+    LOOKUP_BLOCKS = 30
+
+    # Get the last N blocks
+    best_block = session.query(Block).order_by(desc(Block.height)).first()
+    if not best_block or best_block.height < 2:
+        return 0, BLOCK_TIME
+
+    best_height = best_block.height
+    actual_lookup = min(best_height, LOOKUP_BLOCKS)
+
+    # Get blocks with timestamps
+    start_height = best_height - actual_lookup + 1
+    blocks = session.query(Block.timestamp).filter(
+        Block.height >= start_height,
+        Block.height <= best_height,
+        Block.timestamp.isnot(None)
+    ).order_by(Block.height).all()
+
+    if len(blocks) < 2:
+        return 0, BLOCK_TIME
+
+    # Calculate time span
+    timestamps = [b.timestamp for b in blocks]
+    time_span = timestamps[-1] - timestamps[0]
+
+    if time_span <= 0:
+        return 0, BLOCK_TIME
+
+    # Average block time
+    avg_block_time = time_span / (len(blocks) - 1)
+
+    # Simple hashrate formula
+    # At difficulty D, finding a block takes roughly D * 2^17 hashes (Bitok has 17 leading zero bits)
+    # We found N blocks in time_span seconds
+    # So hashrate = (N * D * 2^17) / time_span
+    if difficulty and difficulty > 0:
+        num_blocks = len(blocks) - 1  # Number of intervals
+        hashrate = (num_blocks * difficulty * pow(2, 17)) / time_span
+    else:
+        hashrate = 0
+
+    return hashrate, avg_block_time
+
+
+def calculate_hashrate(difficulty):
+    """Fallback: theoretical hashrate based on difficulty only"""
+    if difficulty is None or difficulty <= 0:
+        return 0
+    hashrate = difficulty * (2 ** 256) / MAX_TARGET / BLOCK_TIME
+    return hashrate
+
+
+def format_hashrate(hashrate):
+    if hashrate is None or hashrate <= 0:
+        return '0 H/s'
+    if hashrate >= 1e12:
+        return f'{hashrate / 1e12:.2f} TH/s'
+    elif hashrate >= 1e9:
+        return f'{hashrate / 1e9:.2f} GH/s'
+    elif hashrate >= 1e6:
+        return f'{hashrate / 1e6:.2f} MH/s'
+    elif hashrate >= 1e3:
+        return f'{hashrate / 1e3:.2f} kH/s'
+    else:
+        return f'{hashrate:.2f} H/s'
+
+
+def read_chain_state(session, key):
+    row = session.query(ChainState.value).filter_by(key=key).first()
+    return row[0] if row else None
+
+
+def build_network_stats(session, rpc):
+    synced_height = read_chain_state(session, 'synced_height')
+    synced = int(synced_height) if synced_height else 0
+
+    total_txs = read_chain_state(session, 'total_txs')
+    if total_txs is not None:
+        total_txs = int(total_txs)
+    else:
+        total_txs = session.query(func.count(Transaction.id)).scalar() or 0
+
+    network_info = read_chain_state(session, 'network_info')
+    if network_info:
+        network_info = json.loads(network_info)
+        difficulty = network_info.get('difficulty', 0)
+        connections = network_info.get('connections', 0)
+        chain_height = max(network_info.get('chain_height', synced), synced)
+    else:
+        try:
+            info = rpc.getinfo()
+            difficulty = info.get('difficulty', 0)
+            connections = info.get('connections', 0)
+            try:
+                chain_height = rpc.getblocknumber()
+            except:
+                chain_height = info.get('blocks', synced)
+        except:
+            difficulty = 0
+            connections = 0
+            chain_height = synced
+
+    hashrate, avg_block_time = calculate_hashrate_from_blocks(session, difficulty)
+    hashrate_formatted = format_hashrate(hashrate)
+
+    return {
+        'height': synced,
+        'chain_height': chain_height,
+        'difficulty': difficulty,
+        'connections': connections,
+        'total_txs': total_txs,
+        'hashrate': hashrate,
+        'hashrate_formatted': hashrate_formatted,
+        'avg_block_time': avg_block_time,
+    }
+
+
+def home_stats_payload(stats):
+    return {
+        'height': stats['height'],
+        'chain_height': stats['chain_height'],
+        'difficulty': stats['difficulty'],
+        'connections': stats['connections'],
+        'total_txs': stats['total_txs'],
+        'hashrate': stats['hashrate'],
+        'hashrate_formatted': stats['hashrate_formatted'],
+        'avg_block_time': round(stats['avg_block_time'], 1),
+        'target_block_time': BLOCK_TIME,
+        'synced': stats['height'] == stats['chain_height']
+    }
@@ -0,0 +1,106 @@
+"""OP_RETURN payloads, stored at sync time for listing and search.
+
+Every nulldata output gets a ``nulldata_outputs`` row with its height,
+txid, the pushed data as one hex string and its printable text. Hex
+queries are prefix range scans on ``idx_nulldata_prefix``; text queries use
+the full-text index (to_tsvector on PostgreSQL, FTS5 on SQLite). Results
+are newest first, paged by row id.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc, func, text
+
+from models import NullData, Transaction, TxOutput
+from script_decoder import classify_script
+
+PREFIX_DIGITS = 32
+HEX_RE = re.compile(r'^[0-9a-f]*$')
+WORD_RE = re.compile(r'\w+')
+
+
+def entry(height: int, txid: str, vout: int, script_info: Dict) -> Dict:
+    data = script_info.get('data_hex', '').replace(' ', '')
+    return {
+        'height': height,
+        'txid': txid,
+        'vout': vout,
+        'prefix': data[:PREFIX_DIGITS],
+        'data': data,
+        'data_text': script_info.get('data_text') or None,
+    }
+
+
+def is_hex_query(query: str) -> bool:
+    return bool(HEX_RE.match(query.lower()))
+
+
+def hex_prefix_filter(query, prefix: str):
+    prefix = prefix.lower()
+    if len(prefix) >= PREFIX_DIGITS:
+        return query.filter(NullData.prefix == prefix[:PREFIX_DIGITS],
+                            NullData.data.startswith(prefix, autoescape=True))
+    # Every hex digit sorts below 'g', so this range is exactly the prefix.
+    return query.filter(NullData.prefix >= prefix, NullData.prefix < prefix + 'g')
+
+
+def text_filter(session, query, words: List[str]):
+    if session.bind.dialect.name == 'postgresql':
+        return query.filter(
+            func.to_tsvector('simple', func.coalesce(NullData.data_text, '')).op('@@')(
+                func.plainto_tsquery('simple', ' '.join(words)))
+        )
+    # Quoted tokens so user input is never parsed as FTS5 query syntax.
+    match = ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+    return query.filter(NullData.id.in_(
+        text('SELECT rowid FROM nulldata_fts WHERE nulldata_fts MATCH :match').bindparams(match=match)
+    ))
+
+
+def load_nulldata(session, hex_prefix: Optional[str] = None, query: Optional[str] = None,
+                  before: Optional[int] = None, limit: int = 50) -> List[NullData]:
+    rows = session.query(NullData)
+    if hex_prefix:
+        rows = hex_prefix_filter(rows, hex_prefix)
+    if query:
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        rows = text_filter(session, rows, words)
+    if before is not None:
+        rows = rows.filter(NullData.id < before)
+    return rows.order_by(desc(NullData.id)).limit(limit).all()
+
+
+def backfill_nulldata(session, batch: int = 5000) -> int:
+    """Rebuild nulldata_outputs from stored nulldata outputs.
+
+    Outputs synced before script decodings were stored have no script_info;
+    their scripts are classified here instead.
+    """
+    session.query(NullData).delete()
+    last_id = 0
+    count = 0
+    while True:
+        outputs = session.query(
+            TxOutput.id, TxOutput.txid, TxOutput.vout, TxOutput.script_info,
+            TxOutput.script_pubkey, Transaction.block_height
+        ).join(
+            Transaction, Transaction.id == TxOutput.tx_id
+        ).filter(
+            TxOutput.id > last_id,
+            TxOutput.script_type == 'nulldata'
+        ).order_by(TxOutput.id).limit(batch).all()
+        if not outputs:
+            break
+        session.bulk_insert_mappings(NullData, [
+            entry(height, txid, vout,
+                  json.loads(script_info) if script_info else classify_script(script_pubkey))
+            for _, txid, vout, script_info, script_pubkey, height in outputs
+        ])
+        last_id = outputs[-1][0]
+        count += len(outputs)
+        session.commit()
+    return count
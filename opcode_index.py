@@ -0,0 +1,168 @@
+"""Inverted index of the re-enabled opcodes used in scripts.
+
+The syncer records one ``opcode_uses`` row per output script or input
+scriptSig and per advanced opcode (ADVANCED_OPCODES) it executes, with the
+height and txid, and counts them by hour and day in ``opcode_rollups``.
+"Outputs using OP_CAT since height X" is a range scan on
+idx_opcode_use_opcode_height and usage over time reads the rollups, so no
+request decodes stored scripts.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func, tuple_
+
+from models import Block, OpcodeRollup, OpcodeUse, Transaction, TxInput, TxOutput
+from rollups import KeyedRollupAccumulator
+from script_decoder import ADVANCED_OPCODES, OPCODES, script_opcodes
+
+logger = logging.getLogger(__name__)
+
+TRACKED = {byte: name for byte, name in OPCODES.items() if name in ADVANCED_OPCODES}
+TRACKED_BYTES = frozenset(TRACKED)
+BY_NAME = {name: byte for byte, name in TRACKED.items()}
+
+
+def tracked_opcodes(hex_script: Optional[str]) -> List[int]:
+    if not hex_script:
+        return []
+    try:
+        raw = bytes.fromhex(hex_script)
+    except ValueError:
+        return []
+    # Most scripts contain none of the tracked byte values even as data.
+    if TRACKED_BYTES.isdisjoint(raw):
+        return []
+    return sorted(script_opcodes(raw) & TRACKED_BYTES)
+
+
+def opcode_rollups() -> KeyedRollupAccumulator:
+    return KeyedRollupAccumulator(OpcodeRollup, 'opcode', ('outputs', 'inputs'))
+
+
+def add_uses(rollups: KeyedRollupAccumulator, timestamp: Optional[int], uses: List[Dict]):
+    if timestamp is None:
+        return
+    for use in uses:
+        if use['is_input']:
+            rollups.add(timestamp, use['opcode'], inputs=1)
+        else:
+            rollups.add(timestamp, use['opcode'], outputs=1)
+
+
+def script_uses(hex_script: Optional[str], height: int, txid: str, n: int,
+                is_input: bool) -> List[Dict]:
+    return [{'opcode': opcode, 'height': height, 'txid': txid, 'n': n, 'is_input': is_input}
+            for opcode in tracked_opcodes(hex_script)]
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+    """``height:id`` of the last row on the previous page."""
+    if not cursor:
+        return None
+    height, _, row_id = cursor.partition(':')
+    return int(height), int(row_id)
+
+
+def load_uses(session, opcode: int, since: int = 0, kind: Optional[str] = None,
+              cursor: Optional[Tuple[int, int]] = None, limit: int = 50) -> List[OpcodeUse]:
+    """Uses of ``opcode`` at or above height ``since``, oldest first."""
+    query = session.query(OpcodeUse).filter(
+        OpcodeUse.opcode == opcode,
+        OpcodeUse.height >= since
+    )
+    if kind is not None:
+        query = query.filter(OpcodeUse.is_input == (kind == 'input'))
+    if cursor is not None:
+        query = query.filter(tuple_(OpcodeUse.height, OpcodeUse.id) > tuple_(*cursor))
+    return query.order_by(OpcodeUse.height, OpcodeUse.id).limit(limit).all()
+
+
+def opcode_totals(session, period: str, start: Optional[int] = None,
+                  end: Optional[int] = None) -> List[Dict]:
+    query = session.query(
+        OpcodeRollup.opcode, func.sum(OpcodeRollup.outputs), func.sum(OpcodeRollup.inputs)
+    ).filter(OpcodeRollup.period == period)
+    if start is not None:
+        query = query.filter(OpcodeRollup.bucket >= start)
+    if end is not None:
+        query = query.filter(OpcodeRollup.bucket <= end)
+    counts = {opcode: (outputs, inputs) for opcode, outputs, inputs in query.group_by(OpcodeRollup.opcode)}
+    return [{
+        'opcode': name,
+        'outputs': int(counts.get(byte, (0, 0))[0] or 0),
+        'inputs': int(counts.get(byte, (0, 0))[1] or 0),
+    } for byte, name in sorted(TRACKED.items())]
+
+
+def opcode_series(session, opcode: int, period: str, start: Optional[int] = None,
+                  end: Optional[int] = None, limit: int = 1000) -> List[Dict]:
+    """Per-bucket use counts of ``opcode``, newest last; empty buckets are omitted."""
+    query = session.query(OpcodeRollup).filter(
+        OpcodeRollup.period == period,
+        OpcodeRollup.opcode == opcode
+    )
+    if start is not None:
+        query = query.filter(OpcodeRollup.bucket >= start)
+    if end is not None:
+        query = query.filter(OpcodeRollup.bucket <= end)
+    rows = query.order_by(desc(OpcodeRollup.bucket)).limit(limit).all()
+    return [{'time': row.bucket, 'outputs': row.outputs, 'inputs': row.inputs}
+            for row in reversed(rows)]
+
+
+def rebuild_opcode_rollups(session):
+    """Recompute opcode rollups from opcode_uses."""
+    session.query(OpcodeRollup).delete()
+    rollups = opcode_rollups()
+    rows = session.query(
+        Block.timestamp, OpcodeUse.opcode, OpcodeUse.is_input, func.count()
+    ).join(
+        Block, Block.height == OpcodeUse.height
+    ).group_by(Block.timestamp, OpcodeUse.opcode, OpcodeUse.is_input)
+    for timestamp, opcode, is_input, count in rows:
+        if timestamp is not None:
+            rollups.add(timestamp, opcode, **{'inputs' if is_input else 'outputs': count})
+    rollups.flush(session)
+
+
+def rebuild_opcode_index(session, batch: int = 10000) -> int:
+    """Rebuild opcode_uses by scanning every stored script once."""
+    session.query(OpcodeUse).delete()
+    count = 0
+    sources = (
+        (TxOutput, TxOutput.script_pubkey, TxOutput.vout, False),
+        (TxInput, TxInput.script_sig, TxInput.id, True),
+    )
+    for model, script_column, n_column, is_input in sources:
+        last_id = 0
+        prev_tx_id, n = None, 0
+        while True:
+            rows = session.query(
+                model.id, model.tx_id, model.txid, script_column, n_column,
+                Transaction.block_height
+            ).join(
+                Transaction, Transaction.id == model.tx_id
+            ).filter(model.id > last_id).order_by(model.id).limit(batch).all()
+            if not rows:
+                break
+            uses = []
+            for row_id, tx_id, txid, script, vout, height in rows:
+                if is_input:
+                    # A transaction's inputs are stored together and in
+                    # order, so the index is the position within the run.
+                    n = n + 1 if tx_id == prev_tx_id else 0
+                    prev_tx_id = tx_id
+                else:
+                    n = vout
+                uses += script_uses(script, height, txid, n, is_input)
+            if uses:
+                session.bulk_insert_mappings(OpcodeUse, uses)
+            count += len(uses)
+            last_id = rows[-1][0]
+            session.commit()
+        logger.info(f'Opcode index: scanned {model.__tablename__}, {count} uses so far')
+    rebuild_opcode_rollups(session)
+    session.commit()
+    return count
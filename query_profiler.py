@@ -0,0 +1,93 @@
+"""SQL instrumentation via SQLAlchemy engine events.
+
+install() times every statement an engine executes. Statements slower than
+``slow_query_ms`` are logged. While a QueryProfile is active in the current
+context (the web app starts one per request when QUERY_PROFILING is on),
+each statement is also recorded there: count, total time, the slowest
+statements, and how often the same SQL text ran. The same parameterised
+statement running many times in one request is the N+1 pattern.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+current_profile: ContextVar[Optional['QueryProfile']] = ContextVar('query_profile', default=None)
+
+
+def short_sql(statement: str, limit: int = 300) -> str:
+    text = ' '.join(statement.split())
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class QueryProfile:
+    def __init__(self, label: str = '', keep_slowest: int = 3):
+        self.label = label
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = {}
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if len(self.slowest) < self.keep_slowest or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.keep_slowest:]
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements that ran at least ``threshold`` times, most frequent first."""
+        if threshold <= 0:
+            return []
+        found = [(sql, n) for sql, n in self.statements.items() if n >= threshold]
+        return sorted(found, key=lambda item: item[1], reverse=True)
+
+    def total_ms(self) -> float:
+        return self.total_time * 1000
+
+
+def start_profile(label: str = '', keep_slowest: int = 3) -> QueryProfile:
+    profile = QueryProfile(label, keep_slowest)
+    current_profile.set(profile)
+    return profile
+
+
+def stop_profile() -> Optional[QueryProfile]:
+    profile = current_profile.get()
+    current_profile.set(None)
+    return profile
+
+
+def install(engine, slow_query_ms: float = 0):
+    """Attach the timing hooks to ``engine``; a slow_query_ms of 0 disables the slow log."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, duration)
+        if slow_query_ms and duration * 1000 >= slow_query_ms:
+            where = f' [{profile.label}]' if profile is not None and profile.label else ''
+            logger.warning(f'Slow query{where} ({duration * 1000:.1f} ms): {short_sql(statement)}')
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('query_start'):
+            conn.info['query_start'].pop()
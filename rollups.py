@@ -0,0 +1,188 @@
+"""Hourly and daily chain statistics for charts.
+
+The syncer feeds every block into a RollupAccumulator and flushes it with
+each batch commit, adding to the ``stat_rollups`` row for the block's hour
+and day. Rows hold only sums, so averages, difficulty and hashrate are
+derived when a point is read and chart queries touch one row per point.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import desc, func
+
+from models import Block, Transaction, Address, StatRollup
+from lookups import chunked
+
+PERIODS = {'hour': 3600, 'day': 86400}
+
+MAX_TARGET = 0x7fffff * (2 ** 216)
+# Bitok blocks need 17 leading zero bits at difficulty 1.
+HASHES_PER_DIFFICULTY = 2 ** 17
+
+COUNTERS = ('blocks', 'tx_count', 'volume', 'fees', 'new_addresses',
+            'block_intervals', 'block_time_sum', 'difficulty_sum')
+
+
+def bits_to_difficulty(bits: Optional[int]) -> float:
+    if not bits:
+        return 0.0
+    exponent = bits >> 24
+    mantissa = bits & 0xffffff
+    if not mantissa:
+        return 0.0
+    target = mantissa * (1 << (8 * (exponent - 3))) if exponent >= 3 else mantissa >> (8 * (3 - exponent))
+    return MAX_TARGET / target if target else 0.0
+
+
+class RollupAccumulator:
+    def __init__(self):
+        self.pending: Dict[tuple, Dict[str, float]] = {}
+
+    def add_block(self, timestamp: int, prev_timestamp: Optional[int], tx_count: int,
+                  volume: int, fees: int, new_addresses: int, bits: Optional[int]):
+        difficulty = bits_to_difficulty(bits)
+        for period, seconds in PERIODS.items():
+            key = (period, timestamp - timestamp % seconds)
+            counters = self.pending.get(key)
+            if counters is None:
+                counters = self.pending[key] = dict.fromkeys(COUNTERS, 0)
+            counters['blocks'] += 1
+            counters['tx_count'] += tx_count
+            counters['volume'] += volume
+            counters['fees'] += fees
+            counters['new_addresses'] += new_addresses
+            counters['difficulty_sum'] += difficulty
+            if prev_timestamp is not None:
+                counters['block_intervals'] += 1
+                counters['block_time_sum'] += timestamp - prev_timestamp
+
+    def flush(self, session):
+        if not self.pending:
+            return
+        existing = {}
+        for period in PERIODS:
+            buckets = [bucket for (p, bucket) in self.pending if p == period]
+            for chunk in chunked(buckets):
+                for row in session.query(StatRollup).filter(
+                    StatRollup.period == period,
+                    StatRollup.bucket.in_(chunk)
+                ):
+                    existing[(period, row.bucket)] = row
+
+        for (period, bucket), counters in self.pending.items():
+            row = existing.get((period, bucket))
+            if row is None:
+                row = StatRollup(period=period, bucket=bucket, **dict.fromkeys(COUNTERS, 0))
+                session.add(row)
+            for name, value in counters.items():
+                setattr(row, name, (getattr(row, name) or 0) + value)
+        self.pending.clear()
+
+    def clear(self):
+        self.pending.clear()
+
+
+class KeyedRollupAccumulator:
+    """Hour and day counters split by a key, such as a miner or an opcode.
+
+    ``model`` rows have ``period``, ``bucket``, the ``key`` column and the
+    integer ``counters`` columns, unique on (period, bucket, key).
+    """
+
+    def __init__(self, model, key: str, counters: Tuple[str, ...]):
+        self.model = model
+        self.key = key
+        self.counters = counters
+        self.pending: Dict[tuple, Dict[str, int]] = {}
+
+    def add(self, timestamp: int, key, **counts: int):
+        for period, seconds in PERIODS.items():
+            pending_key = (period, timestamp - timestamp % seconds, key)
+            counters = self.pending.get(pending_key)
+            if counters is None:
+                counters = self.pending[pending_key] = dict.fromkeys(self.counters, 0)
+            for name, value in counts.items():
+                counters[name] += value
+
+    def flush(self, session):
+        if not self.pending:
+            return
+        model = self.model
+        existing = {}
+        for period in PERIODS:
+            buckets = sorted({bucket for (p, bucket, _) in self.pending if p == period})
+            for chunk in chunked(buckets):
+                for row in session.query(model).filter(
+                    model.period == period,
+                    model.bucket.in_(chunk)
+                ):
+                    existing[(period, row.bucket, getattr(row, self.key))] = row
+
+        for (period, bucket, key), counters in self.pending.items():
+            row = existing.get((period, bucket, key))
+            if row is None:
+                session.add(model(period=period, bucket=bucket, **{self.key: key}, **counters))
+            else:
+                for name, value in counters.items():
+                    setattr(row, name, (getattr(row, name) or 0) + value)
+        self.pending.clear()
+
+    def clear(self):
+        self.pending.clear()
+
+
+def rebuild_rollups(session):
+    """Recompute all rollups from the blocks table (one pass)."""
+    session.query(StatRollup).delete()
+
+    fees = dict(session.query(
+        Transaction.block_height, func.sum(Transaction.fee)
+    ).group_by(Transaction.block_height))
+    new_addresses = dict(session.query(
+        Address.first_seen_block, func.count(Address.id)
+    ).group_by(Address.first_seen_block))
+
+    accumulator = RollupAccumulator()
+    prev_timestamp = None
+    rows = session.query(
+        Block.height, Block.timestamp, Block.tx_count, Block.total_value, Block.bits
+    ).order_by(Block.height).yield_per(5000)
+    for height, timestamp, tx_count, total_value, bits in rows:
+        if timestamp is None:
+            continue
+        accumulator.add_block(timestamp, prev_timestamp, tx_count or 0, total_value or 0,
+                              int(fees.get(height) or 0), new_addresses.get(height, 0), bits)
+        prev_timestamp = timestamp
+    accumulator.flush(session)
+
+
+def rollup_point(row: StatRollup) -> Dict:
+    difficulty = row.difficulty_sum / row.blocks if row.blocks else 0
+    avg_block_time = row.block_time_sum / row.block_intervals if row.block_intervals else None
+    if row.block_time_sum and row.block_time_sum > 0:
+        hashrate = difficulty * row.block_intervals * HASHES_PER_DIFFICULTY / row.block_time_sum
+    else:
+        hashrate = 0
+    return {
+        'time': row.bucket,
+        'blocks': row.blocks,
+        'tx_count': row.tx_count,
+        'volume': row.volume,
+        'fees': row.fees,
+        'new_addresses': row.new_addresses,
+        'avg_block_time': round(avg_block_time, 1) if avg_block_time is not None else None,
+        'difficulty': difficulty,
+        'hashrate': hashrate,
+    }
+
+
+def load_series(session, period: str, start: Optional[int] = None,
+                end: Optional[int] = None, limit: int = 1000) -> List[Dict]:
+    """Return up to ``limit`` points for ``period``, newest last."""
+    query = session.query(StatRollup).filter(StatRollup.period == period)
+    if start is not None:
+        query = query.filter(StatRollup.bucket >= start)
+    if end is not None:
+        query = query.filter(StatRollup.bucket <= end)
+    rows = query.order_by(desc(StatRollup.bucket)).limit(limit).all()
+    return [rollup_point(row) for row in reversed(rows)]
@@ -1,12 +1,13 @@
 import requests
 import json
-from typing import Any, Optional, List, Dict
+from typing import Any, List, Dict
 
 
 class BitokRPC:
     def __init__(self, host: str = '127.0.0.1', port: int = 8332,
-                 user: str = '', password: str = ''):
+                 user: str = '', password: str = '', timeout: float = 30):
         self.url = f'http://{host}:{port}/'
+        self.timeout = timeout
         self.auth = (user, password) if user and password else None
         self.headers = {'content-type': 'application/json'}
         self._id = 0
@@ -25,7 +26,7 @@ class BitokRPC:
                 data=json.dumps(payload),
                 headers=self.headers,
                 auth=self.auth,
-                timeout=30
+                timeout=self.timeout
             )
             response.raise_for_status()
             result = response.json()
@@ -37,6 +38,52 @@ class BitokRPC:
         except requests.exceptions.Timeout:
             raise Exception('Connection to Bitok daemon timed out')
 
+    def batch(self, calls: List[tuple]) -> List[Any]:
+        """Run [(method, params), ...] as one JSON-RPC batch request.
+
+        Failed calls come back as None. Daemons that reject batch requests
+        are called one method at a time instead.
+        """
+        payload = []
+        for method, params in calls:
+            self._id += 1
+            payload.append({
+                'jsonrpc': '1.0',
+                'id': self._id,
+                'method': method,
+                'params': params or []
+            })
+        try:
+            response = requests.post(
+                self.url,
+                data=json.dumps(payload),
+                headers=self.headers,
+                auth=self.auth,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            replies = response.json()
+        except requests.exceptions.ConnectionError:
+            raise Exception('Cannot connect to Bitok daemon')
+        except (requests.exceptions.RequestException, ValueError):
+            replies = None
+
+        if not isinstance(replies, list):
+            results = []
+            for method, params in calls:
+                try:
+                    results.append(self._call(method, params))
+                except Exception:
+                    results.append(None)
+            return results
+
+        by_id = {reply.get('id'): reply for reply in replies}
+        results = []
+        for request in payload:
+            reply = by_id.get(request['id']) or {}
+            results.append(None if reply.get('error') else reply.get('result'))
+        return results
+
     def getinfo(self) -> Dict:
         return self._call('getinfo')
 
@@ -70,6 +117,9 @@ class BitokRPC:
     def getrawmempool(self) -> List[str]:
         return self._call('getrawmempool')
 
+    def gettxoutsetinfo(self) -> Dict:
+        return self._call('gettxoutsetinfo')
+
     def validateaddress(self, address: str) -> Dict:
         return self._call('validateaddress', [address])
 
@@ -88,3 +138,4 @@ class BitokRPC:
             return True
         except:
             return False
+
@@ -26,16 +26,21 @@ case "$1" in
         echo "Starting web server on port 5000..."
         python app.py
         ;;
+    events)
+        echo "Starting live update server..."
+        python events_server.py
+        ;;
     production)
         echo "Starting production server..."
-        gunicorn -w 4 -b 0.0.0.0:5000 app:app
+        WEB_BIND=${WEB_BIND:-0.0.0.0:5000} gunicorn -c gunicorn.conf.py app:app
         ;;
     *)
-        echo "Usage: $0 {sync|sync-once|web|production}"
+        echo "Usage: $0 {sync|sync-once|web|events|production}"
         echo ""
         echo "  sync       - Start continuous blockchain sync"
         echo "  sync-once  - Run sync once and exit"
         echo "  web        - Start development web server"
+        echo "  events     - Start the /api/events server (events_server.py)"
         echo "  production - Start production server with gunicorn"
         exit 1
         ;;
@@ -1,3 +1,7 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
 OPCODES = {
     0x00: 'OP_0', 0x4c: 'OP_PUSHDATA1', 0x4d: 'OP_PUSHDATA2', 0x4e: 'OP_PUSHDATA4',
     0x4f: 'OP_1NEGATE',
@@ -116,6 +120,15 @@ OPCODE_DESCRIPTIONS = {
 
 SCRIPT_EXEC_HEIGHT = 18000
 
+# Opcodes that Bitok re-enables at SCRIPT_EXEC_HEIGHT.
+ADVANCED_OPCODES = frozenset({
+    'OP_CAT', 'OP_SUBSTR', 'OP_LEFT', 'OP_RIGHT',
+    'OP_INVERT', 'OP_AND', 'OP_OR', 'OP_XOR',
+    'OP_MUL', 'OP_DIV', 'OP_MOD', 'OP_LSHIFT', 'OP_RSHIFT',
+})
+
+HTML_CACHE_SIZE = 8192
+
 
 def decode_script(hex_script):
     if not hex_script:
@@ -126,6 +139,10 @@ def decode_script(hex_script):
     except (ValueError, TypeError):
         return []
 
+    return decode_script_bytes(raw)
+
+
+def decode_script_bytes(raw):
     ops = []
     i = 0
     while i < len(raw):
@@ -167,6 +184,27 @@ def decode_script(hex_script):
     return ops
 
 
+def script_opcodes(raw):
+    """Set of opcode bytes executed by a script, skipping pushed data."""
+    found = set()
+    i = 0
+    end = len(raw)
+    while i < end:
+        opcode = raw[i]
+        i += 1
+        if 1 <= opcode <= 75:
+            i += opcode
+        elif opcode == 0x4c:
+            i += 1 + (raw[i] if i < end else 0)
+        elif opcode == 0x4d:
+            i += 2 + (raw[i] | (raw[i + 1] << 8) if i + 1 < end else 0)
+        elif opcode == 0x4e:
+            i += 4 + (int.from_bytes(raw[i:i + 4], 'little') if i + 3 < end else 0)
+        else:
+            found.add(opcode)
+    return found
+
+
 def script_to_asm(hex_script):
     ops = decode_script(hex_script)
     parts = []
@@ -178,8 +216,60 @@ def script_to_asm(hex_script):
     return ' '.join(parts)
 
 
+def _classify_template(raw):
+    n = len(raw)
+    if (n == 25 and raw[0] == 0x76 and raw[1] == 0xa9 and raw[2] == 0x14
+            and raw[23] == 0x88 and raw[24] == 0xac):
+        return {
+            'type': 'pubkeyhash',
+            'label': 'P2PKH',
+            'description': 'Pay to Public Key Hash',
+            'pubkey_hash': raw[3:23].hex(),
+            'req_sigs': 1,
+        }
+
+    if ((n == 35 and raw[0] == 33) or (n == 67 and raw[0] == 65)) and raw[n - 1] == 0xac:
+        return {
+            'type': 'pubkey',
+            'label': 'P2PK',
+            'description': 'Pay to Public Key',
+            'pubkey': raw[1:n - 1].hex(),
+            'req_sigs': 1,
+        }
+
+    return None
+
+
 def classify_script(hex_script):
-    ops = decode_script(hex_script)
+    if not hex_script:
+        return _classify_ops([])
+
+    try:
+        raw = bytes.fromhex(hex_script)
+    except (ValueError, TypeError):
+        return _classify_ops([])
+
+    return classify_script_bytes(raw)
+
+
+def classify_script_bytes(raw):
+    """Classify a raw script given as bytes or memoryview.
+
+    Standard P2PKH and P2PK outputs are recognised from their length and
+    fixed bytes without tokenizing; everything else goes through
+    decode_script_bytes.
+    """
+    info = _classify_template(raw)
+    if info is not None:
+        return info
+    return _classify_ops(decode_script_bytes(raw))
+
+
+def classify_script_tokenized(hex_script):
+    return _classify_ops(decode_script(hex_script))
+
+
+def _classify_ops(ops):
     if not ops:
         return {'type': 'nonstandard', 'label': 'Empty', 'addresses': [], 'req_sigs': 0}
 
@@ -256,14 +346,9 @@ def classify_script(hex_script):
         }
 
     has_advanced = False
-    advanced_ops = {
-        'OP_CAT', 'OP_SUBSTR', 'OP_LEFT', 'OP_RIGHT',
-        'OP_INVERT', 'OP_AND', 'OP_OR', 'OP_XOR',
-        'OP_MUL', 'OP_DIV', 'OP_MOD', 'OP_LSHIFT', 'OP_RSHIFT',
-    }
     found_ops = set()
     for op in ops:
-        if op.get('name') in advanced_ops:
+        if op.get('name') in ADVANCED_OPCODES:
             has_advanced = True
             found_ops.add(op['name'])
 
@@ -374,3 +459,48 @@ def format_asm_html(hex_script, is_scriptsig=False):
             parts.append(f'<span class="{css}" title="{desc}">{name}</span>')
 
     return ' '.join(parts)
+
+
+class ScriptHtmlCache:
+    """LRU memo of format_asm_html output keyed by the script's hash."""
+
+    def __init__(self, maxsize=HTML_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, hex_script, is_scriptsig=False):
+        if not hex_script:
+            return ''
+        key = hashlib.sha256(hex_script.encode('ascii', 'replace')).digest()
+        if is_scriptsig:
+            key = b'S' + key
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = format_asm_html(hex_script, is_scriptsig=is_scriptsig)
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+html_cache = ScriptHtmlCache()
+
+
+def format_asm_html_cached(hex_script, is_scriptsig=False):
+    return html_cache.get(hex_script, is_scriptsig=is_scriptsig)
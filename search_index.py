@@ -0,0 +1,77 @@
+"""Prefix search over block hashes, txids and addresses.
+
+Every searchable value gets a row in ``search_index`` whose ``prefix`` is an
+integer made from its leading characters: the first 12 hex digits for
+hashes and txids, the first 8 base58 digits (offset above the hex range)
+for addresses. A partial query becomes an integer range scan on
+``idx_search_prefix`` instead of a LIKE over String(64) columns.
+"""
+
+from typing import Dict, List
+
+from models import SearchIndex
+from address_utils import B58_INDEX
+
+HEX_DIGITS = 12
+B58_DIGITS = 8
+ADDRESS_OFFSET = 1 << 50
+MIN_QUERY_LENGTH = 4
+
+HEX_CHARS = set('0123456789abcdef')
+
+
+def hex_key(value: str) -> int:
+    return int(value[:HEX_DIGITS], 16)
+
+
+def address_key(value: str) -> int:
+    n = 0
+    for c in value[:B58_DIGITS]:
+        n = n * 58 + B58_INDEX[c]
+    return ADDRESS_OFFSET + n
+
+
+def entry(kind: str, value: str) -> Dict:
+    key = address_key(value) if kind == 'address' else hex_key(value)
+    return {'prefix': key, 'kind': kind, 'value': value}
+
+
+def _ranges(query: str):
+    ranges = []
+    lowered = query.lower()
+    if all(c in HEX_CHARS for c in lowered):
+        q = lowered[:HEX_DIGITS]
+        shift = 4 * (HEX_DIGITS - len(q))
+        start = int(q, 16) << shift
+        ranges.append((lowered, ('block', 'tx'), start, start + (1 << shift) - 1))
+    if all(c in B58_INDEX for c in query):
+        q = query[:B58_DIGITS]
+        n = 0
+        for c in q:
+            n = n * 58 + B58_INDEX[c]
+        scale = 58 ** (B58_DIGITS - len(q))
+        start = ADDRESS_OFFSET + n * scale
+        ranges.append((query, ('address',), start, start + scale - 1))
+    return ranges
+
+
+def search_prefix(session, query: str, limit: int = 20) -> List[Dict]:
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+
+    results = []
+    for needle, kinds, start, end in _ranges(query):
+        rows = session.query(SearchIndex.kind, SearchIndex.value).filter(
+            SearchIndex.prefix >= start,
+            SearchIndex.prefix <= end
+        ).order_by(SearchIndex.prefix)
+        # Beyond the indexed digits a range holds only a handful of
+        # colliding rows, which are narrowed down in Python.
+        if len(needle) <= (B58_DIGITS if kinds == ('address',) else HEX_DIGITS):
+            rows = rows.limit(limit)
+        for kind, value in rows:
+            if kind in kinds and value.startswith(needle):
+                results.append({'kind': kind, 'value': value})
+                if len(results) >= limit:
+                    return results
+    return results
@@ -65,6 +65,6 @@ echo "4. Start the web explorer:"
 echo "   source venv/bin/activate"
 echo "   python app.py"
 echo "   # Or for production:"
-echo "   gunicorn -w 4 -b 0.0.0.0:5000 app:app"
+echo "   gunicorn -c gunicorn.conf.py app:app"
 echo ""
 echo "The explorer will be available at http://localhost:5000"
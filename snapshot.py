@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Export and import database snapshots for bootstrapping new explorer nodes.
+
+    python snapshot.py export explorer-150000.snap [--height 150000]
+    python snapshot.py verify explorer-150000.snap
+    python snapshot.py import explorer-150000.snap
+
+A snapshot is an uncompressed tar of gzip-compressed NDJSON chunks (one JSON
+array per row) plus a manifest.json with the columns, row counts and a
+sha256 per chunk. Everything at or below the snapshot height is included:
+miners, blocks, transactions, inputs, outputs, UTXO commitments, address
+balance history, OP_RETURN payloads and opcode uses, with outputs spent
+above the height exported as unspent. A snapshot taken at the synced
+height also carries the derived tables (addresses, search index, chart,
+miner and opcode rollups and chain state); below it, import recomputes
+them locally.
+
+Import bulk-loads into an empty database and sets synced_height, so
+sync.py carries on from the next block.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import sys
+import tarfile
+import time
+
+from sqlalchemy import DateTime, select, text
+from sqlalchemy.orm import aliased
+
+from config import Config
+from models import (
+    init_db, Base, Block, Transaction, TxInput, TxOutput, AddressHistory, ChainState, NullData,
+    OpcodeUse, UtxoCommitment
+)
+
+FORMAT_VERSION = 1
+CHUNK_ROWS = 100000
+MANIFEST = 'manifest.json'
+
+# Parents before children so foreign keys hold while loading.
+CORE_TABLES = ('miners', 'blocks', 'transactions', 'tx_inputs', 'tx_outputs', 'utxo_commitments',
+               'address_history', 'nulldata_outputs', 'opcode_uses')
+ROLLUP_TABLES = ('stat_rollups', 'miner_rollups', 'opcode_rollups')
+DERIVED_TABLES = ('addresses', 'search_index') + ROLLUP_TABLES + ('chain_state',)
+# Checkpoints that only mean something in the database that wrote them.
+LOCAL_STATE_KEYS = ('reindex_addresses',)
+
+
+def snapshot_columns(table):
+    # Timestamps of when rows were written are not part of the chain data.
+    return [c for c in table.columns if not isinstance(c.type, DateTime)]
+
+
+def table_query(name, height):
+    table = Base.metadata.tables[name]
+    columns = snapshot_columns(table)
+    if name == 'blocks':
+        query = select(*columns).where(Block.height <= height)
+    elif name == 'transactions':
+        query = select(*columns).where(Transaction.block_height <= height)
+    elif name == 'tx_inputs':
+        query = select(*columns).join(Transaction, Transaction.id == TxInput.tx_id).where(
+            Transaction.block_height <= height)
+    elif name == 'tx_outputs':
+        spender = aliased(Transaction)
+        query = select(*columns, spender.block_height).join(
+            Transaction, Transaction.id == TxOutput.tx_id
+        ).outerjoin(
+            spender, spender.txid == TxOutput.spent_by_txid
+        ).where(Transaction.block_height <= height)
+    elif name == 'utxo_commitments':
+        query = select(*columns).where(UtxoCommitment.height <= height)
+    elif name == 'address_history':
+        query = select(*columns).where(AddressHistory.height <= height)
+    elif name == 'nulldata_outputs':
+        query = select(*columns).where(NullData.height <= height)
+    elif name == 'opcode_uses':
+        query = select(*columns).where(OpcodeUse.height <= height)
+    elif name == 'chain_state':
+        query = select(*columns).where(ChainState.key.notin_(LOCAL_STATE_KEYS))
+    else:
+        query = select(*columns)
+    return [c.name for c in columns], query.order_by(table.c.id)
+
+
+def write_chunk(tar, name, lines, mtime):
+    data = gzip.compress(''.join(lines).encode(), mtime=0)
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = mtime
+    tar.addfile(info, io.BytesIO(data))
+    return {'name': name, 'rows': len(lines), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def export_snapshot(session, path, height=None, chunk_rows=CHUNK_ROWS, log=print):
+    if session.bind.dialect.name == 'postgresql':
+        session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+    else:
+        # Hold a read transaction so the syncer cannot commit mid-export.
+        session.execute(text('BEGIN'))
+
+    synced = session.query(ChainState.value).filter_by(key='synced_height').scalar()
+    synced = int(synced) if synced is not None else -1
+    height = synced if height is None else height
+    if height < 0 or height > synced:
+        raise ValueError(f'Height {height} is not synced (synced height {synced})')
+    block_hash = session.query(Block.hash).filter_by(height=height).scalar()
+    if block_hash is None:
+        raise ValueError(f'No block at height {height}')
+    if height == synced:
+        tables = CORE_TABLES + DERIVED_TABLES
+    else:
+        tables = CORE_TABLES
+        log(f'Height {height} is below the synced height {synced}; '
+            f'derived tables will be rebuilt on import')
+
+    created = int(time.time())
+    manifest = {
+        'format': FORMAT_VERSION,
+        'height': height,
+        'block_hash': block_hash,
+        'created': created,
+        'tables': {},
+    }
+    with tarfile.open(path, 'w') as tar:
+        for name in tables:
+            columns, query = table_query(name, height)
+            chunks = []
+            lines = []
+            rows = session.execute(query.execution_options(stream_results=True,
+                                                           yield_per=10000))
+            for row in rows:
+                row = list(row)
+                if name == 'tx_outputs':
+                    spender_height = row.pop()
+                    if spender_height is None or spender_height > height:
+                        row[columns.index('spent')] = False
+                        row[columns.index('spent_by_txid')] = None
+                lines.append(json.dumps(row, separators=(',', ':')) + '\n')
+                if len(lines) >= chunk_rows:
+                    chunks.append(write_chunk(tar, f'{name}/{len(chunks):06d}.ndjson.gz',
+                                              lines, created))
+                    lines = []
+            if lines:
+                chunks.append(write_chunk(tar, f'{name}/{len(chunks):06d}.ndjson.gz',
+                                          lines, created))
+            total = sum(c['rows'] for c in chunks)
+            manifest['tables'][name] = {'columns': columns, 'rows': total, 'chunks': chunks}
+            log(f'{name}: {total} rows in {len(chunks)} chunks')
+
+        data = json.dumps(manifest, indent=1).encode()
+        info = tarfile.TarInfo(MANIFEST)
+        info.size = len(data)
+        info.mtime = created
+        tar.addfile(info, io.BytesIO(data))
+    session.rollback()
+    return manifest
+
+
+def read_manifest(tar):
+    manifest = json.load(tar.extractfile(MANIFEST))
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f'Unsupported snapshot format {manifest.get("format")}')
+    return manifest
+
+
+def iter_chunk_rows(tar, chunk, columns):
+    data = tar.extractfile(chunk['name']).read()
+    if hashlib.sha256(data).hexdigest() != chunk['sha256']:
+        raise ValueError(f'Checksum mismatch in {chunk["name"]}')
+    rows = [dict(zip(columns, json.loads(line))) for line in gzip.decompress(data).splitlines()]
+    if len(rows) != chunk['rows']:
+        raise ValueError(f'{chunk["name"]}: expected {chunk["rows"]} rows, found {len(rows)}')
+    return rows
+
+
+def verify_snapshot(path, log=print):
+    with tarfile.open(path, 'r:') as tar:
+        manifest = read_manifest(tar)
+        for name, entry in manifest['tables'].items():
+            for chunk in entry['chunks']:
+                iter_chunk_rows(tar, chunk, entry['columns'])
+            log(f'{name}: {entry["rows"]} rows ok')
+    return manifest
+
+
+def reset_sequences(session, tables):
+    if session.bind.dialect.name != 'postgresql':
+        return
+    for name in tables:
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {name}), 0) + 1, false)"
+        ))
+
+
+def import_snapshot(syncer, path, log=print):
+    session = syncer.Session()
+    try:
+        if session.query(Block.id).first() is not None:
+            raise ValueError('Target database already has blocks; import needs an empty database')
+
+        with tarfile.open(path, 'r:') as tar:
+            manifest = read_manifest(tar)
+            height = manifest['height']
+            for name, entry in manifest['tables'].items():
+                table = Base.metadata.tables[name]
+                session.execute(table.delete())
+                for chunk in entry['chunks']:
+                    session.execute(table.insert(), iter_chunk_rows(tar, chunk, entry['columns']))
+                    session.commit()
+                log(f'{name}: {entry["rows"]} rows loaded')
+        reset_sequences(session, manifest['tables'])
+
+        included = manifest['tables']
+        syncer.set_chain_state(session, 'synced_height', str(height))
+        session.commit()
+        if 'addresses' not in included:
+            log('Rebuilding addresses...')
+            syncer.reindex_aggregate(session, {'phase': 'aggregate'})
+            syncer.reindex_swap(session)
+        if 'search_index' not in included:
+            log('Rebuilding search index...')
+            syncer.rebuild_search_index()
+        if any(name not in included for name in ROLLUP_TABLES):
+            log('Rebuilding chart rollups...')
+            syncer.rebuild_rollups()
+        if 'chain_state' not in included:
+            syncer.publish_tip(session, height, height)
+            syncer.publish_rankings(session, height)
+        session.commit()
+
+        try:
+            node_hash = syncer.rpc.getblockhash(height)
+            if node_hash != manifest['block_hash']:
+                log(f'WARNING: node has {node_hash} at height {height}, '
+                    f'snapshot has {manifest["block_hash"]}')
+        except Exception as e:
+            log(f'Node not checked ({e})')
+        log(f'Imported snapshot at height {height}; start sync.py to continue from there')
+        return manifest
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='write a snapshot of this database')
+    export.add_argument('path')
+    export.add_argument('--height', type=int, help='snapshot height (default: synced height)')
+    export.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    commands.add_parser('verify', help='check a snapshot\'s checksums').add_argument('path')
+    commands.add_parser('import', help='load a snapshot into an empty database').add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        manifest = verify_snapshot(args.path)
+        print(f'Snapshot at height {manifest["height"]} ({manifest["block_hash"]}) is intact')
+        return 0
+
+    config = Config()
+    engine, SessionFactory = init_db(config.DATABASE_URL)
+    try:
+        if args.command == 'export':
+            session = SessionFactory()
+            try:
+                manifest = export_snapshot(session, args.path, args.height, args.chunk_rows)
+            finally:
+                session.close()
+            print(f'Snapshot at height {manifest["height"]} written to {args.path}')
+        else:
+            from rpc_client import BitokRPC
+            from sync import BlockchainSync
+            rpc = BitokRPC(host=config.RPC_HOST, port=config.RPC_PORT,
+                           user=config.RPC_USER, password=config.RPC_PASSWORD)
+            import_snapshot(BlockchainSync(rpc, SessionFactory, config), args.path)
+    except ValueError as e:
+        print(f'Error: {e}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,35 @@
 import time
+import json
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, List
 from sqlalchemy.orm import Session as DBSession
-from sqlalchemy import text, func
+from sqlalchemy import text, func, desc
 
-from models import Block, Transaction, TxInput, TxOutput, Address, ChainState, init_db
+from models import (
+    Block, Transaction, TxInput, TxOutput, Address, AddressHistory, ChainState, NullData,
+    OpcodeUse, SearchIndex, init_db, create_indexes
+)
 from rpc_client import BitokRPC
 from config import Config
-from script_decoder import classify_script
+from script_decoder import classify_script, script_to_asm
+from address_utils import script_addresses
+from rollups import RollupAccumulator, rebuild_rollups
+from address_history import rebuild_address_history
+from utxo_commitment import UtxoState, stored_commitment
+from blocknotify import BlockNotifyListener, SyncWaiter, send_notify
+from blockfiles import BlockFileIndex, BlockFileSource, verify_chain
+from lookups import chunked
+from fee_stats import BlockFeeStats, backfill_block, tx_size
+from miners import (
+    MinerIds, MinerMatcher, load_pool_table, miner_rollups, reattribute_miners,
+    rebuild_miner_rollups
+)
+from opcode_index import (
+    add_uses, opcode_rollups, rebuild_opcode_index, rebuild_opcode_rollups, script_uses
+)
+import nulldata
+import search_index
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +67,25 @@ class BlockchainSync:
         self.batch_size = config.SYNC_BATCH_SIZE
         self.address_cache: Dict[str, Address] = {}
         self.output_cache: Dict[str, TxOutput] = {}
+        self.pending_txs = 0
+        self.pending_supply = 0
+        self.rollups = RollupAccumulator()
+        self.miner_rollups = miner_rollups()
+        self.opcode_rollups = opcode_rollups()
+        self.miner_matcher = MinerMatcher(load_pool_table(config.MINER_POOLS_FILE))
+        self.miner_ids = MinerIds()
+        # (coinbase script, payout addresses) of the block being synced
+        self.block_coinbase = None
+        # opcode_uses rows for the block being synced
+        self.block_opcode_uses: List[Dict] = []
+        self.block_fees = BlockFeeStats()
+        self.block_new_addresses = 0
+        # address -> [received, sent] within the block being synced
+        self.block_address_changes: Dict[str, List[int]] = {}
+        self.last_block_timestamp = None
+        # None until loaded for the next block; False when the previous
+        # height has no commitment (run audit.py --rebuild).
+        self.utxo_state = None
 
     def get_chain_state(self, session: DBSession, key: str) -> Optional[str]:
         state = session.query(ChainState).filter_by(key=key).first()
@@ -105,7 +145,9 @@ class BlockchainSync:
                 last_seen_block=block_height
             )
             session.add(addr)
+            session.add(SearchIndex(**search_index.entry('address', address)))
             session.flush()
+            self.block_new_addresses += 1
 
         self.address_cache[address] = addr
         return addr
@@ -157,6 +199,7 @@ class BlockchainSync:
                 tx_count=len(block_data.get('tx', []))
             )
             session.add(block)
+            session.add(SearchIndex(**search_index.entry('block', block.hash)))
             session.flush()
 
             txids = block_data.get('tx', [])
@@ -174,12 +217,27 @@ class BlockchainSync:
 
             self.warm_output_cache(session, prev_txids)
 
+            self.block_fees = BlockFeeStats()
+            self.block_new_addresses = 0
+            self.block_address_changes = {}
+            self.block_coinbase = None
+            self.block_opcode_uses = []
+            self.load_utxo_state(session, height)
             total_block_value = 0
             for txid in txids:
                 tx_value = self.sync_transaction(session, txid, block)
                 total_block_value += tx_value
 
             block.total_value = total_block_value
+            self.block_fees.apply(block, len(txids))
+            self.attribute_miner(session, block)
+            if self.block_opcode_uses:
+                session.bulk_insert_mappings(OpcodeUse, self.block_opcode_uses)
+                add_uses(self.opcode_rollups, block.timestamp, self.block_opcode_uses)
+            self.add_block_rollup(session, block)
+            self.add_address_history(session, block.height)
+            if self.utxo_state:
+                session.add(self.utxo_state.row(block.height, block.hash))
             return True
 
         except Exception as e:
@@ -206,24 +264,30 @@ class BlockchainSync:
             is_coinbase=is_coinbase
         )
         session.add(tx)
+        session.add(SearchIndex(**search_index.entry('tx', tx.txid)))
         session.flush()
 
         total_input = 0
         total_output = 0
         counted_addresses = set()
+        payouts = []
 
         if 'vin' in tx_data:
-            for vin in tx_data['vin']:
+            for n, vin in enumerate(tx_data['vin']):
+                script_sig = vin.get('scriptSig')
                 tx_input = TxInput(
                     tx_id=tx.id,
                     txid=tx.txid,
                     prev_txid=vin.get('txid'),
                     prev_vout=vin.get('vout'),
                     coinbase=vin.get('coinbase'),
-                    script_sig=vin.get('scriptSig'),
+                    script_sig=script_sig,
+                    script_sig_asm=script_to_asm(script_sig) if script_sig else None,
                     sequence=vin.get('sequence', 0xFFFFFFFF)
                 )
                 session.add(tx_input)
+                if script_sig:
+                    self.block_opcode_uses += script_uses(script_sig, block.height, tx.txid, n, True)
 
                 if not is_coinbase and vin.get('txid'):
                     prev_output = self.get_cached_output(session, vin['txid'], vin['vout'])
@@ -231,6 +295,9 @@ class BlockchainSync:
                         total_input += prev_output.value
                         prev_output.spent = True
                         prev_output.spent_by_txid = tx.txid
+                        if self.utxo_state:
+                            self.utxo_state.spend_output(prev_output.txid, prev_output.vout,
+                                                         prev_output.value)
 
                         if prev_output.address:
                             addr = self.get_or_create_address(session, prev_output.address, block.height)
@@ -240,6 +307,7 @@ class BlockchainSync:
                                 addr.tx_count += 1
                                 counted_addresses.add(prev_output.address)
                             addr.last_seen_block = block.height
+                            self.record_address_change(prev_output.address, 0, prev_output.value)
                     else:
                         logger.warning(f'Previous output not found: {vin["txid"]}:{vin["vout"]} (spent in {txid})')
 
@@ -252,11 +320,16 @@ class BlockchainSync:
                 address = extract_address_from_vout(vout)
                 script_pubkey = extract_script_pubkey(vout)
 
-                if not address and value_satoshi > 0:
-                    logger.debug(f'No address for output {txid}:{vout.get("n", 0)} value={value_btc}')
-
                 script_info = classify_script(script_pubkey)
                 script_type = script_info.get('type', 'nonstandard')
+                derived = script_addresses(script_info)
+                if derived:
+                    script_info['addresses'] = derived
+                if not address and script_type in ('pubkeyhash', 'pubkey'):
+                    address = derived[0]
+
+                if not address and value_satoshi > 0:
+                    logger.debug(f'No address for output {txid}:{vout.get("n", 0)} value={value_btc}')
 
                 tx_output = TxOutput(
                     tx_id=tx.id,
@@ -265,14 +338,25 @@ class BlockchainSync:
                     value=value_satoshi,
                     address=address,
                     script_pubkey=script_pubkey,
-                    script_type=script_type
+                    script_type=script_type,
+                    script_info=json.dumps(script_info),
+                    script_asm=script_to_asm(script_pubkey) if script_pubkey else None
                 )
                 session.add(tx_output)
+                self.block_opcode_uses += script_uses(script_pubkey, block.height, tx.txid,
+                                                     tx_output.vout, False)
+                if script_type == 'nulldata':
+                    session.add(NullData(**nulldata.entry(block.height, tx.txid, tx_output.vout,
+                                                          script_info)))
 
                 cache_key = f"{tx.txid}:{vout.get('n', 0)}"
                 self.output_cache[cache_key] = tx_output
+                if self.utxo_state:
+                    self.utxo_state.add_output(tx.txid, tx_output.vout, value_satoshi)
 
                 if address:
+                    if is_coinbase:
+                        payouts.append(address)
                     addr = self.get_or_create_address(session, address, block.height)
                     addr.total_received += value_satoshi
                     addr.balance += value_satoshi
@@ -280,23 +364,197 @@ class BlockchainSync:
                         addr.tx_count += 1
                         counted_addresses.add(address)
                     addr.last_seen_block = block.height
+                    self.record_address_change(address, value_satoshi, 0)
 
         tx.total_input = total_input
         tx.total_output = total_output
         tx.fee = max(0, total_input - total_output) if not is_coinbase else 0
+        tx.size = tx_size(tx_data)
+        if is_coinbase and self.block_coinbase is None:
+            self.block_coinbase = (tx_data['vin'][0].get('coinbase'), payouts)
+        self.pending_txs += 1
+        self.pending_supply += total_output - total_input
+        self.block_fees.add_tx(tx.fee, tx.size, len(tx_data.get('vin', [])),
+                               len(tx_data.get('vout', [])), is_coinbase)
+        if self.utxo_state:
+            self.utxo_state.tx_count += 1
 
         return total_output
 
+    def attribute_miner(self, session: DBSession, block: Block):
+        coinbase, payouts = self.block_coinbase or (None, [])
+        name, is_pool = self.miner_matcher.match(coinbase, payouts)
+        block.miner_id = self.miner_ids.get(session, name, is_pool)
+        if block.timestamp is not None:
+            self.miner_rollups.add(block.timestamp, block.miner_id, blocks=1)
+
+    def record_address_change(self, address: str, received: int, sent: int):
+        change = self.block_address_changes.setdefault(address, [0, 0])
+        change[0] += received
+        change[1] += sent
+
+    def add_address_history(self, session: DBSession, height: int):
+        rows = []
+        for address, (received, sent) in self.block_address_changes.items():
+            addr = self.address_cache[address]
+            rows.append({'address': address, 'height': height, 'received': received,
+                         'sent': sent, 'balance': addr.balance, 'tx_count': addr.tx_count})
+        if rows:
+            session.bulk_insert_mappings(AddressHistory, rows)
+
     def clear_caches(self):
         self.address_cache.clear()
         self.output_cache.clear()
+        self.pending_txs = 0
+        self.pending_supply = 0
+        self.rollups.clear()
+        self.miner_rollups.clear()
+        self.opcode_rollups.clear()
+        # Ids of miners created in a rolled-back batch would be stale.
+        self.miner_ids.clear()
+        self.last_block_timestamp = None
+        self.utxo_state = None
+
+    def load_utxo_state(self, session: DBSession, height: int):
+        if self.utxo_state is not None:
+            return
+        if height == 0:
+            self.utxo_state = UtxoState()
+            return
+        prev = stored_commitment(session, height - 1)
+        if prev:
+            self.utxo_state = UtxoState.from_row(prev)
+        else:
+            logger.warning(f'No UTXO commitment at height {height - 1}; '
+                           f'run audit.py --rebuild to start maintaining them')
+            self.utxo_state = False
+
+    def add_block_rollup(self, session: DBSession, block: Block):
+        if block.timestamp is None:
+            return
+        prev_timestamp = self.last_block_timestamp
+        if prev_timestamp is None and block.height > 0:
+            prev = session.query(Block.timestamp).filter_by(height=block.height - 1).first()
+            prev_timestamp = prev[0] if prev else None
+        self.rollups.add_block(block.timestamp, prev_timestamp, block.tx_count or 0,
+                               block.total_value or 0, self.block_fees.fees,
+                               self.block_new_addresses, block.bits)
+        self.last_block_timestamp = block.timestamp
+
+    def commit_batch(self, session: DBSession, height: int, chain_height: int):
+        self.rollups.flush(session)
+        self.miner_rollups.flush(session)
+        self.opcode_rollups.flush(session)
+        session.commit()
+        self.set_chain_state(session, 'synced_height', str(height))
+        self.publish_tip(session, height, chain_height)
+        self.publish_rankings(session, height)
+        session.commit()
+
+    def publish_tip(self, session: DBSession, height: int, chain_height: int):
+        # Written with every commit so the web tier can serve stats and
+        # push updates without RPC calls or count() queries.
+        block = session.query(Block).filter_by(height=height).first()
+        if block:
+            self.set_chain_state(session, 'tip', json.dumps({
+                'height': block.height,
+                'hash': block.hash,
+                'timestamp': block.timestamp,
+            }))
+
+        total_txs = self.get_chain_state(session, 'total_txs')
+        if total_txs is None:
+            total_txs = session.query(func.count(Transaction.id)).scalar() or 0
+        else:
+            total_txs = int(total_txs) + self.pending_txs
+        self.pending_txs = 0
+        self.set_chain_state(session, 'total_txs', str(total_txs))
+
+        total_supply = self.get_chain_state(session, 'total_supply')
+        if total_supply is None:
+            total_supply = session.query(
+                func.coalesce(func.sum(Transaction.total_output - Transaction.total_input), 0)
+            ).scalar()
+        else:
+            total_supply = int(total_supply) + self.pending_supply
+        self.pending_supply = 0
+        self.set_chain_state(session, 'total_supply', str(total_supply))
+
+        try:
+            info = self.rpc.getinfo()
+            self.set_chain_state(session, 'network_info', json.dumps({
+                'difficulty': info.get('difficulty', 0),
+                'connections': info.get('connections', 0),
+                'chain_height': chain_height,
+            }))
+        except Exception as e:
+            logger.debug(f'getinfo failed: {e}')
+
+    def rebuild_address_history(self):
+        session = self.Session()
+        try:
+            logger.info('Rebuilding address balance history...')
+            rebuild_address_history(session)
+            session.commit()
+            logger.info('Address balance history rebuilt')
+        except Exception as e:
+            logger.error(f'Address history rebuild error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def reattribute_miners(self):
+        session = self.Session()
+        try:
+            logger.info('Attributing blocks to miners...')
+            count = reattribute_miners(session, self.miner_matcher)
+            logger.info(f'Miner attribution complete: {count} blocks')
+        except Exception as e:
+            logger.error(f'Miner attribution error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def rebuild_rollups(self):
+        session = self.Session()
+        try:
+            logger.info('Rebuilding chart rollups...')
+            rebuild_rollups(session)
+            rebuild_miner_rollups(session)
+            rebuild_opcode_rollups(session)
+            session.commit()
+            logger.info('Chart rollups rebuilt')
+        except Exception as e:
+            logger.error(f'Rollup rebuild error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def publish_rankings(self, session: DBSession, height: int):
+        # Rich list and most active addresses are snapshotted here, off
+        # idx_address_balance / idx_address_tx_count, so pages never sort
+        # or sum the address table per request.
+        supply = int(self.get_chain_state(session, 'total_supply') or 0)
+        for key, column in (('rich_list', Address.balance), ('top_active', Address.tx_count)):
+            top = session.query(Address).order_by(desc(column)).limit(self.config.RICH_LIST_SIZE)
+            self.set_chain_state(session, key, json.dumps({
+                'height': height,
+                'supply': supply,
+                'addresses': [{
+                    'address': addr.address,
+                    'balance': addr.balance,
+                    'tx_count': addr.tx_count,
+                    'share': round(addr.balance * 100 / supply, 4) if supply else 0,
+                } for addr in top]
+            }))
 
     def sync(self, target_height: Optional[int] = None):
-        if not self.rpc.is_connected():
+        try:
+            chain_height = self.rpc.getblocknumber()
+        except Exception:
             logger.error('Cannot connect to Bitok daemon')
             return False
 
-        chain_height = self.rpc.getblocknumber()
         if target_height is not None:
             chain_height = min(chain_height, target_height)
 
@@ -319,15 +577,11 @@ class BlockchainSync:
                 blocks_synced += 1
 
                 if blocks_synced % self.batch_size == 0:
-                    session.commit()
-                    self.set_chain_state(session, 'synced_height', str(height))
-                    session.commit()
+                    self.commit_batch(session, height, chain_height)
                     logger.info(f'Synced to block {height}/{chain_height} ({blocks_synced} blocks)')
                     self.clear_caches()
 
-            session.commit()
-            self.set_chain_state(session, 'synced_height', str(chain_height))
-            session.commit()
+            self.commit_batch(session, chain_height, chain_height)
             logger.info(f'Sync complete at block {chain_height}')
             return True
 
@@ -339,123 +593,370 @@ class BlockchainSync:
             self.clear_caches()
             session.close()
 
-    def reindex_addresses(self):
+    def ingest_block_files(self, datadir: str) -> bool:
+        """Initial sync from bitokd's block files, then catch up over RPC."""
+        index = BlockFileIndex(datadir)
+        logger.info(f'Indexed {len(index)} blocks in {len(index.paths)} block files')
+        try:
+            height = self.rpc.getblocknumber()
+            # The newest blocks may not have reached the files yet.
+            while height >= 0 and self.rpc.getblockhash(height) not in index:
+                height -= 1
+            if height < 0:
+                logger.error(f'None of the node\'s blocks were found in {datadir}')
+                return False
+            chain = index.chain_to(self.rpc.getblockhash(height))
+            verify_chain(chain, self.rpc)
+            logger.info(f'Best chain in block files reaches height {height}')
+
+            ingester = BlockchainSync(BlockFileSource(index, chain, self.rpc), self.Session, self.config)
+            if not ingester.sync():
+                return False
+        except ValueError as e:
+            logger.error(f'Block file ingest stopped: {e}')
+            return False
+        finally:
+            index.close()
+        return self.sync()
+
+    def fetch_transactions(self, txids: List[str]) -> Dict[str, Dict]:
+        """Fetch many transactions with batched RPC calls, falling back to
+        fetch_transaction for any the batch could not return."""
+        found = {}
+        if hasattr(self.rpc, 'batch'):
+            try:
+                results = self.rpc.batch([('getrawtransaction', [txid, 1]) for txid in txids])
+            except Exception as e:
+                logger.debug(f'Batch fetch failed: {e}')
+                results = [None] * len(txids)
+            for txid, tx_data in zip(txids, results):
+                if tx_data and 'vout' in tx_data:
+                    found[txid] = tx_data
+        for txid in txids:
+            if txid not in found:
+                tx_data = self.fetch_transaction(txid)
+                if tx_data and 'vout' in tx_data:
+                    found[txid] = tx_data
+        return found
+
+    def reindex_addresses(self, batch: int = 500):
+        """Rebuild the addresses table from tx_outputs.
+
+        Runs in resumable phases checkpointed in chain_state
+        ('reindex_addresses'): backfill outputs that have no address,
+        aggregate into the address_reindex staging table, then replace
+        addresses from it in one transaction.
+        """
         session = self.Session()
         try:
-            null_count = session.query(func.count(TxOutput.id)).filter(
+            state = self.get_chain_state(session, 'reindex_addresses')
+            state = json.loads(state) if state else {'phase': 'backfill', 'last_output_id': 0}
+            if state['phase'] != 'backfill' or state['last_output_id']:
+                logger.info(f'Resuming address reindex at {state}')
+
+            if state['phase'] == 'backfill':
+                self.reindex_backfill(session, state, batch)
+            if state['phase'] == 'aggregate':
+                self.reindex_aggregate(session, state)
+            if state['phase'] == 'swap':
+                self.reindex_swap(session)
+
+            addr_count = session.query(func.count(Address.id)).scalar()
+            logger.info(f'Reindex complete: {addr_count} addresses recalculated')
+
+        except Exception as e:
+            logger.error(f'Reindex error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def reindex_backfill(self, session: DBSession, state: Dict, batch: int):
+        null_count = session.query(func.count(TxOutput.id)).filter(
+            TxOutput.address == None,
+            TxOutput.value > 0,
+            TxOutput.id > state['last_output_id']
+        ).scalar()
+        logger.info(f'Found {null_count} outputs with NULL address')
+
+        fixed = 0
+        while True:
+            outputs = session.query(TxOutput).filter(
                 TxOutput.address == None,
-                TxOutput.value > 0
-            ).scalar()
-            logger.info(f'Found {null_count} outputs with NULL address')
-
-            total_count = session.query(func.count(TxOutput.id)).scalar()
-            with_addr = session.query(func.count(TxOutput.id)).filter(TxOutput.address != None).scalar()
-            logger.info(f'Total outputs: {total_count}, with address: {with_addr}, without: {null_count}')
-
-            if null_count > 0:
-                offset = 0
-                batch = 500
-                fixed = 0
-                while offset < null_count:
-                    outputs = session.query(TxOutput).filter(
-                        TxOutput.address == None,
-                        TxOutput.value > 0
-                    ).limit(batch).all()
-
-                    if not outputs:
+                TxOutput.value > 0,
+                TxOutput.id > state['last_output_id']
+            ).order_by(TxOutput.id).limit(batch).all()
+            if not outputs:
+                break
+
+            tx_cache = self.fetch_transactions(list({o.txid for o in outputs}))
+            for out in outputs:
+                tx_data = tx_cache.get(out.txid)
+                if not tx_data:
+                    continue
+                for vout in tx_data['vout']:
+                    if vout.get('n', 0) == out.vout:
+                        address = extract_address_from_vout(vout)
+                        if not address:
+                            script_info = classify_script(extract_script_pubkey(vout))
+                            if script_info.get('type') in ('pubkeyhash', 'pubkey'):
+                                address = script_addresses(script_info)[0]
+                        if address:
+                            out.address = address
+                            out.script_pubkey = extract_script_pubkey(vout)
+                            fixed += 1
                         break
 
-                    txids_to_fetch = list(set(o.txid for o in outputs))
-                    tx_cache = {}
-                    for tid in txids_to_fetch:
-                        tx_data = self.fetch_transaction(tid)
-                        if tx_data and 'vout' in tx_data:
-                            tx_cache[tid] = tx_data
-
-                    for out in outputs:
-                        tx_data = tx_cache.get(out.txid)
-                        if not tx_data:
-                            continue
-                        for vout in tx_data['vout']:
-                            if vout.get('n', 0) == out.vout:
-                                address = extract_address_from_vout(vout)
-                                if address:
-                                    out.address = address
-                                    out.script_pubkey = extract_script_pubkey(vout)
-                                    fixed += 1
-                                break
-
-                    session.commit()
-                    logger.info(f'Fixed {fixed} outputs so far...')
-                    offset += batch
-
-                logger.info(f'Address reindex: fixed {fixed} outputs')
-
-            logger.info('Recalculating all address balances from UTXOs...')
-            session.execute(text('DELETE FROM addresses'))
+            state['last_output_id'] = outputs[-1].id
+            self.set_chain_state(session, 'reindex_addresses', json.dumps(state))
             session.commit()
+            logger.info(f'Fixed {fixed} outputs so far...')
+
+        logger.info(f'Address reindex: fixed {fixed} outputs')
+        state.update(phase='aggregate')
+        self.set_chain_state(session, 'reindex_addresses', json.dumps(state))
+        session.commit()
+
+    def reindex_aggregate(self, session: DBSession, state: Dict):
+        logger.info('Aggregating address balances into staging table...')
+        session.execute(text('DELETE FROM address_reindex'))
+        # Received/sent totals per address, and the distinct set of
+        # transactions (receiving or spending) touching each address.
+        session.execute(text("""
+            INSERT INTO address_reindex (
+                address, total_received, total_sent, balance, tx_count,
+                first_seen_block, last_seen_block
+            )
+            SELECT r.address, r.received, r.sent, r.received - r.sent,
+                   a.tx_count, r.first_seen, a.last_seen
+            FROM (
+                SELECT o.address AS address,
+                       SUM(o.value) AS received,
+                       SUM(CASE WHEN o.spent THEN o.value ELSE 0 END) AS sent,
+                       MIN(t.block_height) AS first_seen
+                FROM tx_outputs o
+                JOIN transactions t ON t.id = o.tx_id
+                WHERE o.address IS NOT NULL
+                GROUP BY o.address
+            ) r
+            JOIN (
+                SELECT address, COUNT(*) AS tx_count, MAX(height) AS last_seen
+                FROM (
+                    SELECT o.address AS address, o.txid AS txid, t.block_height AS height
+                    FROM tx_outputs o
+                    JOIN transactions t ON t.id = o.tx_id
+                    WHERE o.address IS NOT NULL
+                    UNION
+                    SELECT o.address, o.spent_by_txid, s.block_height
+                    FROM tx_outputs o
+                    JOIN transactions s ON s.txid = o.spent_by_txid
+                    WHERE o.address IS NOT NULL AND o.spent_by_txid IS NOT NULL
+                ) touched
+                GROUP BY address
+            ) a ON a.address = r.address
+        """))
+        state.update(phase='swap')
+        self.set_chain_state(session, 'reindex_addresses', json.dumps(state))
+        session.commit()
+
+    def reindex_swap(self, session: DBSession):
+        logger.info('Swapping in recalculated addresses...')
+        new_addresses = [address for (address,) in session.execute(text("""
+            SELECT address FROM address_reindex
+            WHERE address NOT IN (SELECT address FROM addresses)
+        """))]
+        if new_addresses:
+            session.bulk_insert_mappings(
+                SearchIndex, [search_index.entry('address', a) for a in new_addresses])
+
+        session.execute(text('DELETE FROM addresses'))
+        session.execute(text("""
+            INSERT INTO addresses (
+                address, total_received, total_sent, balance, tx_count,
+                first_seen_block, last_seen_block, created_at, updated_at
+            )
+            SELECT address, total_received, total_sent, balance, tx_count,
+                   first_seen_block, last_seen_block, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM address_reindex
+        """))
+        session.execute(text('DELETE FROM address_reindex'))
+        session.query(ChainState).filter_by(key='reindex_addresses').delete()
+        self.publish_rankings(session, self.get_synced_height())
+        session.commit()
+
+    def backfill_script_artifacts(self, batch: int = 1000):
+        session = self.Session()
+        try:
+            filled = 0
+            last_id = 0
+            while True:
+                outputs = session.query(TxOutput).filter(
+                    TxOutput.id > last_id,
+                    TxOutput.script_info == None
+                ).order_by(TxOutput.id).limit(batch).all()
+                if not outputs:
+                    break
+                for out in outputs:
+                    script_info = classify_script(out.script_pubkey)
+                    derived = script_addresses(script_info)
+                    if derived:
+                        script_info['addresses'] = derived
+                    out.script_type = script_info.get('type', 'nonstandard')
+                    out.script_info = json.dumps(script_info)
+                    out.script_asm = script_to_asm(out.script_pubkey) if out.script_pubkey else None
+                last_id = outputs[-1].id
+                filled += len(outputs)
+                session.commit()
+                logger.info(f'Backfilled script artifacts for {filled} outputs...')
+
+            last_id = 0
+            inputs_filled = 0
+            while True:
+                inputs = session.query(TxInput).filter(
+                    TxInput.id > last_id,
+                    TxInput.script_sig != None,
+                    TxInput.script_sig_asm == None
+                ).order_by(TxInput.id).limit(batch).all()
+                if not inputs:
+                    break
+                for inp in inputs:
+                    inp.script_sig_asm = script_to_asm(inp.script_sig)
+                last_id = inputs[-1].id
+                inputs_filled += len(inputs)
+                session.commit()
+
+            logger.info(f'Script backfill complete: {filled} outputs, {inputs_filled} inputs')
+        except Exception as e:
+            logger.error(f'Script backfill error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
 
-            addresses_data = session.query(
-                TxOutput.address,
-                func.sum(TxOutput.value).label('total_received'),
-                func.min(Transaction.block_height).label('first_seen'),
-                func.max(Transaction.block_height).label('last_seen'),
-            ).join(Transaction, TxOutput.tx_id == Transaction.id).filter(
-                TxOutput.address != None
-            ).group_by(TxOutput.address).all()
-
-            for row in addresses_data:
-                spent_total = session.query(func.coalesce(func.sum(TxOutput.value), 0)).filter(
-                    TxOutput.address == row.address,
-                    TxOutput.spent == True
-                ).scalar()
-
-                tx_count_out = session.query(func.count(func.distinct(TxOutput.txid))).filter(
-                    TxOutput.address == row.address
-                ).scalar()
-                tx_count_in = session.query(func.count(func.distinct(TxOutput.spent_by_txid))).filter(
-                    TxOutput.address == row.address,
-                    TxOutput.spent == True,
-                    TxOutput.spent_by_txid != None
-                ).scalar()
-
-                addr = Address(
-                    address=row.address,
-                    total_received=row.total_received,
-                    total_sent=spent_total,
-                    balance=row.total_received - spent_total,
-                    tx_count=tx_count_out + tx_count_in,
-                    first_seen_block=row.first_seen,
-                    last_seen_block=row.last_seen,
-                )
-                session.add(addr)
+    def backfill_fee_stats(self, batch: int = 500):
+        """Fill transaction sizes and block fee aggregates for blocks synced before they existed."""
+        session = self.Session()
+        try:
+            filled = 0
+            last_height = -1
+            while True:
+                blocks = session.query(Block).filter(
+                    Block.height > last_height,
+                    Block.total_fees == None
+                ).order_by(Block.height).limit(batch).all()
+                if not blocks:
+                    break
+                txs = session.query(Transaction).filter(
+                    Transaction.block_id.in_([b.id for b in blocks])
+                ).order_by(Transaction.id).all()
+                tx_ids = [tx.id for tx in txs]
+                inputs: Dict[int, List[TxInput]] = {}
+                outputs: Dict[int, List[TxOutput]] = {}
+                for chunk in chunked(tx_ids):
+                    for inp in session.query(TxInput).filter(TxInput.tx_id.in_(chunk)):
+                        inputs.setdefault(inp.tx_id, []).append(inp)
+                    for out in session.query(TxOutput).filter(TxOutput.tx_id.in_(chunk)):
+                        outputs.setdefault(out.tx_id, []).append(out)
+                by_block: Dict[int, list] = {}
+                for tx in txs:
+                    by_block.setdefault(tx.block_id, []).append(
+                        (tx, inputs.get(tx.id, []), outputs.get(tx.id, [])))
+                for block in blocks:
+                    backfill_block(block, by_block.get(block.id, []))
+                last_height = blocks[-1].height
+                filled += len(blocks)
+                session.commit()
+                logger.info(f'Backfilled fee stats for {filled} blocks (height {last_height})...')
+            logger.info(f'Fee stats backfill complete: {filled} blocks')
+        except Exception as e:
+            logger.error(f'Fee stats backfill error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
 
+    def backfill_nulldata(self):
+        session = self.Session()
+        try:
+            count = nulldata.backfill_nulldata(session)
+            logger.info(f'OP_RETURN store rebuilt: {count} outputs')
+        except Exception as e:
+            logger.error(f'OP_RETURN backfill error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def rebuild_opcode_index(self):
+        session = self.Session()
+        try:
+            logger.info('Rebuilding opcode index...')
+            count = rebuild_opcode_index(session)
+            logger.info(f'Opcode index rebuilt: {count} uses')
+        except Exception as e:
+            logger.error(f'Opcode index rebuild error: {e}', exc_info=True)
+            session.rollback()
+        finally:
+            session.close()
+
+    def rebuild_search_index(self, batch: int = 5000):
+        session = self.Session()
+        try:
+            session.query(SearchIndex).delete()
             session.commit()
-            addr_count = session.query(func.count(Address.id)).scalar()
-            logger.info(f'Reindex complete: {addr_count} addresses recalculated')
+
+            sources = (
+                ('block', Block.hash),
+                ('tx', Transaction.txid),
+                ('address', Address.address),
+            )
+            for kind, column in sources:
+                rows = []
+                count = 0
+                for (value,) in session.query(column).execution_options(
+                        stream_results=True).yield_per(batch):
+                    rows.append(search_index.entry(kind, value))
+                    if len(rows) >= batch:
+                        session.bulk_insert_mappings(SearchIndex, rows)
+                        count += len(rows)
+                        rows = []
+                if rows:
+                    session.bulk_insert_mappings(SearchIndex, rows)
+                    count += len(rows)
+                session.commit()
+                logger.info(f'Search index: {count} {kind} entries')
 
         except Exception as e:
-            logger.error(f'Reindex error: {e}', exc_info=True)
+            logger.error(f'Search index rebuild error: {e}', exc_info=True)
             session.rollback()
         finally:
             session.close()
 
-    def run_continuous(self, interval: int = 10):
+    def run_continuous(self, interval: int = 10, mempool=None, waiter: Optional[SyncWaiter] = None):
         logger.info('Starting continuous sync...')
+        waiter = waiter or SyncWaiter(None, interval, interval)
+        notified = True
         while True:
             try:
-                self.sync()
+                if notified or waiter.sync_due():
+                    self.sync()
+                    waiter.synced()
+                if mempool:
+                    mempool.update()
+                notified = waiter.wait()
             except KeyboardInterrupt:
                 logger.info('Stopping sync...')
                 break
             except Exception as e:
                 logger.error(f'Sync error: {e}')
-
-            time.sleep(interval)
+                time.sleep(interval)
 
 
 def main():
+    import sys
     config = Config()
+    if len(sys.argv) > 1 and sys.argv[1] == '--notify':
+        # Run by bitokd's -blocknotify; never fail or block the node.
+        if config.SYNC_NOTIFY_SOCKET:
+            send_notify(config.SYNC_NOTIFY_SOCKET, sys.argv[2] if len(sys.argv) > 2 else '')
+        return
+
     engine, Session = init_db(
         config.DATABASE_URL,
         pool_size=config.DB_POOL_SIZE,
@@ -464,6 +965,10 @@ def main():
         pool_recycle=config.DB_POOL_RECYCLE
     )
 
+    if config.SLOW_QUERY_MS:
+        from query_profiler import install as install_query_hooks
+        install_query_hooks(engine, slow_query_ms=config.SLOW_QUERY_MS)
+
     rpc = BitokRPC(
         host=config.RPC_HOST,
         port=config.RPC_PORT,
@@ -473,13 +978,47 @@ def main():
 
     syncer = BlockchainSync(rpc, Session, config)
 
-    import sys
     if len(sys.argv) > 1 and sys.argv[1] == '--once':
         syncer.sync()
     elif len(sys.argv) > 1 and sys.argv[1] == '--reindex-addresses':
         syncer.reindex_addresses()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--backfill-scripts':
+        syncer.backfill_script_artifacts()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--backfill-fee-stats':
+        syncer.backfill_fee_stats()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--backfill-nulldata':
+        syncer.backfill_nulldata()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-opcode-index':
+        syncer.rebuild_opcode_index()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-search-index':
+        syncer.rebuild_search_index()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-rollups':
+        syncer.rebuild_rollups()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--reattribute-miners':
+        syncer.reattribute_miners()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--rebuild-address-history':
+        syncer.rebuild_address_history()
+    elif len(sys.argv) > 1 and sys.argv[1] == '--create-indexes':
+        created = create_indexes(engine)
+        logger.info(f'Created indexes: {", ".join(created)}' if created else 'No indexes missing')
+    elif len(sys.argv) > 1 and sys.argv[1] == '--ingest-blockfiles':
+        syncer.ingest_block_files(sys.argv[2] if len(sys.argv) > 2 else config.BITOK_DATADIR)
     else:
-        syncer.run_continuous(interval=config.SYNC_INTERVAL)
+        mempool = None
+        if config.MEMPOOL_ENABLED:
+            from mempool import MempoolTracker
+            mempool = MempoolTracker(rpc, Session, config)
+        listener = None
+        if config.SYNC_NOTIFY_SOCKET:
+            listener = BlockNotifyListener(config.SYNC_NOTIFY_SOCKET)
+            logger.info(f'Waiting for block notifications on {config.SYNC_NOTIFY_SOCKET}')
+        waiter = SyncWaiter(listener, config.SYNC_INTERVAL,
+                            config.SYNC_FALLBACK_INTERVAL if listener else config.SYNC_INTERVAL)
+        try:
+            syncer.run_continuous(interval=config.SYNC_INTERVAL, mempool=mempool, waiter=waiter)
+        finally:
+            if listener:
+                listener.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,294 @@
+"""Deterministic synthetic chain for benchmarks and offline testing.
+
+SyntheticChain builds blocks and transactions in the same JSON shapes
+bitokd returns and answers the read-only BitokRPC methods from memory, so
+it can be used directly as an rpc object or served by fake_bitokd.py. Txids,
+merkle roots and block hashes are real double-SHA256 hashes of the
+serialized data, so write_block_files() can also lay the chain out as
+bitokd block files. The same parameters and seed always produce the same
+chain.
+"""
+
+import os
+import random
+from typing import Dict, List, Optional
+
+from address_utils import hash160_to_address, pubkey_to_address
+from blockfiles import (
+    hash_hex, merkle_root, serialize_header, serialize_tx, write_block_file, write_varint
+)
+
+COIN = 100000000
+BLOCK_REWARD = 50 * COIN
+GENESIS_TIME = 1700000000
+BITS = 0x1e0fffff
+MAX_COINBASE_OUTPUTS = 500
+BLOCK_FILE_MAGIC = bytes.fromhex('f9beb4d9')
+
+DEFAULT_SCRIPT_MIX = {
+    'pubkeyhash': 80,
+    'pubkey': 10,
+    'multisig': 3,
+    'nulldata': 5,
+    'nonstandard': 2,
+}
+
+SPENDABLE_TYPES = ('pubkeyhash', 'pubkey', 'multisig')
+
+
+def parse_script_mix(text: str) -> Dict[str, int]:
+    """Parse 'pubkeyhash=80,nulldata=20' into a weight mapping."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_SCRIPT_MIX:
+            raise ValueError(f'Unknown script type: {name}')
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class SyntheticChain:
+    def __init__(self, blocks: int = 1000, txs_per_block: int = 10, inputs: int = 2,
+                 outputs: int = 2, script_mix: Optional[Dict[str, int]] = None,
+                 seed: int = 1):
+        self.rnd = random.Random(seed)
+        self.seed = seed
+        self.script_types = list((script_mix or DEFAULT_SCRIPT_MIX).keys())
+        self.script_weights = list((script_mix or DEFAULT_SCRIPT_MIX).values())
+        self.blocks: List[Dict] = []
+        self.block_index: Dict[str, int] = {}
+        self.txs: Dict[str, Dict] = {}
+        self.utxos: Dict[tuple, int] = {}
+        self.mempool: List[str] = []
+
+        spendable = []
+        for height in range(blocks):
+            self.add_block(height, txs_per_block, inputs, outputs, spendable)
+
+    def random_bytes(self, n: int) -> bytes:
+        return bytes(self.rnd.getrandbits(8) for _ in range(n))
+
+    def make_output(self, script_type: str, n: int, value: int) -> Dict:
+        address = None
+        if script_type == 'pubkeyhash':
+            h160 = self.random_bytes(20)
+            script = '76a914' + h160.hex() + '88ac'
+            address = hash160_to_address(h160)
+        elif script_type == 'pubkey':
+            pubkey = b'\x02' + self.random_bytes(32)
+            script = '21' + pubkey.hex() + 'ac'
+            address = pubkey_to_address(pubkey)
+        elif script_type == 'multisig':
+            keys = ''.join('21' + '03' + self.random_bytes(32).hex() for _ in range(3))
+            script = '52' + keys + '53ae'
+        elif script_type == 'nulldata':
+            payload = self.random_bytes(self.rnd.randint(4, 40))
+            script = '6a' + f'{len(payload):02x}' + payload.hex()
+            value = 0
+        else:
+            script = '7e7e14' + self.random_bytes(20).hex() + '87'
+        out = {'value': value / COIN, 'n': n, 'scriptPubKey': script}
+        if address:
+            out['address'] = address
+        return out
+
+    def add_block(self, height: int, txs_per_block: int, inputs: int, outputs: int,
+                  spendable: List[tuple]):
+        block_txids = []
+        # Outputs created in this block become spendable from the next one.
+        created = []
+        fees = 0
+
+        for index in range(1, txs_per_block):
+            if len(spendable) < inputs:
+                break
+            vin = []
+            total_in = 0
+            for _ in range(inputs):
+                pick = self.rnd.randrange(len(spendable))
+                spendable[pick], spendable[-1] = spendable[-1], spendable[pick]
+                txid, n, value = spendable.pop()
+                vin.append({'txid': txid, 'vout': n,
+                            'scriptSig': '47' + self.random_bytes(71).hex() + '21' + '02' + self.random_bytes(32).hex(),
+                            'sequence': 0xffffffff})
+                total_in += value
+                del self.utxos[(txid, n)]
+
+            fee = min(total_in // 1000, COIN // 100)
+            remaining = total_in - fee
+            types = self.rnd.choices(self.script_types, self.script_weights, k=outputs)
+            paying = [i for i, t in enumerate(types) if t in SPENDABLE_TYPES] or [0]
+            if types[paying[0]] not in SPENDABLE_TYPES:
+                types[paying[0]] = 'pubkeyhash'
+            vout = []
+            for n, script_type in enumerate(types):
+                if n not in paying:
+                    vout.append(self.make_output(script_type, n, 0))
+                    continue
+                share = remaining if n == paying[-1] else remaining // len(paying)
+                vout.append(self.make_output(script_type, n, share))
+                remaining -= share
+
+            txid = self.add_transaction(vin, vout, created)
+            block_txids.append(txid)
+            fees += fee
+
+        # Transactions with no more outputs than inputs shrink the spendable
+        # pool, so the coinbase splits its reward to keep two blocks' worth
+        # of inputs available.
+        wanted = 2 * (txs_per_block - 1) * inputs - len(spendable) - len(created)
+        pieces = max(1, min(wanted, MAX_COINBASE_OUTPUTS))
+        reward = BLOCK_REWARD + fees
+        coinbase_type = 'pubkey' if self.rnd.random() < 0.2 else 'pubkeyhash'
+        coinbase_vout = [
+            self.make_output(coinbase_type, n,
+                             reward // pieces + (reward % pieces if n == 0 else 0))
+            for n in range(pieces)
+        ]
+        coinbase_vin = [{'coinbase': '04' + height.to_bytes(4, 'little').hex() + f'{self.seed & 0xff:02x}',
+                         'sequence': 0xffffffff}]
+        block_txids.insert(0, self.add_transaction(coinbase_vin, coinbase_vout, created))
+
+        block = {
+            'height': height,
+            'version': 1,
+            'previousblockhash': self.blocks[-1]['hash'] if self.blocks else '0' * 64,
+            'merkleroot': merkle_root(block_txids),
+            'time': GENESIS_TIME + height * 600 + self.rnd.randint(-120, 120),
+            'bits': BITS,
+            'nonce': self.rnd.getrandbits(32),
+            'tx': block_txids,
+        }
+        block['hash'] = hash_hex(serialize_header(block))
+        self.blocks.append(block)
+        self.block_index[block['hash']] = height
+        spendable.extend(created)
+
+    def add_transaction(self, vin: List[Dict], vout: List[Dict], created: List[tuple]) -> str:
+        tx = {'version': 1, 'locktime': 0, 'vin': vin, 'vout': vout}
+        txid = hash_hex(serialize_tx(tx))
+        self.txs[txid] = dict(tx, txid=txid)
+        for out in vout:
+            value = round(out['value'] * COIN)
+            self.utxos[(txid, out['n'])] = value
+            if value > 0 and self.script_of(out) in SPENDABLE_TYPES:
+                created.append((txid, out['n'], value))
+        return txid
+
+    @staticmethod
+    def script_of(out: Dict) -> str:
+        script = out['scriptPubKey']
+        if script.startswith('76a914'):
+            return 'pubkeyhash'
+        if script.endswith('ac') and len(script) in (70, 134):
+            return 'pubkey'
+        if script.endswith('ae'):
+            return 'multisig'
+        if script.startswith('6a'):
+            return 'nulldata'
+        return 'nonstandard'
+
+    def tx_count(self) -> int:
+        return len(self.txs)
+
+    def raw_block(self, height: int, nonce: Optional[int] = None) -> bytes:
+        block = self.blocks[height]
+        if nonce is not None:
+            block = dict(block, nonce=nonce)
+        return (serialize_header(block) + write_varint(len(block['tx']))
+                + b''.join(serialize_tx(self.txs[txid]) for txid in block['tx']))
+
+    def write_block_files(self, datadir: str, blocks_per_file: int = 500, stale_every: int = 0,
+                          magic: bytes = BLOCK_FILE_MAGIC) -> List[str]:
+        """Write the chain as blkNNNN.dat files. With ``stale_every`` a competing
+        copy of every n-th block (same parent, other nonce) is written too, as
+        after a reorg; it is not part of the best chain."""
+        records = []
+        for height in range(len(self.blocks)):
+            records.append(self.raw_block(height))
+            if stale_every and height and height % stale_every == 0:
+                records.append(self.raw_block(height, nonce=self.blocks[height]['nonce'] ^ 1))
+        paths = []
+        for start in range(0, len(records), blocks_per_file):
+            path = os.path.join(datadir, f'blk{len(paths) + 1:04d}.dat')
+            write_block_file(path, records[start:start + blocks_per_file], magic)
+            paths.append(path)
+        return paths
+
+    # BitokRPC methods
+
+    def is_connected(self) -> bool:
+        return True
+
+    def getinfo(self) -> Dict:
+        return {'version': 3000000, 'blocks': len(self.blocks) - 1, 'connections': 8,
+                'difficulty': self.getdifficulty(), 'testnet': False}
+
+    def getblockcount(self) -> int:
+        return len(self.blocks) - 1
+
+    def getblocknumber(self) -> int:
+        return len(self.blocks) - 1
+
+    def getbestblockhash(self) -> str:
+        return self.blocks[-1]['hash']
+
+    def getblockhash(self, height: int) -> str:
+        if not 0 <= height < len(self.blocks):
+            raise RPCError(-8, 'Block height out of range')
+        return self.blocks[height]['hash']
+
+    def getblock(self, blockhash: str) -> Dict:
+        height = self.block_index.get(blockhash)
+        if height is None:
+            raise RPCError(-5, 'Block not found')
+        block = dict(self.blocks[height])
+        block['confirmations'] = len(self.blocks) - height
+        return block
+
+    def getrawtransaction(self, txid: str, verbose: int = 1) -> Dict:
+        tx = self.txs.get(txid)
+        if tx is None:
+            raise RPCError(-5, 'No information available about transaction')
+        return tx
+
+    def gettransaction(self, txid: str) -> Dict:
+        return self.getrawtransaction(txid)
+
+    def getdifficulty(self) -> float:
+        return (0x7fffff << 216) / ((BITS & 0xffffff) << (8 * ((BITS >> 24) - 3)))
+
+    def getconnectioncount(self) -> int:
+        return 8
+
+    def getrawmempool(self) -> List[str]:
+        return list(self.mempool)
+
+    def gettxoutsetinfo(self) -> Dict:
+        return {'height': len(self.blocks) - 1, 'bestblock': self.blocks[-1]['hash'],
+                'txouts': len(self.utxos), 'total_amount': sum(self.utxos.values()) / COIN}
+
+    def validateaddress(self, address: str) -> Dict:
+        from address_utils import validate_address
+        return {'isvalid': validate_address(address), 'address': address}
+
+    def decodescript(self, hex_script: str) -> Dict:
+        from script_decoder import classify_script, script_to_asm
+        info = classify_script(hex_script)
+        return {'asm': script_to_asm(hex_script), 'type': info.get('type')}
+
+    def batch(self, calls: List[tuple]) -> List:
+        results = []
+        for method, params in calls:
+            try:
+                results.append(getattr(self, method)(*params))
+            except Exception:
+                results.append(None)
+        return results
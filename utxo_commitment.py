@@ -0,0 +1,132 @@
+"""Rolling commitment to the UTXO set.
+
+The commitment is the sum, modulo 2**256, of sha256("txid:vout:value") over
+every unspent output: creating an output adds its hash and spending one
+subtracts it, so the set hash after a block follows from the previous
+block's and that block's own inputs and outputs. The syncer stores one
+``utxo_commitments`` row per height with the hash, UTXO count, supply (sum
+of unspent values) and cumulative transaction count.
+"""
+
+import hashlib
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
+
+from models import Block, Transaction, TxInput, TxOutput, UtxoCommitment
+
+MODULUS = 1 << 256
+REBUILD_CHUNK_HEIGHTS = 1000
+
+
+def outpoint_hash(txid: str, vout: int, value: int) -> int:
+    return int.from_bytes(hashlib.sha256(f'{txid}:{vout}:{value}'.encode()).digest(), 'big')
+
+
+class UtxoState:
+    def __init__(self, utxo_hash: int = 0, utxo_count: int = 0, supply: int = 0,
+                 tx_count: int = 0):
+        self.utxo_hash = utxo_hash
+        self.utxo_count = utxo_count
+        self.supply = supply
+        self.tx_count = tx_count
+
+    @classmethod
+    def from_row(cls, row: UtxoCommitment) -> 'UtxoState':
+        return cls(int(row.utxo_hash, 16), row.utxo_count, row.supply, row.tx_count)
+
+    def add_output(self, txid: str, vout: int, value: int):
+        self.utxo_hash = (self.utxo_hash + outpoint_hash(txid, vout, value)) % MODULUS
+        self.utxo_count += 1
+        self.supply += value
+
+    def spend_output(self, txid: str, vout: int, value: int):
+        self.utxo_hash = (self.utxo_hash - outpoint_hash(txid, vout, value)) % MODULUS
+        self.utxo_count -= 1
+        self.supply -= value
+
+    def digest(self) -> str:
+        return f'{self.utxo_hash:064x}'
+
+    def values(self) -> dict:
+        return {
+            'utxo_hash': self.digest(),
+            'utxo_count': self.utxo_count,
+            'supply': self.supply,
+            'tx_count': self.tx_count,
+        }
+
+    def row(self, height: int, block_hash: Optional[str]) -> UtxoCommitment:
+        return UtxoCommitment(height=height, block_hash=block_hash, **self.values())
+
+
+def stored_commitment(session, height: int) -> Optional[UtxoCommitment]:
+    return session.query(UtxoCommitment).filter_by(height=height).first()
+
+
+def commitment_from_tables(session, height: int) -> UtxoState:
+    """Recompute the commitment at ``height`` from tx_outputs (full scan)."""
+    spender = aliased(Transaction)
+    state = UtxoState()
+    rows = session.query(TxOutput.txid, TxOutput.vout, TxOutput.value).join(
+        Transaction, Transaction.id == TxOutput.tx_id
+    ).outerjoin(
+        spender, spender.txid == TxOutput.spent_by_txid
+    ).filter(
+        Transaction.block_height <= height,
+        or_(spender.id == None, spender.block_height > height)
+    ).execution_options(stream_results=True).yield_per(10000)
+    for txid, vout, value in rows:
+        state.add_output(txid, vout, value or 0)
+    state.tx_count = session.query(func.count(Transaction.id)).filter(
+        Transaction.block_height <= height
+    ).scalar() or 0
+    return state
+
+
+def rebuild_commitments(session, log=None):
+    """Replay every block from the tables and rewrite utxo_commitments."""
+    session.query(UtxoCommitment).delete()
+    tip = session.query(func.max(Block.height)).scalar()
+    if tip is None:
+        return
+
+    prev_out = aliased(TxOutput)
+    state = UtxoState()
+    for start in range(0, tip + 1, REBUILD_CHUNK_HEIGHTS):
+        end = min(start + REBUILD_CHUNK_HEIGHTS - 1, tip)
+        created = {}
+        for height, txid, vout, value in session.query(
+            Transaction.block_height, TxOutput.txid, TxOutput.vout, TxOutput.value
+        ).join(Transaction, Transaction.id == TxOutput.tx_id).filter(
+            Transaction.block_height.between(start, end)
+        ):
+            created.setdefault(height, []).append((txid, vout, value or 0))
+
+        spent = {}
+        for height, txid, vout, value in session.query(
+            Transaction.block_height, prev_out.txid, prev_out.vout, prev_out.value
+        ).select_from(TxInput).join(Transaction, Transaction.id == TxInput.tx_id).join(
+            prev_out, (prev_out.txid == TxInput.prev_txid) & (prev_out.vout == TxInput.prev_vout)
+        ).filter(Transaction.block_height.between(start, end)):
+            spent.setdefault(height, []).append((txid, vout, value or 0))
+
+        tx_counts = dict(session.query(Transaction.block_height, func.count(Transaction.id)).filter(
+            Transaction.block_height.between(start, end)
+        ).group_by(Transaction.block_height))
+
+        rows = []
+        for height, block_hash in session.query(Block.height, Block.hash).filter(
+            Block.height.between(start, end)
+        ).order_by(Block.height):
+            for outpoint in created.get(height, []):
+                state.add_output(*outpoint)
+            for outpoint in spent.get(height, []):
+                state.spend_output(*outpoint)
+            state.tx_count += tx_counts.get(height, 0)
+            rows.append({'height': height, 'block_hash': block_hash, **state.values()})
+        session.bulk_insert_mappings(UtxoCommitment, rows)
+        session.commit()
+        if log:
+            log(f'UTXO commitments rebuilt to height {end}')